@@ -0,0 +1,265 @@
+"""Pure render functions for the sleep health figures.
+
+Each function takes precomputed aggregates (histogram counts, group means,
+probability-plot points, ...) and returns a Figure. Nothing here reads the
+dataset or uses pyplot's global figure state, so the functions can run in
+any worker process.
+"""
+from contextlib import contextmanager
+
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from engine.interactive import DEFAULT_MAX_POINTS, bounded_scatter
+
+
+@contextmanager
+def _style():
+    """The blog's figure style, scoped to one render call"""
+    with plt.style.context('seaborn-v0_8'), sns.color_palette('husl'):
+        yield
+
+
+def histogram(values, bins):
+    """Bin counts and edges, the precomputed form of ``plt.hist(values, bins)``"""
+    counts, edges = np.histogram(values, bins=bins)
+    return {'counts': counts, 'edges': edges}
+
+
+def _hist(ax, hist, **kwargs):
+    ax.hist(hist['edges'][:-1], bins=hist['edges'], weights=hist['counts'], **kwargs)
+
+
+def _probplot(ax, qq):
+    """Draw ``stats.probplot(..., plot=ax)`` output from its precomputed points"""
+    (osm, osr), (slope, intercept, _) = qq
+    ax.plot(osm, osr, 'bo')
+    ax.plot(osm, slope * osm + intercept, 'r-')
+    ax.set_xlabel('Theoretical quantiles')
+    ax.set_ylabel('Ordered Values')
+
+
+def sleep_duration_distribution(duration, duration_qq, quality, activity, stress, heart_rate):
+    with _style():
+        fig = Figure(figsize=(15, 10))
+        axes = fig.subplots(2, 3).ravel()
+
+        # Sleep Duration Distribution
+        _hist(axes[0], duration, alpha=0.7, color='skyblue', edgecolor='black')
+        axes[0].set_title('Sleep Duration Distribution')
+        axes[0].set_xlabel('Sleep Duration (hours)')
+        axes[0].set_ylabel('Frequency')
+
+        # QQ Plot for Sleep Duration
+        _probplot(axes[1], duration_qq)
+        axes[1].set_title('QQ Plot - Sleep Duration')
+
+        # Sleep Quality Distribution
+        _hist(axes[2], quality, alpha=0.7, color='lightgreen', edgecolor='black')
+        axes[2].set_title('Sleep Quality Distribution')
+        axes[2].set_xlabel('Quality of Sleep (1-10)')
+        axes[2].set_ylabel('Frequency')
+
+        # Physical Activity Distribution
+        _hist(axes[3], activity, alpha=0.7, color='lightcoral', edgecolor='black')
+        axes[3].set_title('Physical Activity Distribution')
+        axes[3].set_xlabel('Physical Activity Level (1-10)')
+        axes[3].set_ylabel('Frequency')
+
+        # Stress Level Distribution
+        _hist(axes[4], stress, alpha=0.7, color='lightyellow', edgecolor='black')
+        axes[4].set_title('Stress Level Distribution')
+        axes[4].set_xlabel('Stress Level (1-10)')
+        axes[4].set_ylabel('Frequency')
+
+        # Heart Rate Distribution
+        _hist(axes[5], heart_rate, alpha=0.7, color='lightpink', edgecolor='black')
+        axes[5].set_title('Heart Rate Distribution')
+        axes[5].set_xlabel('Heart Rate (bpm)')
+        axes[5].set_ylabel('Frequency')
+
+        fig.tight_layout()
+    return fig
+
+
+def correlation_heatmap(correlation_matrix):
+    with _style():
+        fig = Figure(figsize=(10, 8))
+        ax = fig.subplots()
+        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0,
+                    square=True, fmt='.2f', cbar_kws={'shrink': 0.8}, ax=ax)
+        ax.set_title('Sleep Health Correlation Matrix')
+        fig.tight_layout()
+    return fig
+
+
+def sleep_duration_vs_quality(duration, quality, trend):
+    with _style():
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        ax.scatter(duration, quality, alpha=0.6, color='purple')
+        ax.set_xlabel('Sleep Duration (hours)')
+        ax.set_ylabel('Quality of Sleep (1-10)')
+        ax.set_title('Sleep Duration vs Quality of Sleep')
+        ax.grid(True, alpha=0.3)
+
+        # Add trend line
+        ax.plot(duration, np.poly1d(trend)(duration), "r--", alpha=0.8)
+
+        fig.tight_layout()
+    return fig
+
+
+def _bar_grid(title, panels, colors):
+    """2x2 grid of bar charts; panels are (means, title, ylabel) in reading order"""
+    fig = Figure(figsize=(15, 12))
+    axes = fig.subplots(2, 2).ravel()
+    fig.suptitle(title, fontsize=16)
+    for ax, (means, panel_title, ylabel), color in zip(axes, panels, colors):
+        ax.bar(means.index, means.values, color=color)
+        ax.set_title(panel_title)
+        ax.set_ylabel(ylabel)
+    fig.tight_layout()
+    return fig
+
+
+def sleep_patterns_by_age(sleep, quality, activity, stress):
+    with _style():
+        return _bar_grid('Sleep Patterns by Age Groups', [
+            (sleep, 'Average Sleep Duration by Age Group', 'Sleep Duration (hours)'),
+            (quality, 'Average Sleep Quality by Age Group', 'Quality of Sleep (1-10)'),
+            (activity, 'Average Physical Activity by Age Group', 'Physical Activity Level (1-10)'),
+            (stress, 'Average Stress Level by Age Group', 'Stress Level (1-10)'),
+        ], ['lightblue', 'lightgreen', 'lightcoral', 'lightyellow'])
+
+
+def sleep_patterns_by_gender(sleep, quality, stress, activity):
+    with _style():
+        return _bar_grid('Sleep Patterns by Gender', [
+            (sleep, 'Average Sleep Duration by Gender', 'Sleep Duration (hours)'),
+            (quality, 'Average Sleep Quality by Gender', 'Quality of Sleep (1-10)'),
+            (stress, 'Average Stress Level by Gender', 'Stress Level (1-10)'),
+            (activity, 'Average Physical Activity by Gender', 'Physical Activity Level (1-10)'),
+        ], [['lightblue', 'lightpink']] * 4)
+
+
+def sleep_by_occupation(occupation_sleep):
+    with _style():
+        fig = Figure(figsize=(14, 8))
+        ax = fig.subplots()
+        ax.bar(range(len(occupation_sleep)), occupation_sleep.values, color='coral')
+        ax.set_xlabel('Occupation')
+        ax.set_ylabel('Average Sleep Duration (hours)')
+        ax.set_title('Average Sleep Duration by Occupation')
+        ax.set_xticks(range(len(occupation_sleep)), occupation_sleep.index, rotation=45, ha='right')
+        fig.tight_layout()
+    return fig
+
+
+def lifestyle_factors_impact(activity_quality, stress_sleep, steps_quality, heartrate_sleep):
+    with _style():
+        fig = Figure(figsize=(15, 12))
+        axes = fig.subplots(2, 2)
+        fig.suptitle('Impact of Lifestyle Factors on Sleep', fontsize=16)
+
+        # Physical Activity Level vs Sleep Quality
+        axes[0, 0].plot(activity_quality.index, activity_quality.values, marker='o', linewidth=2)
+        axes[0, 0].set_title('Physical Activity Level vs Sleep Quality')
+        axes[0, 0].set_xlabel('Physical Activity Level (1-10)')
+        axes[0, 0].set_ylabel('Average Sleep Quality')
+
+        # Stress Level vs Sleep Duration
+        axes[0, 1].plot(stress_sleep.index, stress_sleep.values, marker='s', linewidth=2, color='orange')
+        axes[0, 1].set_title('Stress Level vs Sleep Duration')
+        axes[0, 1].set_xlabel('Stress Level (1-10)')
+        axes[0, 1].set_ylabel('Average Sleep Duration (hours)')
+
+        # Daily Steps vs Sleep Quality
+        axes[1, 0].plot(steps_quality.index, steps_quality.values, marker='^', linewidth=2, color='red')
+        axes[1, 0].set_title('Daily Steps vs Sleep Quality')
+        axes[1, 0].set_xlabel('Daily Steps')
+        axes[1, 0].set_ylabel('Average Sleep Quality')
+
+        # Heart Rate vs Sleep Duration
+        axes[1, 1].plot(heartrate_sleep.index, heartrate_sleep.values, marker='d', linewidth=2, color='purple')
+        axes[1, 1].set_title('Heart Rate vs Sleep Duration')
+        axes[1, 1].set_xlabel('Heart Rate (bpm)')
+        axes[1, 1].set_ylabel('Average Sleep Duration (hours)')
+
+        fig.tight_layout()
+    return fig
+
+
+def model_diagnostics(y_pred, residuals, residuals_qq, residuals_hist):
+    with _style():
+        fig = Figure(figsize=(15, 5))
+        axes = fig.subplots(1, 3)
+
+        # Residuals vs Predicted
+        axes[0].scatter(y_pred, residuals, alpha=0.6)
+        axes[0].axhline(y=0, color='r', linestyle='--')
+        axes[0].set_xlabel('Predicted Values')
+        axes[0].set_ylabel('Residuals')
+        axes[0].set_title('Residuals vs Predicted')
+
+        # QQ Plot of residuals
+        _probplot(axes[1], residuals_qq)
+        axes[1].set_title('QQ Plot of Residuals')
+
+        # Residuals histogram
+        _hist(axes[2], residuals_hist, alpha=0.7, edgecolor='black')
+        axes[2].set_xlabel('Residuals')
+        axes[2].set_ylabel('Frequency')
+        axes[2].set_title('Residuals Distribution')
+
+        fig.tight_layout()
+    return fig
+
+
+def segment_small_multiples(key, panels):
+    """Duration vs quality in each segment of ``key``, on shared axes
+
+    A panel is {label, n, rho, p, duration, quality, trend}: a bounded
+    scatter sample, the trend fitted on all of the segment's rows and its
+    Spearman rho with the adjusted p-value.
+    """
+    with _style():
+        columns = min(len(panels), 4)
+        rows = -(-len(panels) // columns)
+        fig = Figure(figsize=(4 * columns, 3.5 * rows))
+        axes = fig.subplots(rows, columns, sharex=True, sharey=True, squeeze=False).ravel()
+        fig.suptitle(f'Sleep Duration vs Quality of Sleep by {key}', fontsize=16)
+        for ax, panel in zip(axes, panels):
+            ax.scatter(panel['duration'], panel['quality'], alpha=0.6, s=12, color='purple')
+            span = np.array([panel['duration'].min(), panel['duration'].max()])
+            ax.plot(span, np.poly1d(panel['trend'])(span), "r--", alpha=0.8)
+            ax.set_title(f"{panel['label']} (n = {panel['n']})\n"
+                         f"rho = {panel['rho']:.2f}, adj. p = {panel['p']:.2g}", fontsize=10)
+            ax.grid(True, alpha=0.3)
+        for ax in axes[len(panels):]:
+            ax.set_visible(False)
+        # Axis labels on the left column and on the lowest panel of each column
+        for index, ax in enumerate(axes[:len(panels)]):
+            if index % columns == 0:
+                ax.set_ylabel('Quality of Sleep (1-10)')
+            if index + columns >= len(panels):
+                ax.set_xlabel('Sleep Duration (hours)')
+                ax.xaxis.set_tick_params(labelbottom=True)
+        fig.tight_layout()
+    return fig
+
+
+def interactive_sleep_analysis(frame, max_points=DEFAULT_MAX_POINTS, mode='auto'):
+    fig = bounded_scatter(frame, x='Sleep Duration', y='Quality of Sleep',
+                          color='Stress Level', size='Physical Activity Level',
+                          hover=['Occupation', 'Age', 'Gender'],
+                          title='Interactive Sleep Analysis: Duration vs Quality',
+                          max_points=max_points, mode=mode)
+    fig.update_layout(
+        xaxis_title='Sleep Duration (hours)',
+        yaxis_title='Quality of Sleep (1-10)',
+        template='plotly_white'
+    )
+    return fig
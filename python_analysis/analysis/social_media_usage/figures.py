@@ -0,0 +1,161 @@
+"""Pure render functions for the social media usage figures.
+
+Each function takes precomputed aggregates (histogram counts, per-app
+means and ratios, a bounded scatter sample, ...) and returns a Figure.
+Nothing here reads the dataset or uses pyplot's global figure state, so the
+functions can run in any worker process.
+"""
+from contextlib import contextmanager
+
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+from matplotlib.figure import Figure
+
+
+@contextmanager
+def _style():
+    """The blog's figure style, scoped to one render call"""
+    with plt.style.context('seaborn-v0_8'), sns.color_palette('husl'):
+        yield
+
+
+def histogram(values, bins):
+    """Bin counts and edges, the precomputed form of ``plt.hist(values, bins)``"""
+    counts, edges = np.histogram(values, bins=bins)
+    return {'counts': counts, 'edges': edges}
+
+
+def _hist(ax, hist, **kwargs):
+    ax.hist(hist['edges'][:-1], bins=hist['edges'], weights=hist['counts'], **kwargs)
+
+
+def _probplot(ax, qq):
+    """Draw ``stats.probplot(..., plot=ax)`` output from its precomputed points"""
+    (osm, osr), (slope, intercept, _) = qq
+    ax.plot(osm, osr, 'bo')
+    ax.plot(osm, slope * osm + intercept, 'r-')
+    ax.set_xlabel('Theoretical quantiles')
+    ax.set_ylabel('Ordered Values')
+
+
+def _bar_grid(title, panels, colors, shape=(2, 2), figsize=(15, 12)):
+    """Grid of bar charts; panels are (values, title, ylabel) in reading order"""
+    fig = Figure(figsize=figsize)
+    axes = fig.subplots(*shape).ravel()
+    fig.suptitle(title, fontsize=16)
+    for ax, (values, panel_title, ylabel), color in zip(axes, panels, colors):
+        ax.bar([str(label) for label in values.index], values.values, color=color)
+        ax.set_title(panel_title)
+        ax.set_ylabel(ylabel)
+        ax.tick_params(axis='x', labelrotation=30)
+    fig.tight_layout()
+    return fig
+
+
+def engagement_distribution(minutes, posts, likes, follows):
+    with _style():
+        fig = Figure(figsize=(15, 10))
+        axes = fig.subplots(2, 2).ravel()
+        for ax, hist, title, xlabel, color in zip(axes, [minutes, posts, likes, follows], [
+            'Daily Minutes Distribution', 'Posts per Day Distribution',
+            'Likes per Day Distribution', 'Follows per Day Distribution',
+        ], ['Daily Minutes Spent', 'Posts per Day', 'Likes per Day', 'Follows per Day'],
+                ['skyblue', 'lightgreen', 'lightcoral', 'plum']):
+            _hist(ax, hist, alpha=0.7, color=color, edgecolor='black')
+            ax.set_title(title)
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel('Users')
+        fig.tight_layout()
+    return fig
+
+
+def correlation_heatmap(correlation_matrix):
+    with _style():
+        fig = Figure(figsize=(10, 8))
+        ax = fig.subplots()
+        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0,
+                    square=True, fmt='.2f', cbar_kws={'shrink': 0.8}, ax=ax)
+        ax.set_title('Social Media Usage Correlation Matrix')
+        fig.tight_layout()
+    return fig
+
+
+def usage_by_app(minutes, posts, likes, follows):
+    with _style():
+        return _bar_grid('Usage and Engagement by App', [
+            (minutes, 'Average Daily Minutes by App', 'Minutes per Day'),
+            (posts, 'Average Posts per Day by App', 'Posts per Day'),
+            (likes, 'Average Likes per Day by App', 'Likes per Day'),
+            (follows, 'Average Follows per Day by App', 'Follows per Day'),
+        ], ['skyblue', 'lightgreen', 'lightcoral', 'plum'])
+
+
+def engagement_ratios_by_app(ratios, overall):
+    """One panel per ratio column of ``ratios`` (apps as rows), with the all-apps ratio dashed"""
+    with _style():
+        panels = [(ratios[name], f'{name} by App', name) for name in ratios.columns]
+        fig = _bar_grid('Engagement Ratios by App', panels,
+                        ['steelblue', 'seagreen', 'indianred', 'darkorchid'])
+        for ax, name in zip(fig.axes, ratios.columns):
+            ax.axhline(overall[name], color='black', linestyle='--', linewidth=1, label='All apps')
+            ax.legend(loc='lower right')
+    return fig
+
+
+def engagement_by_usage_band(posts, likes, follows):
+    with _style():
+        return _bar_grid('Engagement by Daily Usage', [
+            (posts, 'Average Posts per Day', 'Posts per Day'),
+            (likes, 'Average Likes per Day', 'Likes per Day'),
+            (follows, 'Average Follows per Day', 'Follows per Day'),
+        ], ['lightgreen', 'lightcoral', 'plum'], shape=(1, 3), figsize=(18, 6))
+
+
+def minutes_vs_likes(minutes, likes, apps, trend):
+    """Scatter of a (bounded) row sample, one colour per app, with the all-rows trend line"""
+    with _style():
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        for app in apps.cat.categories:
+            mask = (apps == app).to_numpy()
+            if mask.any():
+                ax.scatter(minutes[mask], likes[mask], alpha=0.6, s=18, label=str(app))
+        ax.set_xlabel('Daily Minutes Spent')
+        ax.set_ylabel('Likes per Day')
+        ax.set_title('Time Spent vs Likes Received')
+        ax.grid(True, alpha=0.3)
+
+        # Trend line fitted on every row, not just the plotted sample
+        span = np.array([minutes.min(), minutes.max()]) if len(minutes) else np.zeros(2)
+        ax.plot(span, np.poly1d(trend)(span), "r--", alpha=0.8, label='Trend')
+        ax.legend(loc='upper left', fontsize=8, ncol=2)
+
+        fig.tight_layout()
+    return fig
+
+
+def model_diagnostics(y_pred, residuals, residuals_qq, residuals_hist):
+    with _style():
+        fig = Figure(figsize=(15, 5))
+        axes = fig.subplots(1, 3)
+
+        # Residuals vs Predicted
+        axes[0].scatter(y_pred, residuals, alpha=0.6)
+        axes[0].axhline(y=0, color='r', linestyle='--')
+        axes[0].set_xlabel('Predicted Values')
+        axes[0].set_ylabel('Residuals')
+        axes[0].set_title('Residuals vs Predicted')
+
+        # QQ Plot of residuals
+        _probplot(axes[1], residuals_qq)
+        axes[1].set_title('QQ Plot of Residuals')
+
+        # Residuals histogram
+        _hist(axes[2], residuals_hist, alpha=0.7, edgecolor='black')
+        axes[2].set_xlabel('Residuals')
+        axes[2].set_ylabel('Frequency')
+        axes[2].set_title('Residuals Distribution')
+
+        fig.tight_layout()
+    return fig
@@ -0,0 +1,795 @@
+import os
+import sys
+import warnings
+from collections import namedtuple
+from types import SimpleNamespace
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from engine.imports import ImportProfiler, lazy_import
+
+# Hooked in before the remaining imports so --profile-imports also times start-up
+import_profiler = ImportProfiler()
+if '--profile-imports' in sys.argv[1:]:
+    import_profiler.install()
+
+import pandas as pd
+import numpy as np
+
+from engine import cli, columnar, paths, ranks, sampling
+from engine.cache import BuildCache, code_fingerprint, file_fingerprint, fingerprint, source_fingerprint
+from engine.columnar import ParquetCache
+from engine.crossval import cross_validate, cross_validate_streaming, hashed_fold_ids, summarize
+from engine.dag import Pipeline
+from engine.ols import Gram, HashSplit, business_impact, fit_streaming, vif_table
+from engine.ingest import (ChunkProfile, FrameSource, SOCIAL_DTYPE_PLAN, apply_dtype_plan,
+                           bytes_per_row, decimal_values, encode_user_ids, frame_chunks,
+                           social_source)
+from engine.outliers import IqrAccumulator, filter_outliers, iqr_bounds, summarize_outliers
+from engine.render import FigureJob
+from engine.export import group_payload, matrix_payload, table_payload, write_data_api
+from engine.groupby import ratio_table, select
+from engine.interactive import stratified_sample
+from engine.summary import DistinctIds, SummaryAccumulator, ValueCounts
+
+# The heavy libraries load inside the stages that use them: scipy.stats for
+# the tests and Q-Q plots, figures (matplotlib, seaborn) for the figure stages
+stats = lazy_import('scipy.stats')
+figures = lazy_import('figures')
+
+# The same stage graph as the sleep analysis (load -> clean -> aggregate ->
+# figures / tests / model -> report), built for many users: User_IDs are
+# integers from the first read, App is categorical, every per-app statistic
+# and ratio comes from one fused aggregation pass, and the train/test split
+# hashes the user ID instead of holding a permutation of every row.
+pipeline = Pipeline()
+
+ANALYSIS = 'social_media_usage'
+DATA_PATH = paths.dataset('social_media_usage.csv')
+
+NUMERIC_COLS = ['Daily_Minutes_Spent', 'Posts_Per_Day', 'Likes_Per_Day', 'Follows_Per_Day']
+ENGAGEMENT_COLS = ['Posts_Per_Day', 'Likes_Per_Day', 'Follows_Per_Day']
+OUTLIER_THRESHOLD = 5
+USAGE_BINS = [0, 60, 180, 300, 1440]
+USAGE_LABELS = ['Under 1h', '1-3h', '3-5h', '5h+']
+
+MODEL_TARGET = 'Likes_Per_Day'
+MODEL_FEATURES = ['Daily_Minutes_Spent', 'Posts_Per_Day', 'Follows_Per_Day']
+# Feature sets compared by cross-validation; all are fit from the same Gram matrices
+FEATURE_SETS = {
+    'All features': MODEL_FEATURES,
+    'Time spent': ['Daily_Minutes_Spent'],
+    'Activity': ['Posts_Per_Day', 'Follows_Per_Day'],
+}
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+# Section III panels: grouping key -> value columns, all summed in one pass
+EDA_GROUPS = {
+    'App': NUMERIC_COLS,
+    'Usage_Band': ENGAGEMENT_COLS,
+}
+HISTOGRAM_BINS = {'Daily_Minutes_Spent': 20, 'Posts_Per_Day': 21, 'Likes_Per_Day': 20, 'Follows_Per_Day': 25}
+# Per-app engagement ratios, as ratios of the app's totals:
+# name -> (numerator, denominator, scale)
+RATIOS = {
+    'Likes per Post': ('Likes_Per_Day', 'Posts_Per_Day', 1),
+    'Likes per Hour': ('Likes_Per_Day', 'Daily_Minutes_Spent', 60),
+    'Posts per Hour': ('Posts_Per_Day', 'Daily_Minutes_Spent', 60),
+    'Follows per 100 Likes': ('Follows_Per_Day', 'Likes_Per_Day', 100),
+}
+# Rows drawn in the time-vs-likes scatter; larger exports are sampled per app
+SCATTER_MAX_POINTS = 5_000
+# Columns of every clean row the Section IV tests read
+TEST_COLUMNS = ['App'] + NUMERIC_COLS
+
+# Stages the stats-only command runs: Section IV tables, no figures or exports
+STATS_STAGES = ['tests', 'regression', 'cross_validation', 'vif']
+
+# Results passed between stages
+Loaded = namedtuple('Loaded', ['frame', 'source', 'profile', 'raw_rows', 'quartiles', 'users'])
+Clean = namedtuple('Clean', ['source', 'sample', 'rows', 'key'])
+Aggregates = namedtuple('Aggregates', ['stats', 'group_table', 'summary', 'correlation', 'histograms',
+                                       'ratios', 'overall_ratios'])
+Regression = namedtuple('Regression', ['features', 'target', 'coef', 'intercept', 'mse', 'r2',
+                                       'gram', 'residuals'])
+
+
+def parse_args(argv=None):
+    parser = cli.analysis_parser(
+        'Social media usage analysis', DATA_PATH,
+        workers_help='workers used to render figures and fit models (default: one per CPU, 1 = serial)',
+        seed_help='seed for the scatter sample and the cross-validation splits')
+    return cli.check_args(parser, parser.parse_args(argv), STATS_STAGES)
+
+
+# ============================================================================
+# I. INTRODUCTION AND GOAL DEFINITION
+# ============================================================================
+
+@pipeline.stage()
+def intro(ctx):
+    print("\nI. INTRODUCTION AND GOAL DEFINITION")
+    print("-" * 50)
+
+    analysis_goals = {
+        "primary_question": "What factors most significantly influence social media engagement and usage patterns?",
+        "secondary_questions": [
+            "How do different platforms vary in user engagement metrics?",
+            "Are there significant differences in posting behavior across platforms?",
+            "What is the relationship between time spent and engagement received?"
+        ],
+        "success_metrics": ["statistical_significance", "interpretability", "actionability"],
+        "data_requirements": ["usage_time", "engagement_metrics", "platform"],
+        "stakeholders": ["content_creators", "platform_analysts", "digital_wellbeing_researchers"]
+    }
+
+    print("Analysis Goals:")
+    for key, value in analysis_goals.items():
+        print(f"  {key}: {value}")
+    return analysis_goals
+
+
+# ============================================================================
+# II. DATA CLEANING AND PREPARATION
+# ============================================================================
+
+@pipeline.stage()
+def load(ctx):
+    """Raw frame (or, streaming, its chunk source) and its profile, or the cleaned rows from the columnar cache"""
+    print("\nII. DATA CLEANING AND PREPARATION")
+    print("-" * 50)
+
+    # Streaming runs read the cached frame back chunk by chunk, like the CSV
+    cached = ctx.clean_cache.source(ctx.args.chunksize) if ctx.args.stream else ctx.clean_cache.load()
+    if cached is not None:
+        # A cached frame is already clean; the clean stage passes it through
+        raw_rows = ctx.clean_cache.report()['raw_rows']
+        print(f"Loaded cleaned dataset from columnar cache: {paths.relative(ctx.clean_cache.path)}")
+        if ctx.args.stream:
+            print(f"Dataset: cleaned, from {raw_rows} raw records")
+            return Loaded(None, cached, None, raw_rows, None, None)
+        print(f"Dataset Shape: {cached.shape} (cleaned, from {raw_rows} raw records)")
+        return Loaded(cached, None, None, raw_rows, None, None)
+
+    # Load the dataset
+    source = quartiles = users = None
+    with ctx.tracer.span('read_csv') as span:
+        if ctx.args.stream:
+            # One pass over compact, typed chunks with User_IDs already integers builds
+            # the profile, the outlier quartiles (exact value counts, or KLL sketches)
+            # and the distinct-ID bitmap without keeping any chunk; later stages read
+            # the source again
+            source = social_source(ctx.args.data, chunksize=ctx.args.chunksize)
+            profile = ChunkProfile()
+            quartiles = IqrAccumulator(NUMERIC_COLS, approx=ctx.args.approx_quantiles)
+            users = DistinctIds()
+            for chunk in source:
+                profile.update(chunk)
+                quartiles.update(chunk)
+                users.update(chunk['User_ID'])
+            df = None
+        else:
+            df = pd.read_csv(ctx.args.data)
+            profile = ChunkProfile().update(df)
+        span.rows_out = profile.rows
+
+    print(f"Dataset Shape: {profile.shape}")
+    print(f"Columns: {profile.columns}")
+    print(f"Data Types:\n{profile.dtypes}")
+
+    # Initial data overview
+    print(f"\nFirst few rows:")
+    print(profile.head)
+    return Loaded(df, source, profile, profile.rows, quartiles, users)
+
+
+@pipeline.stage('load')
+def clean(ctx, load):
+    """Clean rows as a chunk source, with their count and the sample the scatter plots"""
+    if load.profile is None:
+        if load.frame is None:
+            # --stream from the columnar cache: one pass counts and samples the rows
+            rows, sample = sample_clean(ctx, load.source)
+            print(f"\nRecords after outlier removal: {rows} (from {load.raw_rows})")
+            return Clean(load.source, sample, rows, ctx.clean_cache.key)
+        print(f"\nRecords after outlier removal: {len(load.frame)} (from {load.raw_rows})")
+        return Clean(FrameSource(load.frame, ctx.args.chunksize), load.frame, len(load.frame), None)
+
+    df, profile = load.frame, load.profile
+
+    # 1. Missing Value Analysis
+    print("\n1. Missing Value Analysis:")
+    missing_summary = profile.missing_summary()
+    missing = missing_summary[missing_summary['Missing_Count'] > 0]
+    print(missing if len(missing) else "No missing values")
+
+    # 2. Data Type Validation and Conversion
+    print("\n2. Data Type Validation:")
+    if df is None:
+        # --stream: chunks are parsed straight into the compact dtype plan
+        print("Data types (read in the compact dtype plan):")
+        print(profile.dtypes)
+        print(f"Memory per row: {profile.bytes_per_row:.0f} bytes")
+    else:
+        print("Original data types:")
+        print(df.dtypes)
+
+        # 'U_<n>' IDs become their integer n, App a categorical, counts small integers
+        raw_bytes = bytes_per_row(df)
+        with ctx.tracer.span('encode', rows_in=len(df)):
+            df = apply_dtype_plan(encode_user_ids(df), SOCIAL_DTYPE_PLAN)
+        compact_bytes = bytes_per_row(df)
+
+        print("\nUpdated data types:")
+        print(df.dtypes)
+        print(f"Memory per row: {raw_bytes:.0f} -> {compact_bytes:.0f} bytes "
+              f"({raw_bytes / compact_bytes:.1f}x smaller)")
+
+    # 3. Outlier Detection
+    print("\n3. Outlier Detection:")
+
+    # IQR bounds for all columns at once: from the quartiles gathered while streaming,
+    # else exact quantiles. Streaming, the outliers are counted in a second pass
+    chunks = load.source if df is None else frame_chunks(df, ctx.args.chunksize)
+    with ctx.tracer.span('outlier_bounds', rows_in=load.raw_rows):
+        if load.quartiles is not None:
+            outlier_bounds = load.quartiles.bounds()
+        else:
+            outlier_bounds = iqr_bounds(df, NUMERIC_COLS)
+        outlier_summary = summarize_outliers(chunks, outlier_bounds)
+
+    print("Outlier Summary:")
+    for col, info in outlier_summary.iterrows():
+        print(f"  {col}: {int(info['outlier_count'])} outliers ({info['outlier_percentage']:.1f}%) "
+              f"bounds [{info['lower_bound']:.2f}, {info['upper_bound']:.2f}]")
+
+    # 4. Data Consistency Checks
+    print("\n4. Data Consistency Checks:")
+
+    # Repeated IDs would weight some users twice; integer IDs hash without touching
+    # strings, and a streamed export is counted from the bitmap built while reading it
+    rows = load.raw_rows
+    users = len(load.users) if df is None else df['User_ID'].nunique()
+    apps = profile.categories['App'] if df is None else df['App'].cat.categories
+    print(f"Users: {users} distinct IDs ({rows - users} repeated)")
+    print(f"Apps: {', '.join(str(app) for app in apps)}")
+    print(f"Daily Minutes range: {profile.minimum['Daily_Minutes_Spent']} - "
+          f"{profile.maximum['Daily_Minutes_Spent']} minutes")
+    print(f"Posts per Day range: {profile.minimum['Posts_Per_Day']} - {profile.maximum['Posts_Per_Day']}")
+    print(f"Likes per Day range: {profile.minimum['Likes_Per_Day']} - {profile.maximum['Likes_Per_Day']}")
+    print(f"Follows per Day range: {profile.minimum['Follows_Per_Day']} - {profile.maximum['Follows_Per_Day']}")
+
+    # Create cleaned dataset (remove outliers for analysis) with one combined mask,
+    # plus the usage bands the single-pass summary in Section III needs
+    with ctx.tracer.span('filter_outliers', rows_in=load.raw_rows) as span:
+        if df is None:
+            # --stream: the clean rows stay a chunk source that cleans each CSV chunk
+            # as it is read; one pass counts them, samples them for the scatter and
+            # writes them to the columnar cache
+            source = load.source.map(lambda chunk: clean_chunk(chunk, outlier_summary))
+            with ctx.clean_cache.writer(report={'raw_rows': load.raw_rows}) as writer:
+                rows, sample = sample_clean(ctx, source, writer)
+            result = Clean(source, sample, rows, ctx.clean_cache.key)
+        else:
+            df_clean = clean_chunk(df, outlier_summary)
+            ctx.clean_cache.store(df_clean, report={'raw_rows': load.raw_rows})
+            result = Clean(FrameSource(df_clean, ctx.args.chunksize), df_clean, len(df_clean), None)
+        span.rows_out = result.rows
+
+    print(f"\nRecords after outlier removal: {result.rows} (from {load.raw_rows})")
+    return result
+
+
+def sample_clean(ctx, source, writer=None):
+    """Count the clean rows of ``source`` and draw the per-app scatter sample, in one pass
+
+    The sample holds ``SCATTER_MAX_POINTS`` rows with at least one per app;
+    chunks also go to ``writer`` as they pass.
+    """
+    reservoir = sampling.StratifiedReservoir(SCATTER_MAX_POINTS, floor=1, seed=ctx.args.seed)
+    rows = 0
+    for chunk in source:
+        reservoir.update(chunk, chunk[['App']])
+        rows += len(chunk)
+        if writer is not None:
+            writer.write(chunk)
+    return rows, reservoir.sample().drop(columns=[sampling.STRATUM_COLUMN, sampling.WEIGHT_COLUMN])
+
+
+def clean_chunk(chunk, outlier_summary):
+    """Rows in the compact dtypes, outliers of the filtered columns dropped and Usage_Band added"""
+    df = apply_dtype_plan(encode_user_ids(chunk), SOCIAL_DTYPE_PLAN)
+    df_clean = filter_outliers(df, outlier_summary, threshold=OUTLIER_THRESHOLD)
+    df_clean['Usage_Band'] = pd.cut(df_clean['Daily_Minutes_Spent'], bins=USAGE_BINS, labels=USAGE_LABELS)
+    return df_clean
+
+
+# ============================================================================
+# III. EXPLORATORY DATA ANALYSIS (EDA)
+# ============================================================================
+
+@pipeline.stage('clean')
+def aggregate(ctx, clean):
+    print("\nIII. EXPLORATORY DATA ANALYSIS (EDA)")
+    print("-" * 50)
+
+    # One fused scan of the clean chunks yields describe(), corr(), every per-app and per-band
+    # count/sum/mean/std (App is categorical, so its codes are bincounted
+    # directly) and the value counts the histograms are binned from
+    eda_stats = SummaryAccumulator(NUMERIC_COLS, groups=EDA_GROUPS)
+    value_counts = ValueCounts(HISTOGRAM_BINS)
+    for chunk in clean.source:
+        eda_stats.update(chunk)
+        value_counts.update(chunk)
+    group_table = eda_stats.group_table()
+
+    # 1. Descriptive Statistics
+    print("\n1. Descriptive Statistics:")
+    summary_stats = eda_stats.describe()
+    print(summary_stats)
+
+    # 2. Engagement Ratios: every app's ratios from its sums, no second pass
+    print("\n2. Engagement Ratios by App (ratio of totals):")
+    ratios = ratio_table(group_table, 'App', RATIOS)
+    means = dict(zip(NUMERIC_COLS, eda_stats.mean))
+    overall = pd.Series({name: scale * means[numerator] / means[denominator] if means[denominator] else np.nan
+                         for name, (numerator, denominator, scale) in RATIOS.items()}, name='All apps')
+    print(pd.concat([ratios, overall.to_frame().T]).to_string(float_format=lambda value: f'{value:.2f}'))
+
+    histograms = {col: value_counts.histogram(col, bins) for col, bins in HISTOGRAM_BINS.items()}
+
+    return Aggregates(eda_stats, group_table, summary_stats, eda_stats.corr(), histograms, ratios, overall)
+
+
+# Figure stages return a FigureJob (name, render function, precomputed data);
+# main() renders every job the run produced together, in parallel
+
+@pipeline.stage('aggregate')
+def engagement_distribution(ctx, aggregate):
+    # 3. Distribution Analysis
+    print("\n3. Distribution Analysis:")
+
+    histograms = aggregate.histograms
+    return FigureJob('engagement_distribution', figures.engagement_distribution, {
+        'minutes': histograms['Daily_Minutes_Spent'],
+        'posts': histograms['Posts_Per_Day'],
+        'likes': histograms['Likes_Per_Day'],
+        'follows': histograms['Follows_Per_Day'],
+    })
+
+
+@pipeline.stage('aggregate')
+def correlation_heatmap(ctx, aggregate):
+    # 4. Correlation Analysis
+    print("\n4. Correlation Analysis:")
+
+    return FigureJob('correlation_heatmap', figures.correlation_heatmap, {
+        'correlation_matrix': aggregate.correlation,
+    })
+
+
+@pipeline.stage('clean', 'aggregate')
+def minutes_vs_likes(ctx, clean, aggregate):
+    # 5. Key Relationships Analysis
+    print("\n5. Key Relationships Analysis:")
+
+    # The trend comes from the full-data co-moments; only the plotted points are sampled
+    x, y = NUMERIC_COLS.index('Daily_Minutes_Spent'), NUMERIC_COLS.index('Likes_Per_Day')
+    covariance, mean = aggregate.stats.covariance(), aggregate.stats.mean
+    slope = covariance[x, y] / covariance[x, x]
+    sample = stratified_sample(clean.sample, 'App', SCATTER_MAX_POINTS, seed=ctx.args.seed)
+    return FigureJob('minutes_vs_likes', figures.minutes_vs_likes, {
+        'minutes': sample['Daily_Minutes_Spent'].to_numpy(),
+        'likes': sample['Likes_Per_Day'].to_numpy(),
+        'apps': sample['App'].reset_index(drop=True),
+        'trend': np.array([slope, mean[y] - slope * mean[x]]),
+    })
+
+
+@pipeline.stage('aggregate')
+def usage_by_app(ctx, aggregate):
+    # 6. Platform Analysis
+    print("\n6. Platform Analysis:")
+
+    group_table = aggregate.group_table
+    return FigureJob('usage_by_app', figures.usage_by_app, {
+        'minutes': select(group_table, 'App', 'Daily_Minutes_Spent'),
+        'posts': select(group_table, 'App', 'Posts_Per_Day'),
+        'likes': select(group_table, 'App', 'Likes_Per_Day'),
+        'follows': select(group_table, 'App', 'Follows_Per_Day'),
+    }, vector=True)
+
+
+@pipeline.stage('aggregate')
+def engagement_ratios_by_app(ctx, aggregate):
+    return FigureJob('engagement_ratios_by_app', figures.engagement_ratios_by_app, {
+        'ratios': aggregate.ratios,
+        'overall': aggregate.overall_ratios,
+    }, vector=True)
+
+
+@pipeline.stage('aggregate')
+def engagement_by_usage_band(ctx, aggregate):
+    # 7. Usage Intensity Analysis
+    group_table = aggregate.group_table
+    return FigureJob('engagement_by_usage_band', figures.engagement_by_usage_band, {
+        'posts': select(group_table, 'Usage_Band', 'Posts_Per_Day'),
+        'likes': select(group_table, 'Usage_Band', 'Likes_Per_Day'),
+        'follows': select(group_table, 'Usage_Band', 'Follows_Per_Day'),
+    }, vector=True)
+
+
+# ============================================================================
+# IV. STATISTICAL ANALYSIS AND MODELING
+# ============================================================================
+
+def one_way_anova(group_table, key, column):
+    """(F, p, eta squared) across ``key``'s groups from their counts, means and stds"""
+    count = select(group_table, key, column, 'count').to_numpy()
+    mean = select(group_table, key, column, 'mean').to_numpy()
+    std = np.nan_to_num(select(group_table, key, column, 'std').to_numpy())
+    n, k = count.sum(), len(count)
+    grand_mean = (count * mean).sum() / n
+    between = (count * (mean - grand_mean) ** 2).sum()
+    within = ((count - 1) * std ** 2).sum()
+    f = (between / (k - 1)) / (within / (n - k))
+    return float(f), float(stats.f.sf(f, k - 1, n - k)), float(between / (between + within))
+
+
+def engagement_tests(frame, group_table):
+    """Time-vs-likes correlations and per-metric differences between apps, as plain floats"""
+    minutes, likes = decimal_values(frame['Daily_Minutes_Spent']), decimal_values(frame['Likes_Per_Day'])
+    pearson_corr, pearson_p = stats.pearsonr(minutes, likes)
+    # Rank tests from value-frequency tables: O(n + distinct values), no full sort
+    spearman_corr, spearman_p = ranks.spearman(ranks.FrequencyTable.from_arrays(minutes, likes))
+    codes = frame['App'].cat.codes.to_numpy()
+    valid = codes >= 0
+    by_app = {'Metric': [], 'F': [], 'ANOVA p': [], 'Eta²': [], 'H': [], 'Kruskal p': []}
+    for col in NUMERIC_COLS:
+        # ANOVA from the fused pass's group moments; Kruskal-Wallis from one value x app table
+        f, f_p, eta_squared = one_way_anova(group_table, 'App', col)
+        h, h_p = ranks.kruskal(ranks.FrequencyTable.from_codes(decimal_values(frame[col])[valid], codes[valid]))
+        for column, value in zip(by_app, [col, f, f_p, eta_squared, h, h_p]):
+            by_app[column].append(value)
+    return {
+        'pearson_corr': float(pearson_corr),
+        'pearson_p': float(pearson_p),
+        'spearman_corr': float(spearman_corr),
+        'spearman_p': float(spearman_p),
+        'by_app': by_app,
+    }
+
+
+def streaming_engagement_tests(chunks, aggregate):
+    """``engagement_tests`` without holding the clean rows
+
+    The Spearman and Kruskal-Wallis tables are built per chunk and merged, with
+    App codes taken against the apps of the group table (each chunk infers its
+    own categories); Pearson comes from the aggregate pass's co-moments.
+    """
+    apps = select(aggregate.group_table, 'App', NUMERIC_COLS[0], 'count').index
+    correlation, by_metric = None, {col: None for col in NUMERIC_COLS}
+    for chunk in chunks:
+        minutes, likes = decimal_values(chunk['Daily_Minutes_Spent']), decimal_values(chunk['Likes_Per_Day'])
+        paired = ~np.isnan(minutes) & ~np.isnan(likes)
+        table = ranks.FrequencyTable.from_arrays(minutes[paired], likes[paired])
+        correlation = table if correlation is None else correlation.merge(table)
+        codes = pd.Categorical(chunk['App'], categories=apps).codes
+        for col in NUMERIC_COLS:
+            values = decimal_values(chunk[col])
+            valid = (codes >= 0) & ~np.isnan(values)
+            table = ranks.FrequencyTable.from_codes(values[valid], codes[valid])
+            by_metric[col] = table if by_metric[col] is None else by_metric[col].merge(table)
+    spearman_corr, spearman_p = ranks.spearman(correlation)
+
+    n = aggregate.stats.n
+    pearson_corr = aggregate.correlation.loc['Daily_Minutes_Spent', 'Likes_Per_Day']
+    pearson_p = 2 * stats.t.sf(abs(pearson_corr) * np.sqrt((n - 2) / (1 - pearson_corr ** 2)), n - 2)
+    by_app = {'Metric': [], 'F': [], 'ANOVA p': [], 'Eta²': [], 'H': [], 'Kruskal p': []}
+    for col in NUMERIC_COLS:
+        f, f_p, eta_squared = one_way_anova(aggregate.group_table, 'App', col)
+        h, h_p = ranks.kruskal(by_metric[col])
+        for column, value in zip(by_app, [col, f, f_p, eta_squared, h, h_p]):
+            by_app[column].append(value)
+    return {
+        'pearson_corr': float(pearson_corr),
+        'pearson_p': float(pearson_p),
+        'spearman_corr': float(spearman_corr),
+        'spearman_p': float(spearman_p),
+        'by_app': by_app,
+    }
+
+
+@pipeline.stage('clean', 'aggregate', name='tests')
+def run_statistical_tests(ctx, clean, aggregate):
+    print("\nIV. STATISTICAL ANALYSIS AND MODELING")
+    print("-" * 50)
+
+    # 1. Statistical Tests
+    print("\n1. Statistical Tests:")
+
+    # Streaming, no clean column is held: one more pass over the chunks builds
+    # the rank tables and the rest comes from the aggregate pass
+    if ctx.args.stream:
+        tests = streaming_engagement_tests
+        compute = lambda: streaming_engagement_tests(clean.source, aggregate)
+    else:
+        tests = engagement_tests
+        compute = lambda: engagement_tests(clean.source.read(TEST_COLUMNS), aggregate.group_table)
+    tests_key = ctx.build_cache.key(code_fingerprint(tests), code_fingerprint(one_way_anova),
+                                    code_fingerprint(ranks.kruskal), code_fingerprint(ranks.FrequencyTable.merge),
+                                    source_fingerprint(clean.source, TEST_COLUMNS, clean.key))
+    test_results = ctx.build_cache.memoize('statistical_tests', tests_key, compute)
+
+    print(f"Correlation Analysis (Daily Minutes vs Likes):")
+    print(f"  Pearson Correlation (parametric):")
+    print(f"    Correlation: {test_results['pearson_corr']:.4f}")
+    print(f"    P-value: {test_results['pearson_p']:.4f}")
+    print(f"    Significant: {'Yes' if test_results['pearson_p'] < 0.05 else 'No'}")
+    print(f"  Spearman Correlation (non-parametric):")
+    print(f"    Correlation: {test_results['spearman_corr']:.4f}")
+    print(f"    P-value: {test_results['spearman_p']:.4f}")
+    print(f"    Significant: {'Yes' if test_results['spearman_p'] < 0.05 else 'No'}")
+
+    by_app = pd.DataFrame(test_results['by_app']).set_index('Metric')
+    print(f"\nDifferences between Apps (one-way ANOVA and Kruskal-Wallis):")
+    print(by_app.to_string(float_format=lambda value: f'{value:.4f}'))
+    return test_results
+
+
+@pipeline.stage('clean')
+def regression(ctx, clean):
+    # 2. Linear Regression Model
+    print("\n2. Linear Regression Model:")
+
+    # Test users are chosen by a hash of their integer ID: no permutation of
+    # every row is held, and a user stays on the same side as the export grows
+    split = HashSplit('User_ID', test_size=TEST_SIZE, seed=SPLIT_SEED)
+
+    # Fit model out of core: train/test Gram matrices (X'X, X'y, y'y, n) are
+    # accumulated over the clean chunks (with --stream, CSV chunks filtered with
+    # the stored outlier bounds), then a second pass collects test residuals
+    model, fit, (mse, r2), residuals = fit_streaming(clean.source, MODEL_FEATURES, MODEL_TARGET, split,
+                                                     workers=ctx.args.workers)
+
+    print(f"Model Performance ({int(model.train.n)} train / {int(model.test.n)} test users):")
+    print(f"  MSE: {mse:.4f}")
+    print(f"  R²: {r2:.4f}")
+
+    # Model coefficients
+    coefficients = pd.DataFrame({
+        'Feature': fit.features,
+        'Coefficient': fit.coef
+    })
+    print(f"\nModel Coefficients:")
+    print(coefficients)
+    return Regression(fit.features, MODEL_TARGET, fit.coef, fit.intercept, mse, r2, model.train, residuals)
+
+
+@pipeline.stage('clean')
+def cross_validation(ctx, clean):
+    # Repeated k-fold scores instead of one train/test draw; folds are downdated
+    # from one set of Gram matrices rather than refit from scratch
+    args = ctx.args
+    model_columns = MODEL_FEATURES + [MODEL_TARGET]
+    options = {'folds': args.cv_folds, 'repeats': args.cv_repeats, 'seed': args.seed, 'workers': args.workers}
+    if args.stream:
+        # Streaming, each repeat's folds come from a hash of the User_ID and
+        # the fold Gram matrices are accumulated chunk by chunk in one pass
+        method = [cross_validate_streaming, hashed_fold_ids]
+        run = lambda: cross_validate_streaming(clean.source, MODEL_TARGET, FEATURE_SETS, 'User_ID', **options)
+    else:
+        method = [cross_validate]
+        run = lambda: cross_validate(clean.source.read(model_columns), MODEL_TARGET, FEATURE_SETS, **options)
+    cv_key = ctx.build_cache.key([code_fingerprint(func) for func in method], code_fingerprint(summarize),
+                                 source_fingerprint(clean.source, model_columns, clean.key),
+                                 FEATURE_SETS, args.cv_folds, args.cv_repeats, args.seed)
+    table = ctx.build_cache.memoize('cross_validation', cv_key,
+                                    lambda: summarize(run()).reset_index().to_dict(orient='list'))
+    table = pd.DataFrame(table, columns=['Feature Set', 'MSE Mean', 'MSE Std', 'R² Mean', 'R² Std'])
+    print(f"\nCross-validated Performance ({args.cv_folds}-fold x {args.cv_repeats} repeats):")
+    print(table.set_index('Feature Set').to_string(float_format=lambda value: f'{value:.4f}'))
+    return table
+
+
+@pipeline.stage('regression')
+def model_diagnostics(ctx, regression):
+    # 3. Model Diagnostics
+    print("\n3. Model Diagnostics:")
+
+    # Residuals analysis (test rows, sampled down past DEFAULT_MAX_RESIDUALS)
+    residuals = regression.residuals.residuals
+
+    return FigureJob('model_diagnostics', figures.model_diagnostics, {
+        'y_pred': regression.residuals.predicted,
+        'residuals': residuals,
+        'residuals_qq': stats.probplot(residuals, dist="norm"),
+        'residuals_hist': figures.histogram(residuals, bins=20),
+    })
+
+
+FIGURES = ['engagement_distribution', 'correlation_heatmap', 'minutes_vs_likes', 'usage_by_app',
+           'engagement_ratios_by_app', 'engagement_by_usage_band', 'model_diagnostics']
+
+
+@pipeline.stage(*FIGURES, name='figures')
+def all_figures(ctx, **jobs):
+    """Every static figure; `--only figures` regenerates just the images"""
+    return list(jobs.values())
+
+
+@pipeline.stage('regression')
+def vif(ctx, regression):
+    # Multicollinearity check from the training Gram matrix of the regression pass; no rescan
+    gram = regression.gram
+    vif_key = ctx.build_cache.key(code_fingerprint(vif_table), code_fingerprint(Gram.vif), gram.matrix)
+    vif_results = pd.DataFrame(ctx.build_cache.memoize(
+        'vif', vif_key, lambda: vif_table(gram).to_dict(orient='list')), columns=['Variable', 'VIF'])
+    print(f"\nVariance Inflation Factors:")
+    print(vif_results)
+    return vif_results
+
+
+@pipeline.stage('aggregate', 'regression', 'vif')
+def data_api(ctx, aggregate, regression, vif):
+    # 4. Data API: small pre-aggregated JSON files for the blog's React charts
+    data_sizes = write_data_api(ctx.data_dir, {
+        'summary': table_payload(aggregate.summary),
+        'groups': group_payload(aggregate.group_table),
+        'histograms': aggregate.histograms,
+        'correlation': matrix_payload(aggregate.correlation),
+        'ratios': table_payload(pd.concat([aggregate.ratios, aggregate.overall_ratios.to_frame().T])),
+        'regression': {
+            'target': regression.target,
+            'features': regression.features,
+            'coefficients': regression.coef,
+            'intercept': regression.intercept,
+            'mse': regression.mse,
+            'r2': regression.r2,
+            'vif': dict(zip(vif['Variable'], vif['VIF'])),
+        },
+    })
+    print(f"\nData API: {len(data_sizes)} JSON files, {sum(data_sizes.values()) / 1024:.1f} KB in {paths.relative(ctx.data_dir)}")
+    return data_sizes
+
+
+# ============================================================================
+# V. ANALYSIS AND INTERPRETATION
+# ============================================================================
+
+@pipeline.stage('aggregate', 'tests', 'regression')
+def report(ctx, aggregate, tests, regression):
+    # Use the non-parametric results (Spearman, Kruskal-Wallis) for interpretation
+    correlation = tests['spearman_corr']
+    spearman_p = tests['spearman_p']
+    by_app = pd.DataFrame(tests['by_app']).set_index('Metric')
+
+    print("\nV. ANALYSIS AND INTERPRETATION")
+    print("-" * 50)
+
+    # 1. Key Findings Summary
+    print("\n1. Key Findings Summary:")
+    strength = ranks.correlation_strength(correlation)
+    print(f"Time spent - likes received correlation strength: {strength} ({correlation:.3f})")
+    for metric, row in by_app.iterrows():
+        print(f"App effect on {metric} (eta squared): {row['Eta²']:.3f}")
+
+    ratios = aggregate.ratios
+    for name in ratios.columns:
+        print(f"{name}: highest on {ratios[name].idxmax()} ({ratios[name].max():.2f}), "
+              f"lowest on {ratios[name].idxmin()} ({ratios[name].min():.2f})")
+
+    # 2. Business Impact Translation
+    print("\n2. Business Impact Translation:")
+
+    baseline_likes = aggregate.stats.mean[NUMERIC_COLS.index(MODEL_TARGET)]
+    print(f"Baseline likes per day: {baseline_likes:.2f}")
+
+    for feature, coef in zip(regression.features, regression.coef):
+        impact = business_impact(coef, 1, baseline_likes)
+        print(f"  {feature}: {impact}")
+
+    # 3. Statistical Significance Summary
+    print("\n3. Statistical Significance Summary:")
+    significant_findings = []
+
+    if spearman_p < 0.05:
+        significant_findings.append("Correlation between time spent and likes received (Spearman correlation)")
+    for metric, row in by_app.iterrows():
+        if row['Kruskal p'] < 0.05:
+            significant_findings.append(f"Differences in {metric} between apps (Kruskal-Wallis test)")
+
+    print("Statistically significant findings (using non-parametric tests):")
+    for finding in significant_findings:
+        print(f"  ✓ {finding}")
+    if not significant_findings:
+        print("  none at the 5% level")
+
+    # ============================================================================
+    # VI. KEY INSIGHTS AND NEXT STEPS
+    # ============================================================================
+
+    print("\nVI. KEY INSIGHTS AND NEXT STEPS")
+    print("-" * 50)
+
+    # 1. Key Insights
+    print("\n1. Key Insights:")
+    largest = by_app['Eta²'].idxmax()
+    insights = [
+        f"Time spent and likes received show a {strength} correlation ({correlation:.3f})",
+        f"Apps differ most in {largest} (eta squared {by_app.loc[largest, 'Eta²']:.3f}, "
+        f"Kruskal-Wallis p = {by_app.loc[largest, 'Kruskal p']:.4f})",
+        f"Engagement models explain {regression.r2:.1%} of the variance in daily likes on held-out users",
+        f"{len(significant_findings)} of {len(by_app) + 1} non-parametric tests are significant at the 5% level",
+    ]
+
+    for i, insight in enumerate(insights, 1):
+        print(f"  {i}. {insight}")
+
+    # 2. Limitations
+    print("\n2. Limitations:")
+    limitations = {
+        "data_quality": "Self-reported daily averages, one row per user",
+        "model_assumptions": "Linear relationships assumed",
+        "external_validity": "Seven platforms; results may not generalize to other apps or populations",
+        "temporal_stability": "Cross-sectional snapshot, no trends over time",
+        "causality": "Correlation does not imply causation"
+    }
+
+    for limitation, description in limitations.items():
+        print(f"  • {limitation}: {description}")
+
+    # 3. Recommendations
+    print("\n3. Recommendations:")
+    recommendations = [
+        "Compare engagement ratios rather than raw totals when ranking platforms",
+        "Collect per-post engagement to separate reach from posting frequency",
+        "Track users over time to measure how usage changes engagement",
+        "Add demographics to explain the variation platforms do not",
+    ]
+
+    for i, rec in enumerate(recommendations, 1):
+        print(f"  {i}. {rec}")
+    return significant_findings
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not cli.prepare(pipeline, args, import_profiler):
+        return
+    output_dir, data_dir = cli.output_dirs(ANALYSIS, args.output_root)
+
+    # The cleaned frame is cached as Parquet, keyed on the source CSV and every cleaning parameter
+    clean_key = fingerprint(file_fingerprint(args.data), {
+        'stream': args.stream,
+        'approx_quantiles': args.approx_quantiles,
+        'outlier_columns': NUMERIC_COLS,
+        'outlier_threshold': OUTLIER_THRESHOLD,
+        'usage_bins': USAGE_BINS,
+        'usage_labels': USAGE_LABELS,
+        'dtype_plan': SOCIAL_DTYPE_PLAN,
+    }, [code_fingerprint(func) for func in (iqr_bounds, IqrAccumulator.bounds, filter_outliers,
+                                            encode_user_ids, apply_dtype_plan)])
+
+    ctx = SimpleNamespace(
+        args=args,
+        tracer=cli.start_tracer(args),
+        output_dir=output_dir,
+        data_dir=data_dir,
+        # Outputs whose data, parameters, code and library versions are unchanged are skipped
+        build_cache=BuildCache(output_dir, enabled=not args.no_cache),
+        clean_cache=ParquetCache(columnar.cache_path(ANALYSIS, args.data), clean_key,
+                                 enabled=not args.no_cache),
+    )
+
+    cli.banner("SOCIAL MEDIA USAGE ANALYSIS - PROFESSIONAL FRAMEWORK")
+    results = cli.run_stages(pipeline, ctx, args.only, import_profiler)
+
+    # Figures are rendered together, on a process pool, once the graph has run
+    cli.write_figures(ctx, [results[name] for name in FIGURES if name in results], import_profiler)
+    cli.finish(ctx, ANALYSIS, import_profiler, argv)
+
+
+if __name__ == '__main__':
+    main()
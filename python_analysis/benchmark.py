@@ -0,0 +1,99 @@
+"""Scaling benchmark: time every stage of an analysis on synthetic data.
+
+    python python_analysis/benchmark.py                          # 1e3, 1e4, 1e5 rows
+    python python_analysis/benchmark.py --rows 1e3 1e6 --repeat 3
+    python python_analysis/benchmark.py --save-baseline          # store as the baseline
+    python python_analysis/benchmark.py -- --stream --workers 1  # script arguments
+
+Results go to benchmarks/<analysis>.latest.json and are compared with
+benchmarks/<analysis>.baseline.json when it exists; the exit status is 1
+if any stage regressed past the threshold.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engine import bench, paths, runner
+
+
+def row_count(value):
+    """Accept 1000, 1e3 or 1_000"""
+    try:
+        rows = float(value.replace('_', ''))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a row count: {value!r}")
+    if rows != int(rows) or not 1 <= rows <= bench.MAX_ROWS:
+        raise argparse.ArgumentTypeError(f"row counts must be whole numbers from 1 to {bench.MAX_ROWS:.0e}")
+    return int(rows)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark an analysis on synthetic data")
+    parser.add_argument('analysis', nargs='?', default='sleep_health_and_lifestyle',
+                        choices=sorted(bench.GENERATORS), help="Analysis to benchmark")
+    parser.add_argument('--rows', nargs='+', type=row_count, default=list(bench.DEFAULT_ROWS),
+                        help="Row counts to run (1e3 ... 1e8)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per row count; the fastest is kept")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument('--output', help="Results file (default: benchmarks/<analysis>.latest.json)")
+    parser.add_argument('--baseline', help="Baseline to compare with (default: benchmarks/<analysis>.baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="Also store these results as the baseline")
+    parser.add_argument('--threshold', type=float, default=bench.DEFAULT_THRESHOLD,
+                        help="Relative slowdown flagged as a regression (0.25 = 25%%)")
+    parser.add_argument('--min-seconds', type=float, default=bench.MIN_SECONDS,
+                        help="Ignore slowdowns smaller than this many seconds")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    script_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, script_args = argv[:split], argv[split + 1:]
+    args = parse_args(argv)
+    analysis, = runner.select([args.analysis])
+
+    def progress(rows, attempt, run):
+        print(f"{rows:>11,} rows  run {attempt + 1}/{args.repeat}  {run['wall_seconds']:8.2f}s  "
+              f"peak RSS {(run['peak_rss_bytes'] or 0) / 2 ** 20:8.1f} MB", flush=True)
+
+    results = bench.benchmark(analysis, sorted(set(args.rows)), repeat=args.repeat, seed=args.seed,
+                              args=script_args, progress=progress)
+
+    print(f"\nSlowest spans per row count:")
+    for rows, size in results['sizes'].items():
+        spans = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in bench.slowest(size))
+        print(f"  {int(rows):>11,}  {spans}")
+
+    output = args.output or bench.results_path(analysis.name)
+    targets = [output] + ([bench.results_path(analysis.name, 'baseline')] if args.save_baseline else [])
+    for path in targets:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    print(f"\nResults written to {', '.join(paths.relative(os.path.abspath(path)) for path in targets)}")
+
+    baseline_path = args.baseline or bench.results_path(analysis.name, 'baseline')
+    if args.save_baseline or not os.path.exists(baseline_path):
+        return 0
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    regressions = bench.compare(results, baseline, threshold=args.threshold, min_seconds=args.min_seconds)
+    if not regressions:
+        print(f"No regressions against {paths.relative(os.path.abspath(baseline_path))} "
+              f"(threshold {args.threshold:.0%})")
+        return 0
+    print(f"\nRegressions against {paths.relative(os.path.abspath(baseline_path))} "
+          f"(threshold {args.threshold:.0%}):")
+    for regression in regressions:
+        print(f"  {regression.rows:>11,} rows  {regression.span:<40} "
+              f"{regression.baseline:8.3f}s -> {regression.current:8.3f}s  ({regression.ratio:.2f}x)")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Shared building blocks for the python_analysis pipelines."""
@@ -0,0 +1,144 @@
+"""Scaling benchmarks of an analysis over synthetic data, with baselines.
+
+For each row count the benchmark writes a synthetic export (kept under
+``data/.cache/synthetic`` and reused by later runs with the same seed), runs
+the analysis script on it in a fresh process with ``--no-cache`` and its
+outputs redirected to a scratch directory, and reads the run's trace: wall
+and CPU time, peak RSS and row counts for every stage, step and figure.
+Repeats keep the fastest time per span, the usual way to damp noise.
+
+Results are plain JSON keyed by row count and span (``stage:load``,
+``figure:correlation_heatmap``, ...). ``compare`` flags spans that got
+slower than a stored baseline by more than a relative threshold, ignoring
+differences too small to measure reliably.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+from . import paths, synthetic
+
+DEFAULT_ROWS = (1_000, 10_000, 100_000)
+MAX_ROWS = 100_000_000
+DEFAULT_THRESHOLD = 0.25
+MIN_SECONDS = 0.05
+SYNTHETIC_DIR = os.path.join(paths.CACHE_DIR, 'synthetic')
+RESULTS_DIR = os.path.join(paths.PYTHON_ROOT, 'benchmarks')
+
+# Synthetic data writers per analysis: write(path, rows, seed=...)
+GENERATORS = {
+    'sleep_health_and_lifestyle': synthetic.write_sleep_csv,
+    'social_media_usage': synthetic.write_social_csv,
+}
+
+Regression = namedtuple('Regression', ['rows', 'span', 'baseline', 'current', 'ratio'])
+
+
+def dataset(analysis, rows, seed=0, directory=SYNTHETIC_DIR):
+    """Path of the synthetic export for ``rows`` rows, generating it if missing"""
+    if analysis not in GENERATORS:
+        raise ValueError(f"No synthetic data generator for {analysis!r}")
+    if not 1 <= rows <= MAX_ROWS:
+        raise ValueError(f"Row counts must be between 1 and {MAX_ROWS:,}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{analysis}-{rows}-seed{seed}.csv')
+    if not os.path.exists(path):
+        temporary = path + '.tmp'
+        GENERATORS[analysis](temporary, rows, seed=seed)
+        os.replace(temporary, path)
+    return path
+
+
+def run_once(analysis, data_path, args=()):
+    """Run the script once on ``data_path``; returns its trace spans and totals"""
+    with tempfile.TemporaryDirectory(prefix='bench-') as output_root:
+        command = [sys.executable, analysis.path, '--data', data_path, '--output-root', output_root,
+                   '--no-cache', *args]
+        started = time.perf_counter()
+        completed = subprocess.run(command, cwd=os.path.dirname(analysis.path),
+                                   capture_output=True, text=True)
+        wall = time.perf_counter() - started
+        if completed.returncode != 0:
+            raise RuntimeError(f"{analysis.name} failed on {data_path}:\n{completed.stderr[-2000:]}")
+        trace_path = os.path.join(output_root, 'graphs', analysis.name + '.trace.json')
+        with open(trace_path) as handle:
+            trace = json.load(handle)
+    spans = {f"{span['category']}:{span['name']}": {
+        'wall_seconds': span['wall_seconds'],
+        'cpu_seconds': span['cpu_seconds'],
+        'peak_rss_bytes': span['peak_rss_bytes'],
+        'rows_out': span['rows_out'],
+    } for span in trace['spans']}
+    return {'wall_seconds': round(wall, 6), 'peak_rss_bytes': trace['peak_rss_bytes'], 'spans': spans}
+
+
+def _fastest(runs):
+    """Merge repeats: minimum times, maximum memory"""
+    merged = {'wall_seconds': min(run['wall_seconds'] for run in runs),
+              'peak_rss_bytes': max(run['peak_rss_bytes'] or 0 for run in runs) or None,
+              'spans': {}}
+    for name in runs[0]['spans']:
+        samples = [run['spans'][name] for run in runs if name in run['spans']]
+        merged['spans'][name] = {
+            'wall_seconds': min(sample['wall_seconds'] for sample in samples),
+            'cpu_seconds': min(sample['cpu_seconds'] for sample in samples),
+            'peak_rss_bytes': max(sample['peak_rss_bytes'] or 0 for sample in samples) or None,
+            'rows_out': samples[0]['rows_out'],
+        }
+    return merged
+
+
+def benchmark(analysis, rows=DEFAULT_ROWS, repeat=1, seed=0, args=(), progress=None):
+    """Results document for ``analysis`` at every row count in ``rows``"""
+    sizes = {}
+    for count in rows:
+        data_path = dataset(analysis.name, count, seed)
+        runs = []
+        for attempt in range(repeat):
+            runs.append(run_once(analysis, data_path, args))
+            if progress is not None:
+                progress(count, attempt, runs[-1])
+        sizes[str(count)] = _fastest(runs)
+    return {
+        'analysis': analysis.name,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpus': os.cpu_count()},
+        'seed': seed,
+        'repeat': repeat,
+        'args': list(args),
+        'sizes': sizes,
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_seconds=MIN_SECONDS):
+    """Spans (and run totals) slower than the baseline by more than ``threshold``"""
+    regressions = []
+    for count, current in results['sizes'].items():
+        previous = baseline['sizes'].get(count)
+        if previous is None:
+            continue
+        pairs = [('total', previous['wall_seconds'], current['wall_seconds'])]
+        pairs.extend((name, previous['spans'][name]['wall_seconds'], span['wall_seconds'])
+                     for name, span in current['spans'].items() if name in previous['spans'])
+        for name, before, after in pairs:
+            if after - before > min_seconds and after > before * (1 + threshold):
+                regressions.append(Regression(int(count), name, before, after,
+                                              after / before if before else float('inf')))
+    return sorted(regressions, key=lambda regression: (regression.rows, -regression.ratio))
+
+
+def results_path(analysis, kind='latest', directory=RESULTS_DIR):
+    """``benchmarks/<analysis>.<kind>.json`` (kind: 'latest' or 'baseline')"""
+    return os.path.join(directory, f'{analysis}.{kind}.json')
+
+
+def slowest(size, top=5):
+    """The ``top`` slowest spans of one row count's results, as (name, seconds)"""
+    spans = [(name, span['wall_seconds']) for name, span in size['spans'].items()]
+    return sorted(spans, key=lambda item: item[1], reverse=True)[:top]
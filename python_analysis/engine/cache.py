@@ -0,0 +1,183 @@
+"""Content-addressed incremental build cache for analysis outputs.
+
+Every output (a figure, the interactive HTML, a table of statistical
+results) gets a key: a SHA-256 over its input data, its parameters, the
+source of the code that produces it and the versions of the libraries
+involved. The manifest maps output names to their last key; when a key is
+unchanged and the files still exist the output is skipped, so unchanged
+PNGs are neither re-rendered nor rewritten.
+
+The manifest is a JSON file stored next to the output directory
+(``<output_dir>.build-cache.json``) so CI can keep it between runs.
+"""
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_SUFFIX = '.build-cache.json'
+TRACKED_LIBRARIES = ('numpy', 'pandas', 'scipy', 'matplotlib', 'seaborn', 'plotly',
+                     'scikit-learn', 'statsmodels')
+
+
+def _feed(digest, obj):
+    """Hash a nested structure of scalars, containers, arrays and frames"""
+    if isinstance(obj, pd.DataFrame):
+        digest.update(b'frame')
+        _feed(digest, [str(col) for col in obj.columns])
+        _feed(digest, obj.index.tolist())
+        for col in obj.columns:
+            _feed(digest, obj[col].to_numpy())
+    elif isinstance(obj, pd.Series):
+        digest.update(b'series')
+        _feed(digest, str(obj.name))
+        _feed(digest, obj.index.tolist())
+        _feed(digest, obj.to_numpy())
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            _feed(digest, obj.tolist())
+        else:
+            digest.update(f'array{obj.dtype.str}{obj.shape}'.encode())
+            digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        digest.update(b'dict')
+        for key in sorted(obj, key=str):
+            _feed(digest, str(key))
+            _feed(digest, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        digest.update(f'seq{len(obj)}'.encode())
+        for item in obj:
+            _feed(digest, item)
+    else:
+        digest.update(repr(obj).encode())
+
+
+def fingerprint(*parts):
+    """Stable hex digest of arbitrary (nested) analysis inputs"""
+    digest = hashlib.sha256()
+    _feed(digest, list(parts))
+    return digest.hexdigest()
+
+
+def frame_fingerprint(frame, columns=None):
+    """Digest of a frame's contents via one vectorized row-hash pass"""
+    if columns is not None:
+        frame = frame[columns]
+    rows = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return fingerprint([str(col) for col in frame.columns], rows)
+
+
+def source_fingerprint(source, columns, key=None):
+    """Digest of ``columns`` of a chunk source; given the ``key`` it was built with, the source is not rescanned"""
+    if key is not None:
+        return fingerprint(key, list(columns))
+    return frame_fingerprint(source.read(columns))
+
+
+def file_fingerprint(path, block_size=1 << 20):
+    """Digest of a file's bytes, read in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _referenced_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _referenced_names(const)
+    return names
+
+
+def code_fingerprint(func):
+    """Digest of a function's source plus the same-module helpers it calls"""
+    sources = {}
+    pending = [func]
+    while pending:
+        current = inspect.unwrap(pending.pop())
+        # Keyed by file and qualified name, not module name: a script imported
+        # by the batch runner must hash the same as when run as __main__
+        name = f'{os.path.basename(current.__code__.co_filename)}:{current.__qualname__}'
+        if name in sources:
+            continue
+        sources[name] = inspect.getsource(current)
+        for ref in _referenced_names(current.__code__):
+            target = current.__globals__.get(ref)
+            if inspect.isfunction(target) and target.__module__ == current.__module__:
+                pending.append(target)
+    return fingerprint(sources)
+
+
+def library_versions(names=TRACKED_LIBRARIES):
+    versions = {'python': sys.version.split()[0]}
+    for name in names:
+        try:
+            versions[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+class BuildCache:
+    """Manifest of output keys; decides which outputs can be skipped"""
+
+    def __init__(self, output_dir, enabled=True):
+        self.output_dir = output_dir
+        self.path = os.path.normpath(output_dir) + MANIFEST_SUFFIX
+        self.enabled = enabled
+        self.versions = library_versions()
+        self.entries = {}
+        if enabled and os.path.exists(self.path):
+            with open(self.path) as handle:
+                self.entries = json.load(handle).get('entries', {})
+        self.hits = []
+        self.misses = []
+
+    def key(self, *parts):
+        return fingerprint(self.versions, *parts)
+
+    def fresh(self, name, key):
+        """True if ``name`` was last built with ``key`` and its files still exist"""
+        entry = self.entries.get(name)
+        fresh = (self.enabled and entry is not None and entry['key'] == key
+                 and all(os.path.exists(os.path.join(self.output_dir, output))
+                         for output in entry['outputs']))
+        (self.hits if fresh else self.misses).append(name)
+        return fresh
+
+    def record(self, name, key, outputs=(), value=None):
+        entry = {'key': key, 'outputs': [os.path.basename(output) for output in outputs]}
+        if value is not None:
+            entry['value'] = value
+        self.entries[name] = entry
+
+    def value(self, name):
+        """Value recorded with ``name``'s outputs, or None"""
+        return self.entries.get(name, {}).get('value')
+
+    def memoize(self, name, key, compute):
+        """Return the stored result for ``key`` or compute (JSON-able) and store it"""
+        entry = self.entries.get(name)
+        if self.enabled and entry is not None and entry['key'] == key and 'value' in entry:
+            self.hits.append(name)
+            return entry['value']
+        self.misses.append(name)
+        value = compute()
+        self.record(name, key, value=value)
+        return value
+
+    def save(self):
+        if not self.enabled:
+            return
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump({'versions': self.versions, 'entries': self.entries}, handle,
+                      indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
@@ -0,0 +1,168 @@
+"""Command line and run wiring shared by the analysis scripts.
+
+Every analysis is a ``Pipeline`` of stages driven the same way: the same
+flags select the data, outputs, stages and instrumentation, the graph runs
+under the import profiler and tracer wrappers, the figure jobs it returns
+are rendered together on a process pool, and the trace and import report
+are written at the end. ``analysis_parser`` builds the shared flags (a
+script adds its own before parsing) and ``check_args`` applies the shared
+rules; ``prepare``, ``run_stages``, ``write_figures`` and ``finish`` are
+the steps of a script's ``main`` around its own setup.
+"""
+import argparse
+import os
+import sys
+
+from . import images, paths
+from .crossval import DEFAULT_FOLDS, DEFAULT_REPEATS
+from .ingest import DEFAULT_CHUNKSIZE
+from .render import render_figures
+from .trace import Tracer
+
+# Per-stage and per-figure timings are written next to the build-cache manifest
+TRACE_SUFFIX = '.trace.json'
+CHROME_TRACE_SUFFIX = '.trace.chrome.json'
+
+
+def analysis_parser(description, data_path, workers_help, seed_help):
+    """Parser with the flags every analysis script takes"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('command', nargs='?', choices=['all', 'stats-only'], default='all',
+                        help='all: the full report (default); stats-only: just the statistical '
+                             'tables, without loading the plotting libraries')
+    parser.add_argument('--data', default=data_path, metavar='CSV',
+                        help='dataset to analyse (default: the checked-in export)')
+    parser.add_argument('--output-root', metavar='DIR',
+                        help='write graphs/ and data/ under DIR instead of public/ (e.g. for benchmarks)')
+    parser.add_argument('--stream', action='store_true',
+                        help='read the CSV in chunks with a compact dtype schema; clean, aggregate, the '
+                             'tests, regression and cross-validation stream the chunks, while figures, '
+                             'Shapiro-Wilk, resampling and the drilldown use a bounded uniform sample')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help='rows per chunk in streaming mode')
+    parser.add_argument('--approx-quantiles', action='store_true',
+                        help='with --stream, estimate outlier bounds with KLL sketches of the chunks '
+                             'instead of exact value counts')
+    parser.add_argument('--workers', type=int, default=None, help=workers_help)
+    parser.add_argument('--seed', type=int, default=0, help=seed_help)
+    parser.add_argument('--cv-folds', type=int, default=DEFAULT_FOLDS,
+                        help='folds for the cross-validated regression')
+    parser.add_argument('--cv-repeats', type=int, default=DEFAULT_REPEATS,
+                        help='repeats of the k-fold split (each with its own shuffle)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='rebuild every output even if its inputs are unchanged')
+    parser.add_argument('--only', nargs='+', metavar='STAGE',
+                        help='run only these stages and their dependencies (see --list-stages)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='threads evaluating independent stages concurrently (1 = serial)')
+    parser.add_argument('--list-stages', action='store_true',
+                        help='print the stage graph and exit')
+    parser.add_argument('--profile-imports', action='store_true',
+                        help='report time spent importing modules, per stage')
+    parser.add_argument('--no-trace', action='store_true',
+                        help='skip the timing/memory/row-count trace (no instrumentation at all)')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='also record tracemalloc allocations per span (slows the run 2-3x)')
+    parser.add_argument('--chrome-trace', action='store_true',
+                        help='also write the trace in Chrome trace event format')
+    parser.add_argument('--png-only', action='store_true',
+                        help='write each figure as one full-resolution PNG (no SVG/AVIF/WebP variants)')
+    return parser
+
+
+def check_args(parser, args, stats_stages):
+    """Apply the shared rules to parsed ``args``; stats-only runs ``stats_stages``"""
+    if args.approx_quantiles and not args.stream:
+        parser.error('--approx-quantiles sketches the chunks --stream reads; give --stream too')
+    if args.command == 'stats-only':
+        if args.only:
+            parser.error('stats-only runs a fixed set of stages; it cannot be combined with --only')
+        args.only = stats_stages
+    return args
+
+
+def prepare(pipeline, args, import_profiler):
+    """Start the import profiler and check the requested stages; False when there is nothing to run"""
+    if args.profile_imports:
+        # Already installed at import time when given on the command line
+        import_profiler.install()
+    if args.list_stages:
+        for stage in pipeline.stages.values():
+            print(f"{stage.name}: {', '.join(stage.deps) or '-'}")
+        return False
+    try:
+        pipeline.plan(args.only)
+    except ValueError as error:
+        sys.exit(f"error: {error}")
+    return True
+
+
+def output_dirs(analysis, root=None):
+    """(graphs, data) directories of ``analysis``, under ``root`` or public/; graphs is created"""
+    if root:
+        output_dir = os.path.join(root, 'graphs', analysis)
+        data_dir = os.path.join(root, 'data', analysis)
+    else:
+        output_dir, data_dir = paths.graphs_dir(analysis), paths.data_api_dir(analysis)
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir, data_dir
+
+
+def start_tracer(args):
+    """The run's tracer; disabled, it wraps nothing and starts no tracemalloc"""
+    return Tracer(enabled=not args.no_trace, memory=args.trace_allocations).start()
+
+
+def banner(title):
+    print("=" * 80)
+    print(title)
+    print("=" * 80)
+
+
+def run_stages(pipeline, ctx, targets, import_profiler):
+    """Run ``targets`` of ``pipeline`` under the profiler and tracer wrappers that are on"""
+    wrappers = []
+    if ctx.args.profile_imports:
+        wrappers.append(import_profiler.wrap)
+    if ctx.tracer.enabled:
+        wrappers.append(ctx.tracer.wrap)
+    return pipeline.run(ctx, targets, jobs=ctx.args.jobs, wrappers=wrappers)
+
+
+def write_figures(ctx, figure_jobs, import_profiler):
+    """Render ``figure_jobs`` together on a process pool, write the image manifest and save the build cache"""
+    with import_profiler.phase('render'), ctx.tracer.span('render', 'stage'):
+        image_entries = render_figures(figure_jobs, ctx.output_dir, workers=ctx.args.workers,
+                                       cache=ctx.build_cache, tracer=ctx.tracer,
+                                       responsive=not ctx.args.png_only)
+    if image_entries:
+        manifest_path = images.write_manifest(ctx.output_dir, image_entries)
+        saved = images.savings(image_entries)
+        print(f"\nImages ({paths.relative(manifest_path)}), served at {images.SERVED_WIDTH}px "
+              f"against the full-resolution PNGs:")
+        print(saved.round(1).to_string())
+        print(f"Total: {saved['Original KB'].sum():.0f} KB -> {saved['Served KB'].sum():.0f} KB "
+              f"({saved['Saved KB'].sum() / saved['Original KB'].sum():.0%} saved)")
+
+    ctx.build_cache.save()
+    print(f"\nBuild cache: {len(ctx.build_cache.hits)} outputs reused, {len(ctx.build_cache.misses)} rebuilt")
+    return image_entries
+
+
+def finish(ctx, analysis, import_profiler, argv=None):
+    """Write the trace and the import report, and close the run"""
+    tracer = ctx.tracer
+    if tracer.enabled:
+        tracer.stop()
+        trace_path = tracer.write(os.path.normpath(ctx.output_dir) + TRACE_SUFFIX, analysis=analysis,
+                                  argv=sys.argv[1:] if argv is None else list(argv))
+        if ctx.args.chrome_trace:
+            tracer.write_chrome(os.path.normpath(ctx.output_dir) + CHROME_TRACE_SUFFIX)
+        print(f"Trace: {len(tracer.records)} spans in {paths.relative(trace_path)}; "
+              f"slowest {tracer.summary(3)}")
+    if ctx.args.profile_imports:
+        import_profiler.uninstall()
+        print(f"\n{import_profiler.report()}")
+
+    print()
+    banner("ANALYSIS COMPLETE - All visualizations saved to organized directory")
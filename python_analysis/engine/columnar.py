@@ -0,0 +1,164 @@
+"""Columnar (Parquet/Arrow) cache of cleaned datasets.
+
+The cleaned frame is written once as a compressed Parquet file; pandas
+categoricals are stored dictionary-encoded and come back as categoricals.
+The file records the key it was built with (a digest of the source CSV and
+the cleaning parameters), so a changed source or parameter invalidates it
+automatically. Each source path gets its own file, so cleaning another CSV
+(a benchmark or synthetic export) does not overwrite the cache of the
+real one. Readers memory-map the file and decode only the columns
+they ask for.
+
+Streaming runs never hold the whole cleaned frame: ``ParquetCache.writer``
+writes it one chunk (row group) at a time as the clean pass produces it,
+and ``ParquetCache.source`` reads it back as a ``ParquetSource``, a chunk
+source interchangeable with ``CsvSource``.
+
+pyarrow is optional: without it the cache is disabled and every run cleans
+from the CSV as before.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from . import paths
+from .ingest import DEFAULT_CHUNKSIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+
+CACHE_DIR = paths.CACHE_DIR
+KEY_FIELD = b'analysis.cache_key'
+REPORT_FIELD = b'analysis.report'
+
+
+def available():
+    return pq is not None
+
+
+def cache_path(name, source=None, cache_dir=CACHE_DIR):
+    """Cache file of analysis ``name``; one per ``source`` CSV, so a benchmark run keeps the real one"""
+    if source is None:
+        return os.path.normpath(os.path.join(cache_dir, f'{name}.parquet'))
+    digest = hashlib.sha256(os.path.abspath(source).encode()).hexdigest()[:12]
+    return os.path.normpath(os.path.join(cache_dir, f'{name}.{digest}.parquet'))
+
+
+def _sorted_categories(frame):
+    """Sort unordered categories, which Arrow unifies across row groups in order of appearance"""
+    for col, dtype in frame.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not dtype.ordered:
+            frame[col] = frame[col].cat.reorder_categories(dtype.categories.sort_values())
+    return frame
+
+
+def read_columns(path, columns=None):
+    """Memory-map a cached Parquet file and decode only ``columns``"""
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    return _sorted_categories(table.to_pandas())
+
+
+class ParquetSource:
+    """Re-iterable chunk source over a Parquet file, interchangeable with CsvSource"""
+
+    def __init__(self, path, chunksize=DEFAULT_CHUNKSIZE):
+        self.path = path
+        self.chunksize = chunksize
+
+    def __iter__(self):
+        parquet = pq.ParquetFile(self.path, memory_map=True)
+        for batch in parquet.iter_batches(batch_size=self.chunksize):
+            yield _sorted_categories(batch.to_pandas())
+
+    def read(self, columns=None):
+        return read_columns(self.path, columns)
+
+
+class ChunkWriter:
+    """Writes a frame chunk by chunk; the file replaces ``path`` only when the writer exits cleanly"""
+
+    def __init__(self, path, metadata):
+        self.path = path
+        self.metadata = metadata
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def write(self, chunk):
+        if self.path is None:
+            return
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.writer is None:
+            schema = table.schema.with_metadata({**(table.schema.metadata or {}), **self.metadata})
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.writer = pq.ParquetWriter(self.path + '.tmp', schema, compression='zstd')
+        # A chunk with more categories may need wider dictionary indices than the first
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def __exit__(self, kind, value, traceback):
+        if self.writer is None:
+            return
+        self.writer.close()
+        if kind is None:
+            os.replace(self.path + '.tmp', self.path)
+        else:
+            os.remove(self.path + '.tmp')
+
+
+class ParquetCache:
+    """One cleaned frame on disk, valid only for the key it was written with"""
+
+    def __init__(self, path, key, enabled=True):
+        self.path = path
+        self.key = key
+        self.enabled = enabled and available()
+
+    def _metadata(self):
+        if not self.enabled or not os.path.exists(self.path):
+            return None
+        return pq.read_schema(self.path, memory_map=True).metadata or {}
+
+    def valid(self):
+        metadata = self._metadata()
+        return metadata is not None and metadata.get(KEY_FIELD) == self.key.encode()
+
+    def report(self):
+        """Small JSON report stored alongside the data (e.g. row counts)"""
+        metadata = self._metadata() or {}
+        return json.loads(metadata.get(REPORT_FIELD, b'{}'))
+
+    def load(self, columns=None):
+        """The cached frame, or None if it is missing or stale"""
+        if not self.valid():
+            return None
+        return read_columns(self.path, columns)
+
+    def source(self, chunksize=DEFAULT_CHUNKSIZE):
+        """The cached frame as a chunk source, or None if it is missing or stale"""
+        if not self.valid():
+            return None
+        return ParquetSource(self.path, chunksize)
+
+    def store(self, frame, report=None):
+        if not self.enabled:
+            return
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[KEY_FIELD] = self.key.encode()
+        metadata[REPORT_FIELD] = json.dumps(report or {}).encode()
+        table = table.replace_schema_metadata(metadata)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = self.path + '.tmp'
+        pq.write_table(table, temporary, compression='zstd')
+        os.replace(temporary, self.path)
+
+    def writer(self, report=None):
+        """A ``ChunkWriter`` storing the chunks written to it as the cached frame (a no-op when disabled)"""
+        metadata = {KEY_FIELD: self.key.encode(), REPORT_FIELD: json.dumps(report or {}).encode()}
+        return ChunkWriter(self.path if self.enabled else None, metadata)
@@ -0,0 +1,165 @@
+"""Repeated k-fold cross-validation of OLS models from shared Gram matrices.
+
+Each repeat assigns every row to one of ``folds`` folds and builds one Gram
+matrix per fold (a single pass over the rows, covering the union of all
+feature sets). The training Gram matrix for a fold is the total minus that
+fold's matrix, and every feature set is solved from its sub-matrix. The
+data is never re-split or refit from scratch, so ``folds x repeats x
+feature sets`` models cost one pass per repeat plus small p x p solves.
+
+Repeats are spread over a thread pool (the per-fold products are BLAS
+calls that release the GIL). Each repeat draws its fold assignment from its
+own ``SeedSequence`` child, so the scores depend only on ``seed``.
+
+``cross_validate_streaming`` does the same over a chunk source without a
+design matrix or a per-row permutation: a row's fold in each repeat is a
+hash of its key column under that repeat's seed, so one pass adds every
+chunk's rows to ``repeats x folds`` Gram matrices and memory stays at one
+chunk plus those small matrices. Fold sizes are then equal only in
+expectation.
+"""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .ingest import decimal_columns, decimal_values
+from .ols import Gram
+
+DEFAULT_FOLDS = 5
+DEFAULT_REPEATS = 10
+
+
+def fold_ids(n, folds, rng):
+    """Random fold label per row, with fold sizes differing by at most one"""
+    ids = np.empty(n, dtype='int64')
+    ids[rng.permutation(n)] = np.arange(n) % folds
+    return ids
+
+
+def hashed_fold_ids(keys, folds, seed):
+    """Fold label per row from a hash of its key: the same key lands in the same fold for a given seed"""
+    hashes = pd.util.hash_array(np.asarray(keys), hash_key=f'{seed:016d}'[-16:])
+    return (hashes % np.uint64(folds)).astype('int64')
+
+
+def _scores(repeat, total, fold_grams, feature_sets):
+    rows = []
+    for fold, test in enumerate(fold_grams):
+        train = total - test
+        for name, features in feature_sets.items():
+            mse, r2 = test.score(train.solve(features))
+            rows.append((name, repeat, fold, mse, r2))
+    return rows
+
+
+def _repeat_scores(repeat, seed, total, design, feature_sets, folds):
+    ids = fold_ids(len(design), folds, np.random.default_rng(seed))
+    fold_grams = []
+    for fold in range(folds):
+        part = design[ids == fold]
+        fold_grams.append(Gram(total.features, total.target, total.shift, part.T @ part))
+    return _scores(repeat, total, fold_grams, feature_sets)
+
+
+def _union(feature_sets):
+    return list(dict.fromkeys(feature for group in feature_sets.values() for feature in group))
+
+
+def _tidy(results):
+    return pd.DataFrame([row for rows in results for row in rows],
+                        columns=['feature_set', 'repeat', 'fold', 'mse', 'r2'])
+
+
+def cross_validate(frame, target, feature_sets, folds=DEFAULT_FOLDS, repeats=DEFAULT_REPEATS,
+                   seed=0, workers=None):
+    """Tidy per-fold scores (feature_set, repeat, fold, mse, r2) for every feature set"""
+    if folds < 2:
+        raise ValueError("Cross-validation needs at least 2 folds")
+    features = _union(feature_sets)
+    total = Gram.from_frame(frame, features, target)
+    design = total.design(decimal_columns(frame, features), decimal_values(frame[target]))
+    # Rows with a missing value are left out of every fold, as the total skipped them
+    design = design[~np.isnan(design).any(axis=1)]
+    seeds = np.random.SeedSequence(seed).spawn(repeats)
+    run = lambda repeat: _repeat_scores(repeat, seeds[repeat], total, design, feature_sets, folds)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, repeats)
+    if workers <= 1:
+        results = [run(repeat) for repeat in range(repeats)]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, range(repeats)))
+    return _tidy(results)
+
+
+def _chunk_grams(chunk, key, features, target, shift, folds, seeds):
+    """Gram matrix of each (repeat, fold) over one chunk's rows"""
+    X, y = decimal_columns(chunk, features), decimal_values(chunk[target])
+    grams = []
+    for seed in seeds:
+        ids = hashed_fold_ids(chunk[key].to_numpy(), folds, seed)
+        grams.append([Gram(features, target, shift).update(X[ids == fold], y[ids == fold])
+                      for fold in range(folds)])
+    return grams
+
+
+def cross_validate_streaming(source, target, feature_sets, key, folds=DEFAULT_FOLDS, repeats=DEFAULT_REPEATS,
+                             seed=0, workers=None):
+    """``cross_validate`` over a re-iterable chunk source, folds assigned by a hash of column ``key``
+
+    One pass; chunk Gram matrices are computed on ``workers`` threads and merged.
+    """
+    if folds < 2:
+        raise ValueError("Cross-validation needs at least 2 folds")
+    features = _union(feature_sets)
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(repeats)]
+    chunks = iter(source)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError("No chunks to cross-validate")
+    shift = np.nanmean(np.column_stack([decimal_columns(first, features), decimal_values(first[target])]), axis=0)
+    grams = _chunk_grams(first, key, features, target, shift, folds, seeds)
+
+    def merge(chunk_grams):
+        for repeat_grams, chunk_repeat in zip(grams, chunk_grams):
+            for gram, chunk_gram in zip(repeat_grams, chunk_repeat):
+                gram.merge(chunk_gram)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for chunk in chunks:
+            merge(_chunk_grams(chunk, key, features, target, shift, folds, seeds))
+    else:
+        # At most 2 * workers chunks are in flight, so memory stays bounded
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_chunk_grams, chunk, key, features, target, shift, folds, seeds))
+                if len(pending) >= 2 * workers:
+                    merge(pending.popleft().result())
+            while pending:
+                merge(pending.popleft().result())
+
+    results = []
+    for repeat, fold_grams in enumerate(grams):
+        total = Gram(features, target, shift)
+        for gram in fold_grams:
+            total.merge(gram)
+        results.append(_scores(repeat, total, fold_grams, feature_sets))
+    return _tidy(results)
+
+
+def summarize(scores):
+    """Mean and standard deviation of MSE and R^2 per feature set, in input order"""
+    grouped = scores.groupby('feature_set', sort=False)
+    return pd.DataFrame({
+        'MSE Mean': grouped['mse'].mean(),
+        'MSE Std': grouped['mse'].std(),
+        'R² Mean': grouped['r2'].mean(),
+        'R² Std': grouped['r2'].std(),
+    }).rename_axis('Feature Set')
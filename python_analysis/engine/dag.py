@@ -0,0 +1,138 @@
+"""Declared stage graph for the analysis scripts.
+
+A script registers named stages with ``Pipeline.stage``; each stage is a
+function of a shared context plus the results of the stages it depends on,
+passed as keyword arguments named after them. Nothing runs at declaration:
+``run(context, targets)`` evaluates only the targets and their upstream
+dependencies, so regenerating one figure skips every unrelated branch.
+
+Stages must be declared after their dependencies, so declaration order is a
+valid serial schedule and is the order a serial run follows. With
+``jobs > 1`` stages whose dependencies are done run concurrently on a thread
+pool (the heavy work is numpy/pandas, which releases the GIL); each stage's
+prints are buffered and replayed in declaration order, so the log reads the
+same as a serial run.
+
+``run(..., wrappers=[...])`` replaces each stage function by
+``wrapper(name, func)`` before calling it, on the thread that runs it; the
+import profiler and the tracer measure stages this way.
+"""
+import io
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+Stage = namedtuple('Stage', ['name', 'func', 'deps'])
+
+
+class _StageOutput:
+    """``sys.stdout`` stand-in that buffers prints per stage thread"""
+
+    def __init__(self, target):
+        self.target = target
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (self.target if buffer is None else buffer).write(text)
+
+    def flush(self):
+        self.target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+    def capture(self, func, *args):
+        """Run ``func`` on this thread; returns (result, printed text)"""
+        self.local.buffer = io.StringIO()
+        try:
+            return func(*args), self.local.buffer.getvalue()
+        except BaseException:
+            self.target.write(self.local.buffer.getvalue())
+            raise
+        finally:
+            self.local.buffer = None
+
+
+class Pipeline:
+    """Named stages with explicit dependencies, evaluated on demand"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def stage(self, *deps, name=None):
+        """Decorator registering ``func(context, **deps)`` as a stage"""
+        def register(func):
+            self.add(name or func.__name__, func, deps)
+            return func
+        return register
+
+    def add(self, name, func, deps=()):
+        if name in self.stages:
+            raise ValueError(f"Stage {name!r} is already declared")
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {name!r} depends on undeclared stages {missing}")
+        self.stages[name] = Stage(name, func, tuple(deps))
+
+    def plan(self, targets=None):
+        """Targets plus their upstream dependencies, in declaration order"""
+        if targets is None:
+            return list(self.stages)
+        unknown = [name for name in targets if name not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stages {unknown}; expected any of {list(self.stages)}")
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in needed]
+
+    def _call(self, name, context, results, wrappers=()):
+        stage = self.stages[name]
+        func = stage.func
+        for wrapper in wrappers:
+            func = wrapper(name, func)
+        return func(context, **{dep: results[dep] for dep in stage.deps})
+
+    def run(self, context, targets=None, jobs=1, wrappers=()):
+        """Evaluate ``targets`` (default: every stage); returns {name: result}"""
+        order = self.plan(targets)
+        if jobs <= 1:
+            results = {}
+            for name in order:
+                results[name] = self._call(name, context, results, wrappers)
+            return results
+        return self._run_concurrent(order, context, jobs, wrappers)
+
+    def _run_concurrent(self, order, context, jobs, wrappers):
+        results, printed = {}, {}
+        pending, running = list(order), {}
+        replayed = 0
+        output = _StageOutput(sys.stdout)
+        sys.stdout = output
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                while pending or running:
+                    ready = [name for name in pending
+                             if all(dep in results for dep in self.stages[name].deps)]
+                    for name in ready:
+                        pending.remove(name)
+                        future = pool.submit(output.capture, self._call, name, context,
+                                             dict(results), wrappers)
+                        running[future] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        results[name], printed[name] = future.result()
+                    # Replay finished stages' output in declaration order
+                    while replayed < len(order) and order[replayed] in printed:
+                        output.target.write(printed.pop(order[replayed]))
+                        replayed += 1
+        finally:
+            sys.stdout = output.target
+        return results
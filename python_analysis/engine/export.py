@@ -0,0 +1,95 @@
+"""Compact, versioned JSON data feed for the blog's React charts.
+
+Each analysis writes a handful of small pre-aggregated files (group tables,
+histogram bins, correlation matrix, regression coefficients, ...) under
+``public/data/<analysis>/`` plus an ``index.json`` listing them, so a chart
+can fetch a few KB instead of the browser downloading raw rows.
+
+Every file is ``{"schema_version": N, "name": ..., "data": ...}``. Bump
+``SCHEMA_VERSION`` whenever the shape of ``data`` changes; the TypeScript
+types in ``src/lib/analysisData.ts`` mirror it. Floats are rounded to
+``DIGITS`` significant digits and files are only rewritten when their
+content changes.
+"""
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_VERSION = 1
+DIGITS = 6
+
+
+def compact(value, digits=DIGITS):
+    """JSON-ready copy of ``value`` with floats rounded and NaN/inf as null"""
+    if isinstance(value, dict):
+        return {str(key): compact(item, digits) for key, item in value.items()}
+    if isinstance(value, (pd.Series, pd.Index)):
+        value = value.to_numpy()
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [compact(item, digits) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return None
+        return float(f'{value:.{digits}g}')
+    return value
+
+
+def group_payload(table):
+    """Tidy group table -> {key: {column: {groups, count, mean, std}}}"""
+    payload = {}
+    for (key, column), rows in table.groupby(['key', 'column'], sort=False):
+        stats = {statistic: part['value'] for statistic, part in rows.groupby('statistic', sort=False)}
+        if 'count' in stats:
+            stats['count'] = stats['count'].astype('int64')
+        groups = rows.loc[rows['statistic'] == 'mean', 'group']
+        payload.setdefault(key, {})[column] = {
+            'groups': groups.tolist(),
+            **{statistic: values.tolist() for statistic, values in stats.items()},
+        }
+    return payload
+
+
+def matrix_payload(frame):
+    """Square labelled matrix -> {labels, values}"""
+    return {'labels': [str(label) for label in frame.columns], 'values': frame.to_numpy()}
+
+
+def table_payload(frame):
+    """Row-labelled table -> {index, columns, values} in column-major lists"""
+    return {
+        'index': [str(label) for label in frame.index],
+        'columns': {str(col): frame[col].to_numpy() for col in frame.columns},
+    }
+
+
+def _write_if_changed(path, text):
+    if os.path.exists(path):
+        with open(path) as handle:
+            if handle.read() == text:
+                return False
+    with open(path, 'w') as handle:
+        handle.write(text)
+    return True
+
+
+def write_data_api(data_dir, datasets, version=SCHEMA_VERSION):
+    """Write one JSON file per dataset plus index.json; returns {name: bytes}"""
+    os.makedirs(data_dir, exist_ok=True)
+    sizes = {}
+    for name, data in datasets.items():
+        text = json.dumps({'schema_version': version, 'name': name, 'data': compact(data)},
+                          separators=(',', ':'), allow_nan=False)
+        _write_if_changed(os.path.join(data_dir, f'{name}.json'), text)
+        sizes[name] = len(text.encode())
+    index = {'schema_version': version, 'files': {name: {'path': f'{name}.json', 'bytes': size}
+                                                  for name, size in sizes.items()}}
+    _write_if_changed(os.path.join(data_dir, 'index.json'),
+                      json.dumps(index, separators=(',', ':'), sort_keys=True))
+    return sizes
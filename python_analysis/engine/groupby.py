@@ -0,0 +1,193 @@
+"""Fused multi-key group aggregation over integer codes.
+
+Every panel in the EDA section is a (key, value column) pair. Instead of one
+``groupby(key)[col].mean()`` per panel, ``GroupAggregator`` factorizes each
+key once per chunk, maps the chunk's labels onto a growing global
+vocabulary, and accumulates count, sum and the centered sum of squares for
+every value column of that key with ``np.bincount`` over the codes. Chunk
+and partial states combine with Chan et al.'s parallel update, as in
+``SummaryAccumulator``, so the std keeps its precision for large groups
+with large means where ``sumsq - n * mean**2`` cancels. Partial aggregators
+merge, and ``table()`` returns one tidy frame that the panel renderers read
+with ``select``; a new panel adds a bincount, not another scan. Given
+``weight``, a column of row weights, each row counts as its weight, so the
+groups of a stratified sample estimate those of the rows it stands for.
+
+Per-group rates (likes per post, posts per hour, ...) are ratios of those
+group sums, so ``ratio_table`` computes every one of them for every group
+with a few array divisions and no pass over the rows. A ratio of totals is
+also what the rate means for a group as a whole, and it stays defined when
+single rows have a zero denominator.
+"""
+import numpy as np
+import pandas as pd
+
+from .ingest import decimal_columns
+
+STATISTICS = ('count', 'sum', 'mean', 'std')
+
+
+class _KeyState:
+    """Vocabulary and running per-group counts, sums, means and M2 for one grouping key"""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.vocab = pd.Index([], dtype=object)
+        self.categories = None
+        self.count = np.zeros((0, len(self.columns)))
+        self.sum = np.zeros((0, len(self.columns)))
+        self.mean = np.zeros((0, len(self.columns)))
+        self.m2 = np.zeros((0, len(self.columns)))
+
+    def codes_for(self, labels):
+        """Global codes for distinct labels, growing the vocabulary as needed"""
+        labels = pd.Index(labels, dtype=object)
+        codes = self.vocab.get_indexer(labels)
+        new = codes < 0
+        if new.any():
+            self.vocab = self.vocab.append(labels[new])
+            codes[new] = self.vocab.get_indexer(labels[new])
+        self._grow(len(self.vocab))
+        return codes
+
+    def add_categories(self, categories):
+        """Extend the output order with categories not seen yet, keeping the known ones first"""
+        if self.categories is None:
+            self.categories = list(categories)
+        else:
+            known = set(self.categories)
+            self.categories += [category for category in categories if category not in known]
+
+    def _grow(self, size):
+        extra = size - len(self.count)
+        if extra > 0:
+            pad = np.zeros((extra, len(self.columns)))
+            self.count = np.vstack([self.count, pad])
+            self.sum = np.vstack([self.sum, pad])
+            self.mean = np.vstack([self.mean, pad])
+            self.m2 = np.vstack([self.m2, pad])
+
+    def add(self, codes, values, weights=None):
+        size = len(self.vocab)
+        if weights is None:
+            weights = np.ones(len(codes))
+        count, total, m2 = (np.zeros((size, len(self.columns))) for _ in range(3))
+        for j in range(len(self.columns)):
+            column = values[:, j]
+            valid = (codes >= 0) & ~np.isnan(column)
+            group, column, weight = codes[valid], column[valid], weights[valid]
+            count[:, j] = np.bincount(group, weights=weight, minlength=size)
+            total[:, j] = np.bincount(group, weights=weight * column, minlength=size)
+            mean = np.divide(total[:, j], count[:, j], out=np.zeros(size), where=count[:, j] > 0)
+            m2[:, j] = np.bincount(group, weights=weight * (column - mean[group]) ** 2, minlength=size)
+        self.combine(slice(None), count, total, m2)
+
+    def combine(self, rows, count, total, m2):
+        """Fold (count, sum, M2) of disjoint rows into groups ``rows`` (Chan et al.)"""
+        mine = self.count[rows]
+        combined = mine + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, 0.0)
+            delta = mean - self.mean[rows]
+            self.m2[rows] += m2 + np.where(combined > 0, delta * delta * mine * count / combined, 0.0)
+            self.mean[rows] += np.where(combined > 0, delta * count / combined, 0.0)
+        self.count[rows] = combined
+        self.sum[rows] += total
+
+    def order(self):
+        """Group positions in output order: category order, else sorted labels"""
+        if self.categories is not None:
+            ranked = self.vocab.get_indexer(pd.Index(self.categories, dtype=object))
+            ranked = ranked[ranked >= 0]
+        else:
+            ranked = np.argsort(self.vocab.to_numpy(), kind='stable')
+        return ranked[self.count[ranked].any(axis=1)]
+
+
+class GroupAggregator:
+    """count/sum/mean/std for many (key, column) panels in one pass per chunk"""
+
+    def __init__(self, panels, weight=None):
+        self.panels = {key: list(columns) for key, columns in panels.items()}
+        self.weight = weight
+        self.keys = {key: _KeyState(columns) for key, columns in self.panels.items()}
+
+    def update(self, chunk):
+        weights = None if self.weight is None else chunk[self.weight].to_numpy(dtype='float64')
+        for key, state in self.keys.items():
+            labels = chunk[key]
+            if isinstance(labels.dtype, pd.CategoricalDtype):
+                state.add_categories(labels.cat.categories)
+                local, uniques = labels.cat.codes.to_numpy(), labels.cat.categories
+            else:
+                local, uniques = pd.factorize(labels, sort=False)
+            mapping = np.append(state.codes_for(uniques), -1)
+            codes = mapping[local]
+            values = decimal_columns(chunk, state.columns)
+            state.add(codes, values, weights)
+        return self
+
+    def merge(self, other):
+        """Fold in an aggregator built over disjoint rows with the same panels"""
+        if other.panels != self.panels or other.weight != self.weight:
+            raise ValueError("Cannot merge aggregators with different panels")
+        for key, state in self.keys.items():
+            theirs = other.keys[key]
+            if theirs.categories is not None:
+                state.add_categories(theirs.categories)
+            codes = state.codes_for(theirs.vocab)
+            state.combine(codes, theirs.count, theirs.sum, theirs.m2)
+        return self
+
+    def table(self):
+        """Tidy frame with one row per (key, group, column, statistic)"""
+        frames = []
+        for key, state in self.keys.items():
+            order = state.order()
+            count, total = state.count[order], state.sum[order]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = total / count
+                variance = state.m2[order] / (count - 1)
+            stats = {'count': count, 'sum': total, 'mean': mean, 'std': np.sqrt(variance)}
+            labels = state.vocab[order].tolist()
+            for j, column in enumerate(state.columns):
+                for statistic in STATISTICS:
+                    frames.append(pd.DataFrame({
+                        'key': key,
+                        'group': pd.Series(labels, dtype=object),
+                        'column': column,
+                        'statistic': statistic,
+                        'value': stats[statistic][:, j],
+                    }))
+        columns = ['key', 'group', 'column', 'statistic', 'value']
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+
+def select(table, key, column, statistic='mean'):
+    """One panel from a tidy group table, like ``groupby(key)[column].<statistic>()``"""
+    rows = table[(table['key'] == key) & (table['column'] == column)
+                 & (table['statistic'] == statistic)]
+    return pd.Series(rows['value'].to_numpy(), name=column,
+                     index=pd.Index(rows['group'].tolist(), name=key))
+
+
+def ratio_table(table, key, ratios):
+    """Ratios of ``key``'s group sums, one column per ratio
+
+    ``ratios`` maps a name to ``(numerator, denominator, scale)``; each group
+    gets ``scale * sum(numerator) / sum(denominator)``, NaN when the
+    denominator sums to zero.
+    """
+    sums = {}
+    columns = {}
+    for name, (numerator, denominator, scale) in ratios.items():
+        for column in (numerator, denominator):
+            if column not in sums:
+                sums[column] = select(table, key, column, 'sum')
+        numerators, denominators = sums[numerator].to_numpy(), sums[denominator].to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns[name] = np.where(denominators != 0, scale * numerators / denominators, np.nan)
+    index = next(iter(sums.values())).index if sums else pd.Index([], name=key)
+    return pd.DataFrame(columns, index=index)
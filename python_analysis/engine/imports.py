@@ -0,0 +1,122 @@
+"""Deferred imports and an import-time profiler.
+
+The scientific stack is most of an analysis script's start-up time (scipy.stats,
+seaborn and statsmodels each take around a second), yet most runs only
+need part of it. ``lazy_import`` returns a stand-in bound at module level
+like a normal import; the real module is imported on first attribute
+access, i.e. inside the stage that actually uses it.
+
+``ImportProfiler`` wraps ``builtins.__import__`` while installed and times
+each first import of a module (inclusive of what it pulls in), charging it
+to the phase that triggered it: ``startup`` or the pipeline stage running
+on that thread. Only outermost imports are recorded, so the times add up.
+"""
+import builtins
+import functools
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class LazyModule:
+    """Module stand-in that imports ``name`` on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            # Through __import__ so an installed ImportProfiler sees it
+            __import__(self._name)
+            self._module = sys.modules[self._name]
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """``name`` if already imported, else a stand-in that imports it when used"""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+class ImportProfiler:
+    """Times first imports per phase while installed"""
+
+    def __init__(self, default_phase='startup'):
+        self.default_phase = default_phase
+        self.records = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.original = None
+
+    def install(self):
+        if self.original is None:
+            self.original = builtins.__import__
+            builtins.__import__ = self._import
+        return self
+
+    def uninstall(self):
+        if self.original is not None:
+            builtins.__import__ = self.original
+            self.original = None
+        return self
+
+    @contextmanager
+    def phase(self, name):
+        """Charge imports made on this thread to ``name``"""
+        previous = getattr(self.local, 'phase', None)
+        self.local.phase = name
+        try:
+            yield
+        finally:
+            self.local.phase = previous
+
+    def wrap(self, name, func):
+        """``func`` with its imports charged to ``name`` (a ``Pipeline.run`` wrapper)"""
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return wrapped
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        depth = getattr(self.local, 'depth', 0)
+        if level or depth or name in sys.modules:
+            self.local.depth = depth + 1
+            try:
+                return self.original(name, globals, locals, fromlist, level)
+            finally:
+                self.local.depth = depth
+        self.local.depth = 1
+        started = time.perf_counter()
+        try:
+            return self.original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.local.depth = 0
+            phase = getattr(self.local, 'phase', None) or self.default_phase
+            with self.lock:
+                self.records.append((phase, name, elapsed))
+
+    def totals(self):
+        """Seconds spent importing per phase, in first-seen order"""
+        totals = {}
+        for phase, _, elapsed in self.records:
+            totals[phase] = totals.get(phase, 0.0) + elapsed
+        return totals
+
+    def report(self, top=5):
+        """Per-phase import time with its ``top`` slowest modules"""
+        totals = self.totals()
+        lines = [f"Import profile: {sum(totals.values()):.2f}s in first imports"]
+        for phase, total in totals.items():
+            slowest = sorted((record for record in self.records if record[0] == phase),
+                             key=lambda record: record[2], reverse=True)[:top]
+            modules = ', '.join(f"{name} {elapsed:.2f}s" for _, name, elapsed in slowest)
+            lines.append(f"  {phase:<28} {total:>6.2f}s  {modules}")
+        return '\n'.join(lines)
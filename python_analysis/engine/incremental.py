@@ -0,0 +1,236 @@
+"""Append-only incremental runs: merge new rows into a persisted state.
+
+The sleep export only grows, by rows appended at the end with increasing
+Person IDs. An ``AppendState`` saved after a full run keeps everything the
+aggregate outputs are built from, all of it mergeable:
+
+* where ingestion stopped: the highest ID seen (the watermark), the byte
+  offset just past the last complete row and a digest of the bytes before
+  it, so an edited or truncated history is noticed;
+* a ``SummaryAccumulator`` over the raw outlier columns, exact value
+  counts of those columns with few distinct values (``GRID_VALUES``), and
+  the outlier summary the clean rows were filtered with;
+* named mergeable parts folded in by the analysis: for the sleep script the
+  clean rows' moments, co-moments and group sums, histogram value counts
+  and the train/test OLS Gram matrices.
+
+An append run reads the file from the stored offset, keeps rows past the
+watermark and merges their raw values into the counts and sketches first,
+which give the IQR bounds a full run would now use. What matters is not how
+far a bound moves but whether it moves past rows: ``bound_drift`` measures
+the share of rows whose keep/drop decision differs between the stored and
+the current bounds. For gridded columns (the sleep export's integers and
+0.1 h durations), whose quartiles jump between neighbouring values, the
+value counts give that share exactly, so a bound moving between two grid
+values costs nothing. For other columns the sketch's CDF estimates it, less
+what its rank error cannot resolve. If the share exceeds
+``DRIFT_TOLERANCE``, or the set of columns whose outlier share exceeds the
+threshold changes, ``Recompute`` is raised and the caller falls back to a
+full run. Otherwise the new rows are filtered with the stored bounds and
+folded into the parts. Nothing is written until the caller saves the state
+at the end of a successful run.
+"""
+import copy
+import hashlib
+import io
+import os
+import pickle
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from . import paths
+from .outliers import IQR_FACTOR, summarize_outliers
+from .summary import SummaryAccumulator, ValueCounts, accumulate
+
+STATE_VERSION = 2
+# Largest share of rows an append may leave on the wrong side of a stored
+# outlier bound (beyond the sketches' rank error)
+DRIFT_TOLERANCE = 0.0
+# Columns with at most this many distinct values have their bounds checked exactly
+GRID_VALUES = 4096
+TAIL_BYTES = 4096
+
+Watermark = namedtuple('Watermark', ['last_id', 'offset', 'tail'])
+Drift = namedtuple('Drift', ['column', 'stored', 'current', 'share'])
+Batch = namedtuple('Batch', ['frame', 'raw_rows', 'skipped', 'end'])
+
+
+class Recompute(Exception):
+    """The stored state cannot absorb the new rows; the analysis must run in full"""
+
+
+def state_path(name, cache_dir=paths.CACHE_DIR):
+    return os.path.normpath(os.path.join(cache_dir, f'{name}.state.pkl'))
+
+
+def complete_end(path):
+    """Offset just past the last newline of ``path``; a row still being written is left out"""
+    with open(path, 'rb') as handle:
+        position = handle.seek(0, os.SEEK_END)
+        while position > 0:
+            step = min(TAIL_BYTES, position)
+            handle.seek(position - step)
+            newline = handle.read(step).rfind(b'\n')
+            if newline >= 0:
+                return position - step + newline + 1
+            position -= step
+    return 0
+
+
+def tail_digest(path, offset, size=TAIL_BYTES):
+    """Digest of the ``size`` bytes before ``offset``"""
+    with open(path, 'rb') as handle:
+        handle.seek(max(0, offset - size))
+        return hashlib.sha256(handle.read(min(size, offset))).hexdigest()
+
+
+def read_rows(path, start, end, dtypes=None):
+    """Rows stored in bytes [start, end) of a CSV, parsed under its header"""
+    with open(path, 'rb') as handle:
+        header = handle.readline()
+        handle.seek(max(start, len(header)))
+        data = handle.read(max(0, end - max(start, len(header))))
+    return pd.read_csv(io.BytesIO(header + data), dtype=dtypes)
+
+
+def _bounds(q1, q3, factor):
+    return q1 - factor * (q3 - q1), q3 + factor * (q3 - q1)
+
+
+def _flipped(values, counts, stored, current):
+    """Share of the rows (distinct ``values`` held by ``counts`` rows) inside one pair of bounds only"""
+    lower = (values < stored[0]) != (values < current[0])
+    upper = (values > stored[1]) != (values > current[1])
+    return float(counts[lower | upper].sum() / counts.sum()) if counts.sum() else 0.0
+
+
+def bound_drift(stored, raw, values, factor=IQR_FACTOR, tolerance=DRIFT_TOLERANCE):
+    """Columns where more than ``tolerance`` of the rows are on different sides of the stored and current bounds
+
+    ``stored`` has the bounds rows were filtered with; the current ones come
+    from ``values`` (exact ``ValueCounts``) for the columns it still tracks
+    and from the sketches of ``raw`` (a ``SummaryAccumulator``) otherwise.
+    """
+    drifts = []
+    for col in stored.index:
+        old = tuple(stored.loc[col, ['lower_bound', 'upper_bound']])
+        if col in values.tracked:
+            new = _bounds(*values.quantile(col, [0.25, 0.75]), factor)
+            share = _flipped(values.values[col], values.counts[col], old, new)
+        else:
+            sketch = raw.sketches[raw.columns.index(col)]
+            new = _bounds(*sketch.quantile([0.25, 0.75]), factor)
+            moved = np.abs(sketch.rank(np.array(new)) - sketch.rank(np.array(old))).sum()
+            # Each rank is off by up to rank_error, so each difference by twice that
+            share = max(0.0, float(moved) - 4 * sketch.rank_error)
+        if share > tolerance:
+            drifts.append(Drift(col, old, new, share))
+    return drifts
+
+
+class AppendState:
+    """Watermark, outlier reference and mergeable aggregates of every row ingested so far"""
+
+    def __init__(self, key, id_column):
+        self.key = key
+        self.version = STATE_VERSION
+        self.id_column = id_column
+        self.watermark = None
+        self.last_id = None
+        self.raw_rows = 0
+        self.raw = None
+        self.values = None
+        self.outliers = None
+        self.parts = {}
+
+    @classmethod
+    def load(cls, path, key):
+        """The state saved at ``path`` if it was built with ``key``, else None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as handle:
+                state = pickle.load(handle)
+        except (OSError, EOFError, AttributeError, ImportError, pickle.UnpicklingError):
+            return None
+        if getattr(state, 'version', None) != STATE_VERSION or state.key != key:
+            return None
+        return state
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as handle:
+            pickle.dump(self, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+
+    def record_raw(self, chunks, outliers):
+        """Full run: the raw rows (a frame or its chunks) and the outlier summary their clean rows were filtered with"""
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+        columns = list(outliers.index)
+        self.raw_rows, self.last_id = 0, None
+        self.raw = SummaryAccumulator(columns)
+        self.values = ValueCounts(columns, max_values=GRID_VALUES)
+        for chunk in chunks:
+            self.raw.update(chunk)
+            self.values.update(chunk)
+            self.raw_rows += len(chunk)
+            if len(chunk):
+                self.last_id = max(self.last_id or 0, int(chunk[self.id_column].max()))
+        self.outliers = outliers
+
+    def mark(self, path, offset):
+        """Set the watermark: every row up to byte ``offset`` of ``path`` is in the state"""
+        self.watermark = Watermark(self.last_id, offset, tail_digest(path, offset))
+
+    def fold(self, name, partial):
+        """Merge ``partial`` (built over new rows) into the stored part ``name``; returns the merged part"""
+        stored = self.parts.get(name)
+        if stored is None:
+            self.parts[name] = partial
+            return partial
+        return stored.merge(partial)
+
+    def new_rows(self, path, dtypes=None):
+        """Raw rows appended past the watermark, as a ``Batch``"""
+        if self.watermark is None or self.raw is None:
+            raise Recompute("the saved state has no watermark")
+        offset = self.watermark.offset
+        if os.path.getsize(path) < offset or tail_digest(path, offset) != self.watermark.tail:
+            raise Recompute(f"{os.path.basename(path)} changed before the watermark")
+        end = complete_end(path)
+        frame = read_rows(path, offset, end, dtypes)
+        past = frame[self.id_column].to_numpy() > (self.watermark.last_id or 0)
+        return Batch(frame[past], int(past.sum()), int((~past).sum()), end)
+
+    def absorb_raw(self, frame, threshold, tolerance=DRIFT_TOLERANCE):
+        """Merge new raw rows into the sketches and outlier counts
+
+        Raises ``Recompute`` when the IQR bounds drift or the filtered columns
+        change; returns the updated outlier summary to filter the new rows with.
+        """
+        columns = list(self.outliers.index)
+        raw = copy.deepcopy(self.raw).merge(accumulate([frame], columns))
+        values = copy.deepcopy(self.values).merge(ValueCounts(columns, max_values=GRID_VALUES).update(frame))
+        drifts = bound_drift(self.outliers, raw, values, tolerance=tolerance)
+        if drifts:
+            raise Recompute('IQR bounds drifted: ' + ', '.join(
+                f"{drift.column} [{drift.stored[0]:.2f}, {drift.stored[1]:.2f}] -> "
+                f"[{drift.current[0]:.2f}, {drift.current[1]:.2f}] ({drift.share:.2%} of rows)"
+                for drift in drifts))
+        rows = self.raw_rows + len(frame)
+        outliers = self.outliers.copy()
+        outliers['outlier_count'] += summarize_outliers(frame, outliers[['lower_bound', 'upper_bound']])[
+            'outlier_count']
+        outliers['outlier_percentage'] = outliers['outlier_count'] / rows * 100 if rows else 0.0
+        before = set(self.outliers.index[self.outliers['outlier_percentage'] > threshold])
+        after = set(outliers.index[outliers['outlier_percentage'] > threshold])
+        if before != after:
+            raise Recompute(f"the filtered outlier columns changed from {sorted(before)} to {sorted(after)}")
+        self.raw, self.values, self.raw_rows, self.outliers = raw, values, rows, outliers
+        if len(frame):
+            self.last_id = max(self.last_id or 0, int(frame[self.id_column].max()))
+        return outliers
@@ -0,0 +1,305 @@
+"""Chunked CSV ingestion with an explicit, compact dtype schema.
+
+Reading the sleep export with a single ``pd.read_csv`` parses every column
+as int64/float64/object and holds the whole file at once. ``CsvSource``
+instead parses fixed-size chunks with the dtypes declared below, so each
+pass over the data needs memory for one chunk only. The source can be
+iterated any number of times; every iteration re-reads the file, and
+``map`` derives a source that also cleans or filters each chunk as it is
+read.
+
+The social media export keys its rows by string IDs ('U_1', 'U_2', ...).
+``encode_user_ids`` turns them into their integer part on read, so a
+high-cardinality ID column costs 4 bytes a row and hashes, joins and
+deduplicates as integers instead of Python strings.
+"""
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+SLEEP_CATEGORICAL = ['Gender', 'Occupation', 'BMI Category', 'Sleep Disorder']
+
+# int8 for ages and 1-10 scales, int16 for minutes and heart rate, int32 for
+# IDs and step counts, float32 for durations (0.1 h steps need ~3 digits).
+# Integers are read as pandas' nullable types, so a missing field parses as NA
+# instead of failing the read; the dtype plan then narrows each chunk
+SLEEP_DTYPES = {
+    'Person ID': 'Int32',
+    'Gender': 'category',
+    'Age': 'Int8',
+    'Occupation': 'category',
+    'Sleep Duration': 'float32',
+    'Quality of Sleep': 'Int8',
+    'Physical Activity Level': 'Int16',
+    'Stress Level': 'Int8',
+    'BMI Category': 'category',
+    'Blood Pressure': 'object',
+    'Heart Rate': 'Int16',
+    'Daily Steps': 'Int32',
+    'Sleep Disorder': 'category',
+}
+
+
+def numpy_dtypes(dtypes):
+    """``dtypes`` with pandas' nullable integers ('Int8', 'UInt16', ...) replaced by the numpy ones"""
+    return {col: dtype.lower() if dtype.startswith(('Int', 'UInt')) else dtype for col, dtype in dtypes.items()}
+
+
+# Dtype plan of the cleaned frame: the read schema with Blood Pressure parsed
+# into int16 systolic/diastolic columns, plus the derived Age_Group
+SLEEP_DTYPE_PLAN = {
+    **{col: dtype for col, dtype in numpy_dtypes(SLEEP_DTYPES).items() if col != 'Blood Pressure'},
+    'Systolic BP': 'int16',
+    'Diastolic BP': 'int16',
+    'Age_Group': 'category',
+}
+
+SOCIAL_CATEGORICAL = ['App']
+
+# User_ID is read as text and encoded to integers per chunk; the counts are
+# non-negative, int16 for minutes (a day has 1440), posts and follows,
+# int32 for likes (nullable on read, like the sleep integers)
+SOCIAL_DTYPES = {
+    'User_ID': 'object',
+    'App': 'category',
+    'Daily_Minutes_Spent': 'Int16',
+    'Posts_Per_Day': 'Int16',
+    'Likes_Per_Day': 'Int32',
+    'Follows_Per_Day': 'Int16',
+}
+
+# Dtype plan of the cleaned social frame: integer user IDs plus the derived Usage_Band
+SOCIAL_DTYPE_PLAN = {
+    **numpy_dtypes(SOCIAL_DTYPES),
+    'User_ID': 'int32',
+    'Usage_Band': 'category',
+}
+USER_ID_PREFIX = 'U_'
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def split_blood_pressure(chunk, column='Blood Pressure'):
+    """Replace a 'systolic/diastolic' string column with two Int16 columns (NA where it is missing)"""
+    if column not in chunk.columns:
+        return chunk
+    parts = chunk[column].str.partition('/')
+    position = chunk.columns.get_loc(column)
+    chunk = chunk.drop(columns=column)
+    chunk.insert(position, 'Systolic BP', pd.to_numeric(parts[0]).astype('Int16'))
+    chunk.insert(position + 1, 'Diastolic BP', pd.to_numeric(parts[2]).astype('Int16'))
+    return chunk
+
+
+def encode_user_ids(chunk, column='User_ID', prefix=USER_ID_PREFIX):
+    """Replace '<prefix><n>' string IDs with the integer n (int64; the dtype plan narrows it)"""
+    if column not in chunk.columns or chunk[column].dtype.kind in 'iu':
+        return chunk
+    ids = chunk[column].astype(str)
+    prefixed = ids.str.startswith(prefix)
+    if not prefixed.all():
+        raise ValueError(f"{column} {ids[~prefixed].iloc[0]!r} does not start with {prefix!r}")
+    chunk[column] = pd.to_numeric(ids.str.slice(len(prefix))).astype('int64')
+    return chunk
+
+
+def apply_dtype_plan(frame, plan):
+    """Cast ``frame``'s columns in place to the dtypes in ``plan`` (absent columns are skipped)
+
+    Integer casts are range-checked first, since numpy would silently wrap.
+    An integer column with missing values has no numpy integer form; it
+    becomes the narrowest float that holds every value of that integer
+    dtype exactly, with NaN for the missing ones.
+    """
+    for col, dtype in plan.items():
+        if col not in frame.columns:
+            continue
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if frame[col].dtype == dtype:
+            continue
+        if dtype.kind in 'iu' and frame[col].notna().any():
+            info = np.iinfo(dtype)
+            if frame[col].min() < info.min or frame[col].max() > info.max:
+                raise ValueError(f"Column {col!r} has values outside the {dtype} range")
+        if dtype.kind in 'iu' and frame[col].isna().any():
+            dtype = np.dtype('float32' if dtype.itemsize <= 2 else 'float64')
+        frame[col] = frame[col].astype(dtype)
+    return frame
+
+
+def decimal_values(values):
+    """float64 copy of ``values``; float32 input is rounded back to the 7
+    significant digits it holds, so 6.7 stored as 6.6999998 reads as 6.7 again
+    and bins, ties and sums match the float64 pipeline
+    """
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        return values.astype('float64')
+    widened = values.astype('float64')
+    finite = np.isfinite(widened) & (widened != 0)
+    exponents = np.zeros(len(widened), dtype='int64')
+    exponents[finite] = np.floor(np.log10(np.abs(widened[finite])))
+    for exponent in np.unique(exponents[finite]):
+        mask = finite & (exponents == exponent)
+        widened[mask] = np.round(widened[mask], int(6 - exponent))
+    return widened
+
+
+def decimal_columns(frame, columns):
+    """``frame[columns]`` as a float64 array, float32 columns through ``decimal_values``"""
+    if not any(frame[col].dtype == np.float32 for col in columns):
+        return frame[columns].to_numpy(dtype='float64')
+    return np.column_stack([decimal_values(frame[col]) for col in columns])
+
+
+def bytes_per_row(frame):
+    """Deep memory use of ``frame`` per row (strings counted in full)"""
+    return frame.memory_usage(deep=True, index=False).sum() / max(len(frame), 1)
+
+
+def concat_chunks(chunks):
+    """Concatenate chunks, unifying per-chunk categories instead of decaying to object
+
+    Unordered categories are sorted; ordered ones (binned labels) keep their order.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        raise ValueError("No chunks to concatenate")
+    categorical = {col: dtype for col, dtype in chunks[0].dtypes.items()
+                   if isinstance(dtype, pd.CategoricalDtype)}
+    unified = {col: union_categoricals([chunk[col] for chunk in chunks], sort_categories=not dtype.ordered)
+               for col, dtype in categorical.items()}
+    frame = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for col in categorical:
+        frame.insert(chunks[0].columns.get_loc(col), col, unified[col])
+    return frame
+
+
+def frame_chunks(frame, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield row slices (views, not copies) of an in-memory frame"""
+    for start in range(0, len(frame), chunksize):
+        yield frame.iloc[start:start + chunksize]
+
+
+class FrameSource:
+    """Re-iterable chunk view of an in-memory frame, interchangeable with CsvSource"""
+
+    def __init__(self, frame, chunksize=DEFAULT_CHUNKSIZE):
+        self.frame = frame
+        self.chunksize = chunksize
+
+    def __iter__(self):
+        return frame_chunks(self.frame, self.chunksize)
+
+    def read(self, columns=None):
+        return self.frame if columns is None else self.frame[columns]
+
+
+class CsvSource:
+    """Re-iterable chunked reader over a CSV file with a fixed dtype schema"""
+
+    def __init__(self, path, dtypes, chunksize=DEFAULT_CHUNKSIZE, transforms=()):
+        self.path = path
+        self.dtypes = dtypes
+        self.chunksize = chunksize
+        self.transforms = tuple(transforms)
+
+    def __iter__(self):
+        reader = pd.read_csv(self.path, dtype=self.dtypes, chunksize=self.chunksize)
+        with reader:
+            for chunk in reader:
+                for transform in self.transforms:
+                    chunk = transform(chunk)
+                yield chunk
+
+    def read(self, columns=None):
+        """Materialize the whole source (or just ``columns``) as one compact DataFrame"""
+        return concat_chunks(self if columns is None else (chunk[columns] for chunk in self))
+
+    def map(self, transform):
+        """The same file with ``transform`` applied to each chunk after the other transforms"""
+        return CsvSource(self.path, self.dtypes, self.chunksize, self.transforms + (transform,))
+
+
+def sleep_source(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Chunked source for the sleep health dataset, in the dtype plan"""
+    return CsvSource(path, SLEEP_DTYPES, chunksize=chunksize,
+                     transforms=(split_blood_pressure, partial(apply_dtype_plan, plan=SLEEP_DTYPE_PLAN)))
+
+
+def social_source(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Chunked source for the social media usage dataset, with integer user IDs, in the dtype plan"""
+    return CsvSource(path, SOCIAL_DTYPES, chunksize=chunksize,
+                     transforms=(encode_user_ids, partial(apply_dtype_plan, plan=SOCIAL_DTYPE_PLAN)))
+
+
+def _combine(left, right, pick):
+    return {col: pick(left[col], right[col]) for col in left}
+
+
+class ChunkProfile:
+    """Row count, memory, missing values, numeric ranges and categories accumulated chunk by chunk"""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.columns = None
+        self.dtypes = None
+        self.head = None
+        self.missing = None
+        self.minimum = None
+        self.maximum = None
+        self.categories = None
+
+    def update(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.dtypes = chunk.dtypes
+            self.head = chunk.head()
+            self.missing = pd.Series(0, index=chunk.columns, dtype='int64')
+        numeric = chunk.select_dtypes(include=np.number)
+        self.rows += len(chunk)
+        self.bytes += int(chunk.memory_usage(deep=True, index=False).sum())
+        self.missing = self.missing + chunk.isnull().sum()
+        # Per-column scalars keep each column's own dtype (a Series would upcast ints)
+        low = {col: numeric[col].min() for col in numeric.columns}
+        high = {col: numeric[col].max() for col in numeric.columns}
+        self.minimum = low if self.minimum is None else _combine(self.minimum, low, np.fmin)
+        self.maximum = high if self.maximum is None else _combine(self.maximum, high, np.fmax)
+        # Sorted union of each categorical column's categories, as concat_chunks unifies them
+        categories = {col: chunk[col].cat.categories for col, dtype in chunk.dtypes.items()
+                      if isinstance(dtype, pd.CategoricalDtype)}
+        self.categories = categories if self.categories is None else _combine(
+            self.categories, categories, pd.Index.union)
+        return self
+
+    def merge(self, other):
+        """Combine two profiles built over disjoint chunks of the same source"""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            return other
+        self.rows += other.rows
+        self.bytes += other.bytes
+        self.missing = self.missing + other.missing
+        self.minimum = _combine(self.minimum, other.minimum, np.fmin)
+        self.maximum = _combine(self.maximum, other.maximum, np.fmax)
+        self.categories = _combine(self.categories, other.categories, pd.Index.union)
+        return self
+
+    @property
+    def shape(self):
+        return (self.rows, len(self.columns or ()))
+
+    @property
+    def bytes_per_row(self):
+        """Deep memory use per row of the chunks seen, as ``bytes_per_row`` gives it for one frame"""
+        return self.bytes / max(self.rows, 1)
+
+    def missing_summary(self):
+        return pd.DataFrame({
+            'Missing_Count': self.missing,
+            'Missing_Percentage': (self.missing / self.rows) * 100
+        })
@@ -0,0 +1,103 @@
+"""Bounded-size interactive scatter export.
+
+``px.scatter(...).write_html`` inlines the full plotly.js bundle and one
+JSON number per row, so the file grows with the dataset. ``bounded_scatter``
+instead builds a WebGL (``scattergl``) trace from compact numpy arrays,
+which plotly serializes as base64 typed arrays, and caps what it embeds:
+
+* ``points``  - every row (the default while the row count is small);
+* ``sample``  - a stratified downsample of ``max_points`` rows that keeps
+  each colour stratum's share (and at least one row per stratum);
+* ``density`` - a 2D histogram heatmap whose size depends only on ``bins``.
+
+``auto`` uses ``points`` up to ``max_points`` and ``sample`` above it.
+``write_html`` points the page at a shared plotly.js instead of inlining it.
+"""
+import numpy as np
+import pandas as pd
+
+from .imports import lazy_import
+from .ingest import decimal_values
+
+go = lazy_import('plotly.graph_objects')
+
+DEFAULT_MAX_POINTS = 50_000
+DEFAULT_BINS = 80
+SIZE_MAX = 20
+MODES = ('auto', 'points', 'sample', 'density')
+
+
+def stratified_sample(frame, by, n, seed=0):
+    """Proportional stratified sample of ``n`` rows (at least one per stratum)"""
+    if len(frame) <= n:
+        return frame
+    codes, uniques = pd.factorize(frame[by], sort=True)
+    sizes = np.bincount(codes + 1, minlength=len(uniques) + 1)[1:]
+    quota = np.maximum(1, np.floor(sizes * (n / len(frame)))).astype('int64')
+    quota = np.minimum(quota, sizes)
+    rng = np.random.default_rng(seed)
+    # A random key per row; keep the rows with the smallest keys in each stratum
+    keys = rng.random(len(frame))
+    order = np.lexsort((keys, codes))
+    starts = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))])
+    ordered_codes = codes[order]
+    valid = ordered_codes >= 0
+    order, ordered_codes = order[valid], ordered_codes[valid]
+    rank = np.arange(len(order)) - starts[ordered_codes]
+    chosen = np.sort(order[rank < quota[ordered_codes]])
+    return frame.iloc[chosen]
+
+
+def _points_trace(frame, x, y, color, size, hover):
+    marker = {'opacity': 0.8}
+    if color is not None:
+        marker.update(color=frame[color].to_numpy(dtype='float32'), coloraxis='coloraxis')
+    if size is not None:
+        sizes = frame[size].to_numpy(dtype='float32')
+        marker.update(size=sizes, sizemode='area',
+                      sizeref=float(sizes.max()) / SIZE_MAX ** 2 if len(sizes) else 1)
+    hovertemplate = f'{x}=%{{x}}<br>{y}=%{{y}}'
+    if color is not None:
+        hovertemplate += f'<br>{color}=%{{marker.color}}'
+    customdata = None
+    if hover:
+        customdata = np.column_stack([frame[col].astype(str).to_numpy() for col in hover])
+        for i, col in enumerate(hover):
+            hovertemplate += f'<br>{col}=%{{customdata[{i}]}}'
+    return go.Scattergl(x=frame[x].to_numpy(dtype='float32'), y=frame[y].to_numpy(dtype='float32'),
+                        mode='markers', marker=marker, customdata=customdata,
+                        hovertemplate=hovertemplate + '<extra></extra>')
+
+
+def _density_trace(frame, x, y, bins):
+    counts, x_edges, y_edges = np.histogram2d(decimal_values(frame[x]), decimal_values(frame[y]), bins=bins)
+    counts = np.where(counts > 0, counts, np.nan).T.astype('float32')
+    return go.Heatmap(x=((x_edges[:-1] + x_edges[1:]) / 2).astype('float32'),
+                      y=((y_edges[:-1] + y_edges[1:]) / 2).astype('float32'),
+                      z=counts, coloraxis='coloraxis',
+                      hovertemplate=f'{x}=%{{x}}<br>{y}=%{{y}}<br>rows=%{{z}}<extra></extra>')
+
+
+def bounded_scatter(frame, x, y, color=None, size=None, hover=(), title=None,
+                    max_points=DEFAULT_MAX_POINTS, mode='auto', bins=DEFAULT_BINS, seed=0):
+    """Scatter figure whose embedded data is bounded by ``max_points`` or ``bins``"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown interactive mode {mode!r}; expected one of {MODES}")
+    if mode == 'auto':
+        mode = 'points' if len(frame) <= max_points else 'sample'
+    if mode == 'density':
+        fig = go.Figure(_density_trace(frame, x, y, bins))
+        colorbar_title = 'rows'
+    else:
+        if mode == 'sample':
+            frame = stratified_sample(frame, color or x, max_points, seed=seed)
+        fig = go.Figure(_points_trace(frame, x, y, color, size, list(hover)))
+        colorbar_title = color
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y,
+                      coloraxis={'colorscale': 'Plasma', 'colorbar': {'title': {'text': colorbar_title}}})
+    return fig
+
+
+def write_html(fig, path, plotlyjs='directory'):
+    """Write ``fig`` referencing a shared plotly.js ('directory', 'cdn' or a URL)"""
+    fig.write_html(path, include_plotlyjs=plotlyjs, full_html=True)
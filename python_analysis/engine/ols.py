@@ -0,0 +1,353 @@
+"""Ordinary least squares from Gram (cross-product) matrices.
+
+For a block of rows with features X and target y, the augmented Gram
+matrix ``G = Z'Z`` of ``Z = [1, X, y]`` holds everything a linear
+regression needs: n, the column sums, X'X, X'y and y'y. Gram matrices of
+disjoint blocks add, so a model over several blocks is a sum, and a model
+over every row except one block is a subtraction (downdating). Any subset
+of the features is fit from the matching sub-matrix without touching the
+rows again, and a fitted model is scored on a block from that block's Gram
+matrix alone.
+
+Rows with a missing value are skipped. The rest are shifted by a fixed
+reference point (by default the column means of the first block) before
+they are multiplied. This keeps the cross products small and the downdated
+differences accurate; the shift cancels out of the slopes and is added back
+into the intercept.
+
+``StreamingOLS`` applies this out of core: one pass over a chunk source
+accumulates train and test Gram matrices (so coefficients, MSE and R^2 need
+no design matrix in memory), a second pass collects a bounded sample of
+test residuals for the diagnostics, and partial accumulators merge, so
+chunks can be processed by several workers.
+
+The same matrix gives every variance inflation factor at once: the VIFs
+are the diagonal of the inverse correlation matrix of the features, so one
+scan replaces one auxiliary regression per feature.
+"""
+import math
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .ingest import decimal_columns, decimal_values
+
+Fit = namedtuple('Fit', ['features', 'intercept', 'coef'])
+
+# Eigenvalues below RCOND * the largest are treated as exact collinearity
+RCOND = 1e-10
+
+# Test rows kept for residual plots; larger test sets are sampled down
+DEFAULT_MAX_RESIDUALS = 100_000
+
+Residuals = namedtuple('Residuals', ['predicted', 'residuals', 'rows'])
+
+
+def inverse_diagonal(corr, rcond=RCOND):
+    """Diagonal of ``inv(corr)``, with an eigen-decomposition fallback
+
+    Well-conditioned matrices go through a Cholesky solve. Near-singular ones
+    use the pseudo-inverse over the non-null eigenvectors, and a column that
+    loads on a null direction (an exact linear combination of the others)
+    gets ``inf`` rather than a misleading finite value.
+    """
+    corr = np.asarray(corr, dtype='float64')
+    eigenvalues, vectors = np.linalg.eigh(corr)
+    kept = eigenvalues > rcond * max(eigenvalues.max(), 0)
+    if kept.all():
+        factor = np.linalg.cholesky(corr)
+        inverse_factor = np.linalg.solve(factor, np.eye(len(corr)))
+        return (inverse_factor * inverse_factor).sum(axis=0)
+    diagonal = (vectors[:, kept] ** 2 / eigenvalues[kept]).sum(axis=1)
+    diagonal[(vectors[:, ~kept] ** 2).sum(axis=1) > np.sqrt(rcond)] = np.inf
+    return diagonal
+
+
+class Gram:
+    """Augmented cross-product matrix of ``[1, X, y]`` over some rows"""
+
+    def __init__(self, features, target, shift, matrix=None):
+        self.features = list(features)
+        self.target = target
+        self.shift = np.asarray(shift, dtype='float64')
+        size = len(self.features) + 2
+        self.matrix = np.zeros((size, size)) if matrix is None else matrix
+
+    @classmethod
+    def from_arrays(cls, X, y, features=None, target='y', shift=None):
+        """Gram matrix of one block; ``shift`` defaults to its column means"""
+        Z = np.column_stack([X, y]).astype('float64')
+        if features is None:
+            features = list(getattr(X, 'columns', range(Z.shape[1] - 1)))
+        if shift is None:
+            shift = np.nanmean(Z, axis=0)
+        return cls(features, target, shift).update(X, y)
+
+    @classmethod
+    def from_frame(cls, frame, features, target, shift=None):
+        return cls.from_arrays(decimal_columns(frame, features),
+                               decimal_values(frame[target]),
+                               features=features, target=target, shift=shift)
+
+    @classmethod
+    def from_chunks(cls, chunks, features, target):
+        """One scan over frame chunks; the first chunk's means are the shift"""
+        gram = None
+        for chunk in chunks:
+            X = decimal_columns(chunk, features)
+            y = decimal_values(chunk[target])
+            if gram is None:
+                gram = cls.from_arrays(X, y, features=features, target=target)
+            else:
+                gram.update(X, y)
+        if gram is None:
+            raise ValueError("No chunks to accumulate")
+        return gram
+
+    def design(self, X, y):
+        """Shifted ``[1, X, y]`` rows as they enter the Gram matrix"""
+        Z = np.column_stack([X, y]).astype('float64') - self.shift
+        return np.column_stack([np.ones(len(Z)), Z])
+
+    def update(self, X, y):
+        """Add the rows of ``X`` and ``y``; rows with a missing value are skipped"""
+        Z = self.design(X, y)
+        Z = Z[~np.isnan(Z).any(axis=1)]
+        self.matrix += Z.T @ Z
+        return self
+
+    @property
+    def n(self):
+        return self.matrix[0, 0]
+
+    def _compatible(self, other):
+        if (other.features != self.features or other.target != self.target
+                or not np.array_equal(other.shift, self.shift)):
+            raise ValueError("Gram matrices must share features, target and shift")
+
+    def merge(self, other):
+        """Fold in the Gram matrix of a disjoint block of rows"""
+        self._compatible(other)
+        self.matrix += other.matrix
+        return self
+
+    def __add__(self, other):
+        self._compatible(other)
+        return Gram(self.features, self.target, self.shift, self.matrix + other.matrix)
+
+    def __sub__(self, other):
+        """Downdate: the rows of ``self`` that are not in ``other``"""
+        self._compatible(other)
+        return Gram(self.features, self.target, self.shift, self.matrix - other.matrix)
+
+    def _positions(self, features):
+        return np.array([1 + self.features.index(feature) for feature in features], dtype='int64')
+
+    def _centred(self, idx):
+        sums = self.matrix[0]
+        return self.matrix[np.ix_(idx, idx)] - np.outer(sums[idx], sums[idx]) / self.n
+
+    def correlation(self, features=None):
+        features = list(self.features if features is None else features)
+        sxx = self._centred(self._positions(features))
+        scale = np.sqrt(np.diag(sxx))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sxx / np.outer(scale, scale)
+
+    def vif(self, features=None, rcond=RCOND):
+        """Variance inflation factor of every feature (NaN for constant columns)"""
+        corr = self.correlation(features)
+        constant = np.isnan(np.diag(corr))
+        result = np.full(len(corr), np.nan)
+        varying = ~constant
+        result[varying] = inverse_diagonal(corr[np.ix_(varying, varying)], rcond)
+        return result
+
+    def solve(self, features=None):
+        """Least-squares fit of the target on ``features`` (default: all)"""
+        features = list(self.features if features is None else features)
+        idx, t = self._positions(features), len(self.features) + 1
+        n, sums = self.n, self.matrix[0]
+        # Centred normal equations, scaled to unit diagonal for conditioning
+        sxx = self._centred(idx)
+        sxy = self.matrix[idx, t] - sums[idx] * sums[t] / n
+        scale = np.sqrt(np.diag(sxx))
+        scale[scale == 0] = 1
+        coef = np.linalg.lstsq(sxx / np.outer(scale, scale), sxy / scale, rcond=None)[0] / scale
+        shifted_intercept = (sums[t] - sums[idx] @ coef) / n
+        intercept = shifted_intercept + self.shift[-1] - self.shift[idx - 1] @ coef
+        return Fit(features, float(intercept), coef)
+
+    def residual_sum_of_squares(self, fit):
+        idx, t = self._positions(fit.features), len(self.features) + 1
+        weights = np.zeros(len(self.matrix))
+        weights[0] = -(fit.intercept - self.shift[-1] + self.shift[idx - 1] @ fit.coef)
+        weights[idx] = -fit.coef
+        weights[t] = 1
+        return float(max(weights @ self.matrix @ weights, 0.0))
+
+    def standard_errors(self, fit):
+        """Classical standard errors of ``fit``'s slopes on the rows of this Gram matrix"""
+        idx = self._positions(fit.features)
+        dof = self.n - len(idx) - 1
+        sigma2 = self.residual_sum_of_squares(fit) / dof if dof > 0 else np.nan
+        sxx = self._centred(idx)
+        scale = np.sqrt(np.diag(sxx))
+        scale[scale == 0] = 1
+        inverse = np.linalg.pinv(sxx / np.outer(scale, scale)) / np.outer(scale, scale)
+        return np.sqrt(sigma2 * np.diag(inverse))
+
+    def score(self, fit):
+        """(MSE, R^2) of ``fit`` on the rows of this Gram matrix"""
+        t = len(self.features) + 1
+        sse = self.residual_sum_of_squares(fit)
+        sst = self.matrix[t, t] - self.matrix[0, t] ** 2 / self.n
+        return float(sse / self.n), float(1 - sse / sst)
+
+
+def vif_table(gram):
+    """Every VIF at once from the inverse correlation matrix of a Gram matrix"""
+    return pd.DataFrame({'Variable': gram.features, 'VIF': gram.vif()})
+
+
+def business_impact(model_coefficient, feature_change, baseline_value):
+    """Convert statistical results to business metrics"""
+    predicted_change = model_coefficient * feature_change
+    percentage_change = (predicted_change / baseline_value) * 100
+    return f"Changing {feature_change} units results in {percentage_change:.1f}% change"
+
+
+# ----------------------------------------------------------------------------
+# Out-of-core fitting
+# ----------------------------------------------------------------------------
+
+class PositionalSplit:
+    """Test rows chosen by position, as ``train_test_split(..., random_state)``
+
+    The test set is the first ``ceil(test_size * n)`` entries of
+    ``RandomState(random_state).permutation(n)``, sklearn's shuffle split,
+    so a streamed fit scores the same rows as the in-memory one. Needs the
+    row count up front and one byte per row.
+    """
+
+    def __init__(self, n, test_size=0.2, random_state=None):
+        permutation = np.random.RandomState(random_state).permutation(n)
+        self.mask = np.zeros(n, dtype=bool)
+        self.mask[permutation[:math.ceil(test_size * n)]] = True
+
+    def __call__(self, chunk, start):
+        return self.mask[start:start + len(chunk)]
+
+
+class HashSplit:
+    """Test rows chosen by a hash of a key column; needs no row count"""
+
+    def __init__(self, column, test_size=0.2, seed=0):
+        self.column = column
+        self.test_size = test_size
+        self.hash_key = f'{seed:016d}'[-16:]
+
+    def __call__(self, chunk, start):
+        hashes = pd.util.hash_array(chunk[self.column].to_numpy(), hash_key=self.hash_key)
+        return hashes < np.uint64(self.test_size * 2.0 ** 64)
+
+
+class StreamingOLS:
+    """Train and test Gram matrices accumulated chunk by chunk"""
+
+    def __init__(self, features, target, shift):
+        self.train = Gram(features, target, shift)
+        self.test = Gram(features, target, shift)
+
+    def _arrays(self, chunk):
+        return (decimal_columns(chunk, self.train.features),
+                decimal_values(chunk[self.train.target]))
+
+    def update(self, chunk, test_mask):
+        X, y = self._arrays(chunk)
+        self.train.update(X[~test_mask], y[~test_mask])
+        self.test.update(X[test_mask], y[test_mask])
+        return self
+
+    def merge(self, other):
+        self.train.merge(other.train)
+        self.test.merge(other.test)
+        return self
+
+    def fit(self):
+        return self.train.solve()
+
+    def residuals(self, source, split, fit, max_rows=DEFAULT_MAX_RESIDUALS, seed=0):
+        """Predictions and residuals of test rows (a uniform sample past ``max_rows``)"""
+        rng = np.random.default_rng(seed)
+        kept = {'predicted': [], 'residuals': [], 'keys': []}
+        start = 0
+        for chunk in source:
+            mask = split(chunk, start)
+            start += len(chunk)
+            X, y = self._arrays(chunk)
+            mask &= ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+            predicted = fit.intercept + X[mask] @ fit.coef
+            kept['predicted'].append(predicted)
+            kept['residuals'].append(y[mask] - predicted)
+            kept['keys'].append(rng.random(len(predicted)))
+            _keep_smallest(kept, max_rows)
+        _keep_smallest(kept, max_rows, force=True)
+        return Residuals(kept['predicted'][0], kept['residuals'][0], int(self.test.n))
+
+
+def _keep_smallest(kept, max_rows, force=False):
+    """Collapse the buffered parts, keeping the ``max_rows`` smallest random keys"""
+    if not force and sum(len(part) for part in kept['keys']) <= 2 * max_rows:
+        return
+    arrays = {name: np.concatenate(parts) for name, parts in kept.items()}
+    if len(arrays['keys']) > max_rows:
+        chosen = np.sort(np.argpartition(arrays['keys'], max_rows)[:max_rows])
+        arrays = {name: values[chosen] for name, values in arrays.items()}
+    for name, values in arrays.items():
+        kept[name] = [values]
+
+
+def _chunk_stats(chunk, start, split, features, target, shift):
+    return StreamingOLS(features, target, shift).update(chunk, split(chunk, start))
+
+
+def fit_streaming(source, features, target, split, workers=1, max_residuals=DEFAULT_MAX_RESIDUALS, seed=0):
+    """Fit OLS over a re-iterable chunk source in two passes
+
+    Returns ``(StreamingOLS, Fit, (mse, r2), Residuals)``. Chunk Gram
+    matrices are computed on ``workers`` threads and merged.
+    """
+    chunks = iter(source)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError("No chunks to fit")
+    shift = np.nanmean(np.column_stack([decimal_columns(first, features), decimal_values(first[target])]), axis=0)
+    stats = StreamingOLS(features, target, shift).update(first, split(first, 0))
+
+    def positioned(start=len(first)):
+        for chunk in chunks:
+            yield chunk, start
+            start += len(chunk)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for chunk, start in positioned():
+            stats.update(chunk, split(chunk, start))
+    else:
+        # At most 2 * workers chunks are in flight, so memory stays bounded
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk, start in positioned():
+                pending.append(pool.submit(_chunk_stats, chunk, start, split, features, target, shift))
+                if len(pending) >= 2 * workers:
+                    stats.merge(pending.popleft().result())
+            while pending:
+                stats.merge(pending.popleft().result())
+    fit = stats.fit()
+    residuals = stats.residuals(source, split, fit, max_rows=max_residuals, seed=seed)
+    return stats, fit, stats.test.score(fit), residuals
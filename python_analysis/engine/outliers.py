@@ -0,0 +1,133 @@
+"""Vectorized IQR outlier detection and filtering.
+
+All column bounds come from one quantile call on an in-memory frame, or
+from an ``IqrAccumulator`` fed the chunks of the ingest pass: exact value
+counts (the same quartiles, for columns with a bounded set of distinct
+values, such as the exports' integers and 0.1 h durations) or, with
+``approx=True``, KLL sketches whose memory is bounded whatever the values.
+Outlier counts and
+the keep-mask are computed on a single numeric block, and the mask is
+applied once instead of narrowing the frame column by column. Bounds and
+counts can be weighted by a column of row weights, so a stratified sample
+is filtered as the rows it stands for would be.
+"""
+import numpy as np
+import pandas as pd
+
+from .ingest import decimal_columns
+from .sketch import DEFAULT_K, KllSketch
+from .summary import ValueCounts
+
+IQR_FACTOR = 1.5
+
+
+def _bounds_frame(q1, q3, columns, factor):
+    iqr = q3 - q1
+    return pd.DataFrame({
+        'lower_bound': q1 - factor * iqr,
+        'upper_bound': q3 + factor * iqr
+    }, index=pd.Index(columns))
+
+
+def iqr_bounds(frame, columns, factor=IQR_FACTOR, weight=None):
+    """Exact Q1 - 1.5*IQR / Q3 + 1.5*IQR bounds for every column at once
+
+    With ``weight``, the name of a column of row weights, the quartiles are
+    those of the weighted distribution (equal weights give the unweighted ones).
+    """
+    values = decimal_columns(frame, columns)
+    weights = None if weight is None else frame[weight].to_numpy(dtype='float64')
+    if weights is None or len(np.unique(weights)) <= 1:
+        q1, q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+    else:
+        present = ~np.isnan(values)
+        q1, q3 = np.array([np.quantile(column[kept], [0.25, 0.75], weights=weights[kept], method='inverted_cdf')
+                           for column, kept in zip(values.T, present.T)]).T
+    return _bounds_frame(q1, q3, columns, factor)
+
+
+def sketch_iqr_bounds(chunks, columns, factor=IQR_FACTOR, k=DEFAULT_K):
+    """Approximate IQR bounds from one pass of KLL sketches over chunks"""
+    accumulator = IqrAccumulator(columns, approx=True, k=k)
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator.bounds(factor)
+
+
+def sketch_bounds(sketches, columns, factor=IQR_FACTOR):
+    """IQR bounds from one quantile sketch per column (e.g. a SummaryAccumulator's)"""
+    quartiles = np.array([sketch.quantile([0.25, 0.75]) for sketch in sketches])
+    return _bounds_frame(quartiles[:, 0], quartiles[:, 1], columns, factor)
+
+
+class IqrAccumulator:
+    """Quartiles of some columns gathered chunk by chunk, for IQR bounds after the pass"""
+
+    def __init__(self, columns, approx=False, k=DEFAULT_K):
+        self.columns = list(columns)
+        self.approx = approx
+        if approx:
+            self.sketches = [KllSketch(k=k, seed=i) for i in range(len(self.columns))]
+        else:
+            self.counts = ValueCounts(self.columns)
+
+    def update(self, chunk):
+        if self.approx:
+            for sketch, column in zip(self.sketches, decimal_columns(chunk, self.columns).T):
+                sketch.update(column)
+        else:
+            self.counts.update(chunk)
+        return self
+
+    def bounds(self, factor=IQR_FACTOR):
+        """Bounds as ``iqr_bounds`` gives them on every row seen (approximate with ``approx``)"""
+        if self.approx:
+            return sketch_bounds(self.sketches, self.columns, factor)
+        quartiles = np.array([self.counts.quantile(col, [0.25, 0.75]) for col in self.columns])
+        return _bounds_frame(quartiles[:, 0], quartiles[:, 1], self.columns, factor)
+
+
+def _outside(frame, bounds):
+    values = decimal_columns(frame, list(bounds.index))
+    return ((values < bounds['lower_bound'].to_numpy())
+            | (values > bounds['upper_bound'].to_numpy()))
+
+
+def summarize_outliers(chunks, bounds, weight=None):
+    """Outlier count/percentage per column plus the bounds used
+
+    With ``weight`` (a column of row weights) counts are sums of weights.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    counts = np.zeros(len(bounds), dtype='int64' if weight is None else 'float64')
+    rows = 0
+    for chunk in chunks:
+        if weight is None:
+            counts += _outside(chunk, bounds).sum(axis=0)
+            rows += len(chunk)
+        else:
+            weights = chunk[weight].to_numpy(dtype='float64')
+            counts += weights @ _outside(chunk, bounds)
+            rows += weights.sum()
+    summary = pd.DataFrame({
+        'outlier_count': counts,
+        'outlier_percentage': (counts / rows) * 100 if rows else np.zeros(len(bounds))
+    }, index=bounds.index)
+    return summary.join(bounds)
+
+
+def keep_mask(frame, bounds):
+    """Boolean mask of rows inside the bounds of every column in ``bounds``"""
+    values = decimal_columns(frame, list(bounds.index))
+    inside = ((values >= bounds['lower_bound'].to_numpy())
+              & (values <= bounds['upper_bound'].to_numpy()))
+    return inside.all(axis=1)
+
+
+def filter_outliers(frame, summary, threshold=5.0):
+    """Drop rows outside the bounds of columns whose outlier share exceeds threshold"""
+    selected = summary[summary['outlier_percentage'] > threshold]
+    if selected.empty:
+        return frame.copy(deep=False)
+    return frame[keep_mask(frame, selected[['lower_bound', 'upper_bound']])]
@@ -0,0 +1,37 @@
+"""Repository paths, resolved from this file rather than the working directory.
+
+Analysis scripts used to reach their data and outputs through paths like
+``'../../data/...'``, which only worked when launched from their own
+directory. Everything here is absolute, so a script runs the same from the
+repo root, its own folder or the batch runner.
+"""
+import os
+
+PYTHON_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(PYTHON_ROOT)
+
+ANALYSIS_DIR = os.path.join(PYTHON_ROOT, 'analysis')
+DATA_DIR = os.path.join(PYTHON_ROOT, 'data')
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+GRAPHS_DIR = os.path.join(REPO_ROOT, 'public', 'graphs')
+DATA_API_DIR = os.path.join(REPO_ROOT, 'public', 'data')
+
+
+def dataset(filename):
+    """Path of a raw dataset under python_analysis/data"""
+    return os.path.join(DATA_DIR, filename)
+
+
+def graphs_dir(analysis):
+    """Figure output directory of one analysis (public/graphs/<analysis>)"""
+    return os.path.join(GRAPHS_DIR, analysis)
+
+
+def data_api_dir(analysis):
+    """JSON data feed directory of one analysis (public/data/<analysis>)"""
+    return os.path.join(DATA_API_DIR, analysis)
+
+
+def relative(path):
+    """``path`` relative to the repo root, for logs and reports"""
+    return os.path.relpath(path, REPO_ROOT)
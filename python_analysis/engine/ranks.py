@@ -0,0 +1,234 @@
+"""Exact tie-corrected rank statistics from value-frequency tables.
+
+Spearman's rho and the Mann-Whitney U only depend on how many rows share
+each value, and the sleep columns are heavily tied (durations to 0.1 h,
+scores on a 1-10 scale). ``FrequencyTable`` maps each value onto an integer
+grid (``round(value * scale)`` for the smallest power-of-ten scale that is
+exact) and counts (row value, column value) pairs with ``np.bincount``. The
+column is a second variable for Spearman or a group label for Mann-Whitney
+and Kruskal-Wallis.
+Mid-ranks then come from cumulative level counts, so a test costs O(n + k)
+for k distinct values instead of a sort of the whole column.
+
+Tables from disjoint chunks merge by adding counts on the shared grid; a
+chunk whose values happened to fit a coarser grid (whole hours, say) is
+first spread onto the finer one, so the tables of a stream merge whatever
+each chunk held. Columns with no exact grid (truly continuous values) fall
+back to keeping the raw values and ranking them with one sort when the
+table is read.
+"""
+import numpy as np
+
+from .imports import lazy_import
+
+# scipy.stats takes about a second to import; load it on first use
+stats = lazy_import('scipy.stats')
+
+SCALES = (1, 10, 100, 1000)
+DEFAULT_MAX_LEVELS = 100_000
+
+
+def grid_scale(values, max_levels=DEFAULT_MAX_LEVELS):
+    """Smallest scale in SCALES putting every value on an integer grid, or None"""
+    values = np.asarray(values, dtype='float64')
+    if len(values) == 0:
+        return 1
+    for scale in SCALES:
+        scaled = values * scale
+        codes = np.rint(scaled)
+        if (np.all(np.abs(scaled - codes) <= 1e-6 * np.maximum(1, np.abs(scaled)))
+                and codes.max() - codes.min() < max_levels):
+            return scale
+    return None
+
+
+def midranks(counts):
+    """Average rank of each level given how many rows hold it"""
+    return np.cumsum(counts) - (counts - 1) / 2
+
+
+class FrequencyTable:
+    """Counts of (row value, column value) pairs on integer grids, mergeable"""
+
+    def __init__(self, scales):
+        self.scales = tuple(scales)
+        self.continuous = None in self.scales
+        self.offsets = (0, 0)
+        self.counts = np.zeros((0, 0), dtype='int64')
+        self.raw = []
+
+    @classmethod
+    def from_arrays(cls, rows, columns, max_levels=DEFAULT_MAX_LEVELS):
+        """Joint table of two paired variables (for Spearman)"""
+        return cls((grid_scale(rows, max_levels), grid_scale(columns, max_levels))).update(rows, columns)
+
+    @classmethod
+    def from_groups(cls, *samples, max_levels=DEFAULT_MAX_LEVELS):
+        """Table of one variable by sample index (for Mann-Whitney)"""
+        values = np.concatenate([np.asarray(sample, dtype='float64') for sample in samples])
+        groups = np.repeat(np.arange(len(samples)), [len(sample) for sample in samples])
+        return cls((grid_scale(values, max_levels), 1)).update(values, groups)
+
+    @classmethod
+    def from_codes(cls, values, codes, max_levels=DEFAULT_MAX_LEVELS):
+        """Table of one variable by integer group code, e.g. categorical codes (for Kruskal-Wallis)"""
+        return cls((grid_scale(values, max_levels), 1)).update(values, codes)
+
+    def _codes(self, values, scale):
+        scaled = np.asarray(values, dtype='float64') * scale
+        codes = np.rint(scaled)
+        if not np.all(np.abs(scaled - codes) <= 1e-6 * np.maximum(1, np.abs(scaled))):
+            raise ValueError(f"Values are not on the 1/{scale} grid of this table")
+        return codes.astype('int64')
+
+    def _resize(self, low, high):
+        """Grow the dense count grid to cover codes low..high (per axis)"""
+        low = tuple(min(a, b) for a, b in zip(low, self.offsets)) if self.counts.size else low
+        high = (tuple(max(a, b) for a, b in zip(high, np.add(self.offsets, self.counts.shape) - 1))
+                if self.counts.size else high)
+        shape = (high[0] - low[0] + 1, high[1] - low[1] + 1)
+        if self.counts.size and shape == self.counts.shape:
+            return
+        grown = np.zeros(shape, dtype='int64')
+        if self.counts.size:
+            r, c = self.offsets[0] - low[0], self.offsets[1] - low[1]
+            grown[r:r + self.counts.shape[0], c:c + self.counts.shape[1]] = self.counts
+        self.offsets, self.counts = low, grown
+
+    def _add(self, offsets, counts):
+        self._resize(offsets, np.add(offsets, counts.shape) - 1)
+        r, c = offsets[0] - self.offsets[0], offsets[1] - self.offsets[1]
+        self.counts[r:r + counts.shape[0], c:c + counts.shape[1]] += counts
+
+    def update(self, rows, columns):
+        if self.continuous:
+            self.raw.append(np.column_stack([rows, columns]).astype('float64'))
+            return self
+        row_codes, column_codes = self._codes(rows, self.scales[0]), self._codes(columns, self.scales[1])
+        if len(row_codes) == 0:
+            return self
+        low = (int(row_codes.min()), int(column_codes.min()))
+        shape = (int(row_codes.max()) - low[0] + 1, int(column_codes.max()) - low[1] + 1)
+        flat = (row_codes - low[0]) * shape[1] + (column_codes - low[1])
+        self._add(low, np.bincount(flat, minlength=shape[0] * shape[1]).reshape(shape))
+        return self
+
+    def regrid(self, scales):
+        """The same counts on the finer ``scales``, each a multiple of this table's"""
+        if self.continuous or None in scales or any(new % old for new, old in zip(scales, self.scales)):
+            raise ValueError("Cannot merge frequency tables on different grids")
+        factors = tuple(new // old for new, old in zip(scales, self.scales))
+        table = FrequencyTable(scales)
+        if self.counts.size:
+            rows, columns = self.counts.shape
+            table.offsets = (self.offsets[0] * factors[0], self.offsets[1] * factors[1])
+            table.counts = np.zeros(((rows - 1) * factors[0] + 1, (columns - 1) * factors[1] + 1), dtype='int64')
+            table.counts[::factors[0], ::factors[1]] = self.counts
+        return table
+
+    def merge(self, other):
+        """Fold in a table built over disjoint rows, on the finer of the two grids"""
+        if other.scales != self.scales and not (self.continuous or other.continuous):
+            scales = tuple(max(mine, theirs) for mine, theirs in zip(self.scales, other.scales))
+            if scales != self.scales:
+                regridded = self.regrid(scales)
+                self.scales, self.offsets, self.counts = scales, regridded.offsets, regridded.counts
+            other = other.regrid(scales) if other.scales != scales else other
+        if other.scales != self.scales:
+            raise ValueError("Cannot merge frequency tables on different grids")
+        if self.continuous:
+            self.raw.extend(other.raw)
+        elif other.counts.size:
+            self._add(other.offsets, other.counts)
+        return self
+
+    def pairs(self):
+        """Raw (row, column) values kept by a continuous table"""
+        return np.concatenate(self.raw) if self.raw else np.zeros((0, 2))
+
+    def levels(self):
+        """(row values, column values, counts) over the occupied levels only"""
+        if self.continuous:
+            pairs = self.pairs()
+            # Fallback for continuous values: one sort per axis
+            row_values, row_codes = np.unique(pairs[:, 0], return_inverse=True)
+            column_values, column_codes = np.unique(pairs[:, 1], return_inverse=True)
+            flat = row_codes * len(column_values) + column_codes
+            counts = np.bincount(flat, minlength=len(row_values) * len(column_values))
+            return row_values, column_values, counts.reshape(len(row_values), len(column_values))
+        rows = np.flatnonzero(self.counts.any(axis=1))
+        columns = np.flatnonzero(self.counts.any(axis=0))
+        row_values = (rows + self.offsets[0]) / self.scales[0]
+        column_values = (columns + self.offsets[1]) / self.scales[1]
+        return row_values, column_values, self.counts[np.ix_(rows, columns)]
+
+
+def spearman(table):
+    """(rho, two-sided p) from a joint table, as ``scipy.stats.spearmanr``"""
+    if table.continuous:
+        # A dense joint grid would be n x n; rank each axis with one sort instead
+        pairs = table.pairs()
+        n = len(pairs)
+        rho = np.corrcoef(stats.rankdata(pairs[:, 0]), stats.rankdata(pairs[:, 1]))[0, 1]
+    else:
+        _, _, counts = table.levels()
+        counts = counts.astype('float64')
+        n = counts.sum()
+        row_counts, column_counts = counts.sum(axis=1), counts.sum(axis=0)
+        row_ranks = midranks(row_counts) - (n + 1) / 2
+        column_ranks = midranks(column_counts) - (n + 1) / 2
+        covariance = row_ranks @ counts @ column_ranks
+        rho = covariance / np.sqrt((row_counts * row_ranks ** 2).sum()
+                                   * (column_counts * column_ranks ** 2).sum())
+    dof = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = rho * np.sqrt(dof / ((rho + 1.0) * (1.0 - rho)))
+    return float(rho), float(2 * stats.t.sf(abs(t), dof))
+
+
+def mann_whitney(table):
+    """(U of the first group, two-sided p) with tie and continuity correction
+
+    Matches ``scipy.stats.mannwhitneyu(x, y, alternative='two-sided')`` in
+    its asymptotic mode (used whenever there are ties or either sample has
+    more than 8 rows).
+    """
+    _, _, counts = table.levels()
+    if counts.shape[1] != 2:
+        raise ValueError("Mann-Whitney needs exactly two groups")
+    counts = counts.astype('float64')
+    pooled = counts.sum(axis=1)
+    n1, n2 = counts[:, 0].sum(), counts[:, 1].sum()
+    n = n1 + n2
+    u1 = counts[:, 0] @ midranks(pooled) - n1 * (n1 + 1) / 2
+    u = max(u1, n1 * n2 - u1)
+    tie_term = (pooled ** 3 - pooled).sum()
+    sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    z = (u - n1 * n2 / 2 - 0.5) / sigma
+    return float(u1), float(min(2 * stats.norm.sf(z), 1.0))
+
+
+def kruskal(table):
+    """(H, p) across the table's groups, as ``scipy.stats.kruskal`` (tie-corrected)"""
+    _, _, counts = table.levels()
+    if counts.shape[1] < 2:
+        raise ValueError("Kruskal-Wallis needs at least two groups")
+    counts = counts.astype('float64')
+    pooled = counts.sum(axis=1)
+    sizes = counts.sum(axis=0)
+    n = sizes.sum()
+    rank_sums = midranks(pooled) @ counts
+    h = 12 / (n * (n + 1)) * (rank_sums ** 2 / sizes).sum() - 3 * (n + 1)
+    h /= 1 - (pooled ** 3 - pooled).sum() / (n ** 3 - n)
+    return float(h), float(stats.chi2.sf(h, counts.shape[1] - 1))
+
+
+def correlation_strength(correlation):
+    """Cohen's label for the size of a correlation coefficient"""
+    if abs(correlation) < 0.1:
+        return "negligible"
+    if abs(correlation) < 0.3:
+        return "small"
+    if abs(correlation) < 0.5:
+        return "medium"
+    return "large"
@@ -0,0 +1,100 @@
+"""Render matplotlib figures on a process pool.
+
+Each ``FigureJob`` names a pure render function (module level, so it can be
+pickled by reference) and the precomputed data it draws. The function
+builds and returns a ``matplotlib.figure.Figure`` without touching the
+pyplot state machine; ``render_figures`` saves it with the Agg backend,
+either in-process or on a pool of workers. A job's output depends only on
+its function and data, so parallel output is byte-identical to serial, and
+a ``BuildCache`` can skip jobs whose function, data and dpi are unchanged.
+Each figure is saved as the responsive set of files built by ``images``
+(SVG for ``vector`` jobs, multi-width AVIF/WebP otherwise, quantized PNGs
+for both), encoded in the worker that rendered it; ``render_figures``
+returns every job's manifest entry, cached jobs included. Given a
+``Tracer``, each figure is measured in the process that renders it and its
+span is sent back with the entry.
+"""
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from . import images
+from .cache import code_fingerprint
+from .imports import lazy_import
+from .trace import Tracer, max_rows
+
+# Imported when the first figure is rendered, not when the script starts
+matplotlib = lazy_import('matplotlib')
+
+# vector: a line or bar chart, published as SVG rather than raster variants
+FigureJob = namedtuple('FigureJob', ['name', 'render', 'data', 'vector'], defaults=(False,))
+
+DEFAULT_DPI = 300
+
+
+def _init_worker():
+    matplotlib.use('Agg')
+
+
+def _pool_context():
+    # Workers are forked so the calling script is not re-executed in each child
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def save_figure(job, output_dir, dpi=DEFAULT_DPI, responsive=True):
+    """Render one job and write its image files to ``output_dir``; returns its manifest entry"""
+    fig = job.render(**job.data)
+    return images.save_variants(fig, output_dir, job.name, dpi, vector=job.vector, responsive=responsive)
+
+
+def _save_traced(job, output_dir, dpi, responsive, origin, memory):
+    tracer = Tracer(memory=memory, origin=origin)
+    with tracer.span(job.name, 'figure', rows_in=max_rows(job.data.values())):
+        entry = save_figure(job, output_dir, dpi, responsive)
+    return entry, tracer.records[0]
+
+
+def render_figures(jobs, output_dir, workers=None, dpi=DEFAULT_DPI, cache=None, tracer=None,
+                   responsive=True):
+    """Render every stale job, on ``workers`` processes (1 renders serially)"""
+    jobs = list(jobs)
+    cached = {}
+    if cache is not None:
+        variants = images.settings() if responsive else None
+        keys = {job.name: cache.key(job.name, code_fingerprint(job.render), job.data, dpi,
+                                    job.vector, variants)
+                for job in jobs}
+        cached = {job.name: cache.value(job.name) for job in jobs if cache.fresh(job.name, keys[job.name])}
+    stale = [job for job in jobs if job.name not in cached]
+    if tracer is None or not tracer.enabled:
+        entries = _render(stale, output_dir, workers, dpi, responsive)
+    else:
+        saved = _render(stale, output_dir, workers, dpi, responsive, trace=(tracer.origin, tracer.memory))
+        entries = [entry for entry, _ in saved]
+        tracer.extend(record for _, record in saved)
+    rendered = dict(zip((job.name for job in stale), entries))
+    if cache is not None:
+        for name, entry in rendered.items():
+            cache.record(name, keys[name], images.entry_files(entry), value=entry)
+    return [cached[job.name] if job.name in cached else rendered[job.name] for job in jobs]
+
+
+def _render(jobs, output_dir, workers, dpi, responsive, trace=()):
+    if not jobs:
+        return []
+    save = _save_traced if trace else save_figure
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    context = _pool_context()
+    if workers <= 1 or context is None:
+        _init_worker()
+        return [save(job, output_dir, dpi, responsive, *trace) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker) as pool:
+        return list(pool.map(save, jobs, repeat(output_dir), repeat(dpi), repeat(responsive),
+                             *map(repeat, trace)))
@@ -0,0 +1,230 @@
+"""Batched, vectorized bootstrap and permutation resampling.
+
+Instead of looping ``for i in range(n_resamples)`` and calling a scipy test
+each time, resamples are drawn as index matrices of ``batch_size`` rows and
+the statistic is computed for the whole batch at once: every statistic
+below takes 2D arrays with one resample per row and returns one value per
+row (row-wise ranks, correlations, group mean differences, ...).
+
+Batches are spread over a thread pool (numpy's sorts and reductions release
+the GIL, and threads share the data without pickling). Each batch draws
+from its own child of ``np.random.SeedSequence(seed)``, so results depend
+only on ``seed``, ``n_resamples``, ``batch_size`` and the sample sizes,
+never on the worker count.
+
+A batch keeps several (resamples x rows) arrays alive at once: the index
+matrix, the resampled values, and argsort orders, positions and ranks for
+the rank statistics. ``batch_rows`` therefore caps a batch at
+``BATCH_ELEMENTS`` values, and ``batch_size`` is only an upper limit. Small
+samples keep ``batch_size`` resamples per batch, while large ones drop to
+fewer (one, if need be). Each worker then peaks at a fixed few hundred MB,
+whatever ``n_resamples`` and the row count are.
+
+Time still grows with resamples x rows: 10,000 resamples of every
+statistic take about a minute per core at 5,000 rows, and hours at a
+million. ``subsample`` bounds the rows a default run resamples to
+``DEFAULT_MAX_ROWS``, drawn uniformly, so a large export gets intervals of
+a known sample size in bounded time instead of exact-but-unaffordable ones.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_RESAMPLES = 10_000
+DEFAULT_BATCH_SIZE = 1_000
+# Values (resamples x rows) one batch may hold; the batch's arrays take
+# roughly 80 bytes per value between them
+BATCH_ELEMENTS = 1_000_000
+DEFAULT_CONFIDENCE = 0.95
+# Rows resampled by default; larger inputs are subsampled uniformly
+DEFAULT_MAX_ROWS = 5_000
+
+Interval = namedtuple('Interval', ['estimate', 'low', 'high', 'standard_error'])
+PermutationResult = namedtuple('PermutationResult', ['statistic', 'pvalue'])
+
+
+# ----------------------------------------------------------------------------
+# Row-wise statistics: arrays of shape (resamples, n) -> one value per row
+# ----------------------------------------------------------------------------
+
+def rank_rows(values):
+    """Tie-averaged ranks (1-based) of each row, like ``scipy.stats.rankdata``"""
+    values = np.asarray(values)
+    rows, n = values.shape
+    order = np.argsort(values, axis=1, kind='stable')
+    ordered = np.take_along_axis(values, order, axis=1)
+    starts = np.ones((rows, n), dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    # Tie runs are numbered across the whole batch; every row opens a new run
+    run = np.cumsum(starts.ravel()) - 1
+    positions = np.tile(np.arange(1, n + 1, dtype='float64'), rows)
+    average = (np.bincount(run, weights=positions) / np.bincount(run))[run]
+    ranks = np.empty((rows, n))
+    np.put_along_axis(ranks, order, average.reshape(rows, n), axis=1)
+    return ranks
+
+
+def pearson(x, y):
+    """Row-wise Pearson correlation"""
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (x * y).sum(axis=1) / np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+
+
+def spearman(x, y):
+    """Row-wise Spearman rank correlation"""
+    return pearson(rank_rows(x), rank_rows(y))
+
+
+def mean_difference(a, b):
+    return a.mean(axis=1) - b.mean(axis=1)
+
+
+def _pooled_std(a, b):
+    n1, n2 = a.shape[1], b.shape[1]
+    return np.sqrt(((n1 - 1) * a.var(axis=1, ddof=1) + (n2 - 1) * b.var(axis=1, ddof=1))
+                   / (n1 + n2 - 2))
+
+
+def t_statistic(a, b):
+    """Row-wise Student's t (equal variances), as ``scipy.stats.ttest_ind``"""
+    n1, n2 = a.shape[1], b.shape[1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return mean_difference(a, b) / (_pooled_std(a, b) * np.sqrt(1 / n1 + 1 / n2))
+
+
+def cohens_d(a, b):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return mean_difference(a, b) / _pooled_std(a, b)
+
+
+def mann_whitney_u(a, b):
+    """Row-wise U of the first sample, as ``scipy.stats.mannwhitneyu``"""
+    n1 = a.shape[1]
+    ranks = rank_rows(np.concatenate([a, b], axis=1))
+    return ranks[:, :n1].sum(axis=1) - n1 * (n1 + 1) / 2
+
+
+def r_squared(observed, predicted):
+    """Row-wise coefficient of determination of ``predicted`` against ``observed``"""
+    residual = ((observed - predicted) ** 2).sum(axis=1)
+    centred = observed - observed.mean(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 1 - residual / (centred * centred).sum(axis=1)
+
+
+def mean_squared_error(observed, predicted):
+    """Row-wise mean squared error of ``predicted`` against ``observed``"""
+    return ((observed - predicted) ** 2).mean(axis=1)
+
+
+def subsample(frame, max_rows=DEFAULT_MAX_ROWS, seed=0):
+    """``frame`` itself, or a uniform sample of ``max_rows`` of its rows in their original order
+
+    A falsy ``max_rows`` keeps every row.
+    """
+    if not max_rows or len(frame) <= max_rows:
+        return frame
+    rows = np.random.default_rng(seed).choice(len(frame), size=max_rows, replace=False)
+    return frame.iloc[np.sort(rows)]
+
+
+# ----------------------------------------------------------------------------
+# Batch scheduling
+# ----------------------------------------------------------------------------
+
+def batch_rows(values, batch_size=DEFAULT_BATCH_SIZE, budget=BATCH_ELEMENTS):
+    """Resamples per batch when one resample draws ``values`` values: ``batch_size`` at most"""
+    return max(1, min(batch_size, budget // max(values, 1)))
+
+
+def _batches(n_resamples, batch_size, seed):
+    """(size, SeedSequence) per batch; the split depends only on the arguments"""
+    sizes = [batch_size] * (n_resamples // batch_size)
+    if n_resamples % batch_size:
+        sizes.append(n_resamples % batch_size)
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+
+def _map_batches(draw, n_resamples, batch_size, seed, workers):
+    """Concatenate ``draw(rng, size)`` over every batch, in batch order"""
+    batches = _batches(n_resamples, batch_size, seed)
+    run = lambda batch: draw(np.random.default_rng(batch[1]), batch[0])
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(batches))
+    if workers <= 1:
+        return np.concatenate([run(batch) for batch in batches])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(run, batches)))
+
+
+def _as_row(sample):
+    return np.asarray(sample, dtype='float64')[None, :]
+
+
+# ----------------------------------------------------------------------------
+# Bootstrap confidence intervals and permutation tests
+# ----------------------------------------------------------------------------
+
+def bootstrap(statistic, samples, paired=False, n_resamples=DEFAULT_RESAMPLES,
+              batch_size=DEFAULT_BATCH_SIZE, confidence=DEFAULT_CONFIDENCE, seed=0, workers=None):
+    """Percentile bootstrap interval for ``statistic(*samples)``
+
+    Independent samples are resampled separately; ``paired=True`` resamples
+    rows of equal-length samples together (e.g. x and y of a correlation).
+    """
+    samples = [np.asarray(sample, dtype='float64') for sample in samples]
+    if paired and len({len(sample) for sample in samples}) > 1:
+        raise ValueError("Paired samples must have the same length")
+    batch_size = batch_rows(sum(len(sample) for sample in samples), batch_size)
+
+    def draw(rng, size):
+        if paired:
+            index = rng.integers(0, len(samples[0]), size=(size, len(samples[0])))
+            return statistic(*[sample[index] for sample in samples])
+        return statistic(*[sample[rng.integers(0, len(sample), size=(size, len(sample)))]
+                           for sample in samples])
+
+    estimate = float(statistic(*[_as_row(sample) for sample in samples])[0])
+    replicates = _map_batches(draw, n_resamples, batch_size, seed, workers)
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(replicates, [alpha, 1 - alpha])
+    return Interval(estimate, float(low), float(high), float(np.nanstd(replicates, ddof=1)))
+
+
+def permutation_test(statistic, x, y, permutation_type='independent',
+                     n_resamples=DEFAULT_RESAMPLES, batch_size=DEFAULT_BATCH_SIZE, seed=0, workers=None):
+    """Two-sided Monte Carlo permutation p-value for ``statistic(x, y)``
+
+    ``independent`` shuffles group labels over the pooled values;
+    ``pairings`` shuffles y against x (a test of association).
+    """
+    x, y = np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64')
+    batch_size = batch_rows(len(x) + len(y), batch_size)
+    if permutation_type == 'independent':
+        pooled = np.concatenate([x, y])
+
+        def draw(rng, size):
+            shuffled = rng.permuted(np.broadcast_to(pooled, (size, len(pooled))), axis=1)
+            return statistic(shuffled[:, :len(x)], shuffled[:, len(x):])
+    elif permutation_type == 'pairings':
+        if len(x) != len(y):
+            raise ValueError("Paired samples must have the same length")
+
+        def draw(rng, size):
+            shuffled = rng.permuted(np.broadcast_to(y, (size, len(y))), axis=1)
+            return statistic(np.broadcast_to(x, shuffled.shape), shuffled)
+    else:
+        raise ValueError(f"Unknown permutation_type {permutation_type!r}")
+
+    observed = float(statistic(_as_row(x), _as_row(y))[0])
+    null = _map_batches(draw, n_resamples, batch_size, seed, workers)
+    # Two-sided around the null's centre (0 for differences, n1*n2/2 for U);
+    # the observed arrangement counts as one permutation, so p is never 0
+    centre = np.nanmean(null)
+    extreme = np.count_nonzero(np.abs(null - centre) >= abs(observed - centre) * (1 - 1e-12))
+    return PermutationResult(observed, float((extreme + 1) / (len(null) + 1)))
@@ -0,0 +1,143 @@
+"""Run several analysis pipelines at once and report on them together.
+
+An analysis is any ``analysis/<name>/<name>.py`` exposing ``main(argv)``.
+The runner imports the heavy libraries (pandas, matplotlib, ...) once in
+the parent process and then forks a process pool, so every worker starts
+with them already loaded instead of paying the import cost per dataset.
+Each worker imports its analysis script as a module, captures its stdout,
+times it and lists the artifacts it wrote; the parent collects one report.
+
+Paths come from ``engine.paths``, so the runner behaves the same whatever
+the working directory.
+"""
+import contextlib
+import importlib
+import importlib.util
+import io
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from . import paths
+
+Analysis = namedtuple('Analysis', ['name', 'path'])
+
+# Loaded in the parent before forking so workers share them warm
+WARM_IMPORTS = ('numpy', 'pandas', 'scipy.stats', 'matplotlib.pyplot', 'seaborn',
+                'plotly.graph_objects', 'statsmodels.api')
+
+
+def discover(root=paths.ANALYSIS_DIR):
+    """Every analysis laid out as ``<root>/<name>/<name>.py``, by name"""
+    found = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name, f'{name}.py')
+        if os.path.isfile(path):
+            found.append(Analysis(name, path))
+    return found
+
+
+def select(names, root=paths.ANALYSIS_DIR):
+    """The discovered analyses matching ``names`` (all of them when empty)"""
+    available = {analysis.name: analysis for analysis in discover(root)}
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown analysis {', '.join(unknown)}; "
+                         f"available: {', '.join(available) or 'none'}")
+    return [available[name] for name in names] if names else list(available.values())
+
+
+def warm_imports(modules=WARM_IMPORTS):
+    """Import the shared libraries now; missing optional ones are skipped"""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+def artifacts(name, since=0.0):
+    """Files under the analysis' graphs and data directories, flagging fresh ones"""
+    found = []
+    for directory in (paths.graphs_dir(name), paths.data_api_dir(name)):
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                found.append({'path': paths.relative(path), 'bytes': stat.st_size,
+                              'updated': stat.st_mtime >= since})
+    return found
+
+
+def run_analysis(analysis, argv=()):
+    """Import one analysis script, call ``main(argv)`` and describe the run"""
+    directory = os.path.dirname(analysis.path)
+    module_name = f'analysis_{analysis.name}'
+    loaded = set(sys.modules)
+    sys.path.insert(0, directory)
+    log = io.StringIO()
+    status, error = 'ok', None
+    started, cpu_started = time.time(), time.process_time()
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, analysis.path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        with contextlib.redirect_stdout(log):
+            spec.loader.exec_module(module)
+            module.main(list(argv))
+    except SystemExit as exit:
+        if exit.code not in (None, 0):
+            status, error = 'failed', f'exited with status {exit.code}'
+    except Exception:
+        status, error = 'failed', traceback.format_exc()
+    finally:
+        wall, cpu = time.time() - started, time.process_time() - cpu_started
+        sys.path.remove(directory)
+        # Forget the script and its sibling modules (figures.py, ...) so the
+        # next analysis run by this worker imports its own
+        for name in set(sys.modules) - loaded:
+            module_file = getattr(sys.modules[name], '__file__', None) or ''
+            if name == module_name or module_file.startswith(directory + os.sep):
+                del sys.modules[name]
+    return {
+        'name': analysis.name,
+        'status': status,
+        'error': error,
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(cpu, 3),
+        'artifacts': artifacts(analysis.name, since=started),
+        'log': log.getvalue(),
+    }
+
+
+def run_all(analyses, argv=(), workers=None):
+    """Run ``analyses`` concurrently in a warm process pool; reports in input order"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(analyses))
+    if workers <= 1:
+        return [run_analysis(analysis, argv) for analysis in analyses]
+    warm_imports()
+    # Fork keeps the warm imports; elsewhere fall back to the default start method
+    context = (multiprocessing.get_context('fork')
+               if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(run_analysis, analyses, repeat(argv)))
+
+
+def summary_table(reports):
+    """One line per analysis: status, timings and artifact counts and sizes"""
+    lines = [f"{'Analysis':<32} {'Status':<7} {'Wall (s)':>9} {'CPU (s)':>9} "
+             f"{'Files':>6} {'Updated':>8} {'Size (KB)':>10}"]
+    for report in reports:
+        files = report['artifacts']
+        lines.append(f"{report['name']:<32} {report['status']:<7} {report['wall_seconds']:>9.2f} "
+                     f"{report['cpu_seconds']:>9.2f} {len(files):>6} "
+                     f"{sum(f['updated'] for f in files):>8} "
+                     f"{sum(f['bytes'] for f in files) / 1024:>10.1f}")
+    return '\n'.join(lines)
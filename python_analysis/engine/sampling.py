@@ -0,0 +1,296 @@
+"""Stratified reservoir sampling during ingestion, and bounds for sampled results.
+
+``StratifiedReservoir`` draws a sample from a stream of chunks in the one
+pass that reads them, with memory for the sample only. Every row gets a
+uniform random key and is kept if its key is among the ``size`` smallest of
+all rows, or among the ``floor`` smallest of its stratum. The first rule
+alone is a simple random sample (bottom-k sampling, a reservoir sample
+that needs no row count up front); the second keeps small strata, such as
+the 60+ age group of one occupation, from vanishing from it. Within a
+stratum the kept rows are still a uniform sample, so every kept row gets
+the expansion weight ``N_h / n_h`` of its stratum (population over sampled
+rows), and means weighted by it estimate the full-data means without the
+floors' over-representation. Keys come from one generator in row order,
+so a seed gives the same sample whatever the chunk size.
+
+The bounds helpers give 95% intervals for what a full run would report.
+Estimates are weighted by the expansion weights, and intervals use Kish's
+effective sample size, which is smaller than the row count when the
+weights are unequal:
+
+* means: the stratified estimator with a finite population correction
+  (``stratified_mean``), so a sample holding every row has zero width;
+* correlations: Fisher's z (Bonett-Wright's variance for Spearman, whose
+  ranks are mid-ranks of the weighted distribution);
+* effect sizes: the large-sample standard error of Cohen's d, and
+  Hanley-McNeil's for the probability of superiority behind Mann-Whitney U;
+* VIFs: Fisher's z of the multiple correlation a VIF implies;
+* cross-validated scores: one repeat's folds are disjoint test sets of the
+  sample, so their mean varies with the sample as ``std / sqrt(folds)``;
+* p-values: a test's p-value moves monotonically with its effect, so the
+  effect's interval maps to a p-value interval once the test is projected
+  to the full row count (``pvalue_bounds``).
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .imports import lazy_import
+from .ingest import concat_chunks, decimal_values
+
+stats = lazy_import('scipy.stats')
+
+DEFAULT_SAMPLE_SIZE = 20_000
+DEFAULT_FLOOR = 50
+DEFAULT_CONFIDENCE = 0.95
+# Columns the sampled frame carries for the bounds below
+WEIGHT_COLUMN = 'Sample Weight'
+STRATUM_COLUMN = 'Stratum'
+
+Bound = namedtuple('Bound', ['estimate', 'low', 'high'])
+
+
+def _rank_in_group(keys, codes):
+    """Position of each key among the keys of its group, smallest first"""
+    order = np.lexsort((keys, codes))
+    ordered = codes[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    rank = np.empty(len(keys), dtype='int64')
+    rank[order] = np.arange(len(keys)) - np.repeat(starts, np.diff(np.r_[starts, len(keys)]))
+    return rank
+
+
+class StratifiedReservoir:
+    """Bottom-k sample of a chunk stream, with at least ``floor`` rows per stratum"""
+
+    def __init__(self, size=DEFAULT_SAMPLE_SIZE, floor=DEFAULT_FLOOR, seed=0):
+        if size < 1 or floor < 0:
+            raise ValueError("A sample needs a positive size and a non-negative floor")
+        self.size = size
+        self.floor = floor
+        self.rng = np.random.default_rng(seed)
+        self.labels = {}
+        self.population = np.zeros(0, dtype='int64')
+        self.rows = 0
+        self.pieces = []
+        self.keys = np.empty(0)
+        self.codes = np.empty(0, dtype='int64')
+        self.ordinals = np.empty(0, dtype='int64')
+        # Largest key each stratum can still keep; only falls as rows arrive
+        self.limit = np.empty(0)
+
+    def _encode(self, strata):
+        local, uniques = pd.factorize(pd.MultiIndex.from_frame(strata), use_na_sentinel=False)
+        codes = np.array([self.labels.setdefault(label, len(self.labels)) for label in uniques], dtype='int64')
+        return codes[local]
+
+    def update(self, chunk, strata):
+        """Offer ``chunk``'s rows; ``strata`` holds the columns defining each row's stratum"""
+        codes = self._encode(strata)
+        grown = len(self.labels) - len(self.population)
+        self.population = np.r_[self.population, np.zeros(grown, dtype='int64')]
+        self.population += np.bincount(codes, minlength=len(self.labels))
+        self.limit = np.r_[self.limit, np.ones(grown)]
+        keys = self.rng.random(len(chunk))
+        candidate = keys <= self.limit[codes]
+        if candidate.any():
+            self.pieces.append(chunk[candidate])
+            self.keys = np.r_[self.keys, keys[candidate]]
+            self.codes = np.r_[self.codes, codes[candidate]]
+            self.ordinals = np.r_[self.ordinals, self.rows + np.flatnonzero(candidate)]
+        self.rows += len(chunk)
+        if len(self.keys) > 2 * (self.size + self.floor * len(self.labels)):
+            self._prune()
+        return self
+
+    def _prune(self):
+        """Drop candidates whose key is past both their stratum's and the overall limit"""
+        overall = np.partition(self.keys, self.size - 1)[self.size - 1] if len(self.keys) > self.size else 1.0
+        # Without a floor no stratum keeps rows past the overall limit
+        per_stratum = np.ones(len(self.labels)) if self.floor else np.zeros(len(self.labels))
+        if self.floor:
+            rank = _rank_in_group(self.keys, self.codes)
+            last = rank == self.floor - 1
+            per_stratum[self.codes[last]] = self.keys[last]
+        self.limit = np.maximum(overall, per_stratum)
+        keep = self.keys <= self.limit[self.codes]
+        masks = np.split(keep, np.cumsum([len(piece) for piece in self.pieces])[:-1])
+        self.pieces = [piece[mask] for piece, mask in zip(self.pieces, masks) if mask.any()]
+        self.keys, self.codes, self.ordinals = self.keys[keep], self.codes[keep], self.ordinals[keep]
+
+    def sample(self):
+        """Kept rows in stream order, with their stratum code and expansion weight"""
+        self._prune()
+        order = np.argsort(self.ordinals)
+        frame = concat_chunks(self.pieces).iloc[order].reset_index(drop=True)
+        codes = self.codes[order]
+        sampled = np.bincount(codes, minlength=len(self.labels))
+        frame[STRATUM_COLUMN] = codes.astype('int32')
+        frame[WEIGHT_COLUMN] = (self.population / np.maximum(sampled, 1))[codes]
+        return frame
+
+    def strata(self, names):
+        """Population and sampled rows of every stratum, labelled by ``names``"""
+        sampled = np.bincount(self.codes, minlength=len(self.labels))
+        table = pd.DataFrame(list(self.labels), columns=names)
+        table['Population'] = self.population
+        table['Sampled'] = sampled
+        table['Rate'] = sampled / np.maximum(self.population, 1)
+        return table
+
+
+# ----------------------------------------------------------------------------
+# Weighted estimates of full-data statistics
+# ----------------------------------------------------------------------------
+
+def effective_size(weights):
+    """Kish's effective sample size, ``sum(w)^2 / sum(w^2)``"""
+    weights = np.asarray(weights, dtype='float64')
+    return float(weights.sum() ** 2 / (weights @ weights))
+
+
+def weighted_ranks(values, weights):
+    """Mid-ranks in the weighted distribution: the weight below each value plus half of its own"""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    at = np.bincount(inverse, weights=weights, minlength=len(uniques))
+    return (np.cumsum(at) - at / 2)[inverse]
+
+
+def weighted_correlation(x, y, weights, rank=False):
+    """Weighted Pearson correlation (with ``rank``, of the weighted mid-ranks: Spearman's rho)"""
+    x, y, weights = decimal_values(x), decimal_values(y), np.asarray(weights, dtype='float64')
+    if rank:
+        x, y = weighted_ranks(x, weights), weighted_ranks(y, weights)
+    shares = weights / weights.sum()
+    dx, dy = x - shares @ x, y - shares @ y
+    return float((shares * dx * dy).sum() / np.sqrt((shares * dx * dx).sum() * (shares * dy * dy).sum()))
+
+
+def _weighted_moments(values, weights):
+    """Weighted mean and variance (with the n / (n - 1) correction of the row count)"""
+    mean = weights @ values / weights.sum()
+    variance = weights @ (values - mean) ** 2 / weights.sum() * len(values) / max(len(values) - 1, 1)
+    return mean, variance
+
+
+def weighted_cohens_d(a, a_weights, b, b_weights):
+    """Cohen's d of two weighted groups, with their weighted totals pooling the variances"""
+    a, b = decimal_values(a), decimal_values(b)
+    a_weights, b_weights = np.asarray(a_weights, dtype='float64'), np.asarray(b_weights, dtype='float64')
+    (a_mean, a_var), (b_mean, b_var) = _weighted_moments(a, a_weights), _weighted_moments(b, b_weights)
+    a_total, b_total = a_weights.sum(), b_weights.sum()
+    pooled = (a_total * a_var + b_total * b_var) / (a_total + b_total)
+    return float((a_mean - b_mean) / np.sqrt(pooled))
+
+
+def weighted_superiority(a, a_weights, b, b_weights):
+    """Weighted chance a row of ``a`` exceeds one of ``b`` (ties count half): Mann-Whitney's U / (n1 * n2)"""
+    a, b = decimal_values(a), decimal_values(b)
+    a_weights, b_weights = np.asarray(a_weights, dtype='float64'), np.asarray(b_weights, dtype='float64')
+    uniques, inverse = np.unique(np.r_[a, b], return_inverse=True)
+    b_at = np.bincount(inverse[len(a):], weights=b_weights, minlength=len(uniques))
+    below = (np.cumsum(b_at) - b_at / 2)[inverse[:len(a)]]
+    return float(a_weights @ below / (a_weights.sum() * b_weights.sum()))
+
+
+# ----------------------------------------------------------------------------
+# Bounds for full-data values, from a sample
+# ----------------------------------------------------------------------------
+
+def _z(confidence):
+    return float(stats.norm.ppf(0.5 + confidence / 2))
+
+
+def stratified_mean(values, strata, weights, confidence=DEFAULT_CONFIDENCE):
+    """Weighted mean of sampled ``values`` with its interval
+
+    ``weights`` are the rows' expansion weights, so a stratum's weights sum
+    to its estimated population; rows removed after sampling (outliers) just
+    shrink their stratum's estimate.
+    """
+    values = decimal_values(values)
+    strata = np.asarray(strata)
+    weights = np.asarray(weights, dtype='float64')
+    codes, inverse = np.unique(strata, return_inverse=True)
+    n = np.bincount(inverse).astype('float64')
+    population = np.bincount(inverse, weights=weights)
+    means = np.bincount(inverse, weights=values) / n
+    squares = np.bincount(inverse, weights=(values - means[inverse]) ** 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variances = np.where(n > 1, squares / (n - 1), 0.0)
+    shares = population / population.sum()
+    estimate = float(shares @ means)
+    correction = np.clip(1 - n / population, 0.0, 1.0)
+    error = float(np.sqrt((shares ** 2 * correction * variances / n).sum()))
+    margin = _z(confidence) * error
+    return Bound(estimate, estimate - margin, estimate + margin)
+
+
+def correlation_bound(r, n, rank=False, confidence=DEFAULT_CONFIDENCE):
+    """Fisher-z interval of a Pearson (or, with ``rank``, Spearman) correlation over ``n`` rows"""
+    if n <= 3:
+        return Bound(r, -1.0, 1.0)
+    variance = (1 + r * r / 2 if rank else 1.0) / (n - 3)
+    z = np.arctanh(np.clip(r, -0.999999, 0.999999))
+    margin = _z(confidence) * np.sqrt(variance)
+    return Bound(r, float(np.tanh(z - margin)), float(np.tanh(z + margin)))
+
+
+def cohens_d_bound(d, n1, n2, confidence=DEFAULT_CONFIDENCE):
+    """Normal interval of Cohen's d between groups of ``n1`` and ``n2`` rows"""
+    error = np.sqrt((n1 + n2) / (n1 * n2) + d * d / (2 * (n1 + n2)))
+    margin = _z(confidence) * error
+    return Bound(d, float(d - margin), float(d + margin))
+
+
+def superiority_bound(a, n1, n2, confidence=DEFAULT_CONFIDENCE):
+    """Hanley-McNeil interval of ``a = U / (n1 * n2)``, the chance a row of one group exceeds one of the other"""
+    q1, q2 = a / (2 - a), 2 * a * a / (1 + a)
+    error = np.sqrt(max(a * (1 - a) + (n1 - 1) * (q1 - a * a) + (n2 - 1) * (q2 - a * a), 0.0) / (n1 * n2))
+    margin = _z(confidence) * error
+    return Bound(a, float(max(a - margin, 0.0)), float(min(a + margin, 1.0)))
+
+
+def vif_bound(vif, n, confidence=DEFAULT_CONFIDENCE):
+    """Interval of a VIF over ``n`` rows, from Fisher's z of its multiple correlation ``sqrt(1 - 1 / vif)``"""
+    bound = correlation_bound(np.sqrt(max(1 - 1 / vif, 0.0)), n, confidence=confidence)
+    to_vif = lambda r: float(1 / (1 - max(r, 0.0) ** 2))
+    return Bound(vif, to_vif(bound.low), to_vif(bound.high))
+
+
+def fold_mean_bound(mean, std, folds, confidence=DEFAULT_CONFIDENCE):
+    """Normal interval of a cross-validated mean score whose per-fold scores spread by ``std``"""
+    margin = _z(confidence) * std / np.sqrt(folds)
+    return Bound(mean, float(mean - margin), float(mean + margin))
+
+
+def t_statistic(d, n1, n2):
+    """Student's t for groups of ``n1`` and ``n2`` rows differing by Cohen's ``d``"""
+    return float(d * np.sqrt(n1 * n2 / (n1 + n2)))
+
+
+def correlation_pvalue(r, n):
+    """Two-sided p of a correlation ``r`` over ``n`` rows (the t approximation scipy uses)"""
+    r = min(abs(r), 0.999999)
+    t = r * np.sqrt((n - 2) / (1 - r * r))
+    return float(2 * stats.t.sf(t, n - 2))
+
+
+def t_test_pvalue(d, n1, n2):
+    """Two-sided p of Student's t for groups of ``n1`` and ``n2`` rows differing by Cohen's ``d``"""
+    return float(2 * stats.t.sf(abs(t_statistic(d, n1, n2)), n1 + n2 - 2))
+
+
+def mann_whitney_pvalue(a, n1, n2):
+    """Two-sided p of a Mann-Whitney U of ``a * n1 * n2`` (normal approximation, no tie correction)"""
+    z = abs(a - 0.5) / np.sqrt((n1 + n2 + 1) / (12 * n1 * n2))
+    return float(2 * stats.norm.sf(z))
+
+
+def pvalue_bounds(pvalue, bound, null=0.0):
+    """Range of ``pvalue(effect)`` over the effect's interval; p falls as the effect leaves ``null``"""
+    low, high = bound.low - null, bound.high - null
+    nearest = 0.0 if low <= 0 <= high else min(low, high, key=abs)
+    farthest = max(low, high, key=abs)
+    return Bound(pvalue(bound.estimate), pvalue(null + farthest), pvalue(null + nearest))
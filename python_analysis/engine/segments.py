@@ -0,0 +1,234 @@
+"""Per-segment drilldown: one test battery for every group of a key.
+
+``partition`` orders a frame's rows by one key's group codes with a single
+stable argsort, so every segment is a contiguous run of that order, an
+(offset, length) pair rather than a copy. ``run_segments`` packs the
+battery's columns and every key's order into one ``SharedMemory`` block;
+pool workers attach to it by name when they start, so a task is just
+(key, start, stop) and no rows are pickled. A worker gathers its segment's
+rows from the shared buffers and runs ``test_battery`` on them.
+
+The battery mirrors the whole-sample tests: Shapiro-Wilk normality of the
+measure, Spearman correlation of a pair of columns, Mann-Whitney U and
+Cohen's d between two groups of the measure, and an OLS fit of the target
+on the features with its R² and VIFs. Segments with fewer than
+``min_rows`` rows are listed with NaN results, as is any test a segment
+cannot support (one gender, a constant column).
+
+``adjust_pvalues`` corrects one family of p-values for multiple testing,
+with Holm's step-down (family-wise error) or Benjamini-Hochberg (false
+discovery rate); ``correct`` applies it to each test's p-values across
+every segment of every key.
+"""
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from . import ranks, resample
+from .imports import lazy_import
+from .ingest import decimal_values
+from .ols import Gram
+
+stats = lazy_import('scipy.stats')
+
+DEFAULT_MIN_ROWS = 20
+CORRECTIONS = ('holm', 'fdr_bh')
+PVALUES = ['shapiro_p', 'spearman_p', 'mann_whitney_p']
+
+# measure: tested for normality and compared between groups; correlation: a
+# column pair; groups: (column, first label, second label); features/target: the OLS
+Battery = namedtuple('Battery', ['measure', 'correlation', 'groups', 'features', 'target'])
+Partition = namedtuple('Partition', ['key', 'labels', 'order', 'offsets'])
+
+
+def partition(frame, key):
+    """Row order of ``frame`` grouped by ``key``, and each group's offsets into it
+
+    Group ``i`` is ``order[offsets[i]:offsets[i + 1]]``, labelled
+    ``labels[i]``; rows with a missing key are left out.
+    """
+    codes, labels = pd.factorize(frame[key], sort=True)
+    order = np.argsort(codes, kind='stable')
+    order = order[codes[order] >= 0]
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    return Partition(key, [str(label) for label in labels], order.astype('int64'),
+                     np.concatenate([[0], np.cumsum(counts)]))
+
+
+def battery_columns(battery):
+    """Names of the columns ``battery`` reads, each once"""
+    names = [battery.measure, *battery.correlation, battery.groups[0], *battery.features, battery.target]
+    return list(dict.fromkeys(names))
+
+
+class SharedColumns:
+    """Named 1-D arrays copied into one shared-memory block"""
+
+    def __init__(self, arrays):
+        self.layout = []
+        size = 0
+        for name, values in arrays.items():
+            values = np.asarray(values)
+            self.layout.append((name, values.dtype.str, len(values), size))
+            size += -(-values.nbytes // 8) * 8
+        self.block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, dtype, length, offset in self.layout:
+            np.ndarray(length, dtype=dtype, buffer=self.block.buf, offset=offset)[:] = arrays[name]
+
+    @property
+    def spec(self):
+        """What ``attach`` needs to map the block in another process"""
+        return self.block.name, self.layout
+
+    def close(self):
+        self.block.close()
+        self.block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec):
+    """(block, {name: array}) views of a ``SharedColumns`` block made by another process"""
+    name, layout = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, {column: np.ndarray(length, dtype=dtype, buffer=block.buf, offset=offset)
+                   for column, dtype, length, offset in layout}
+
+
+def group_codes(values, first, second):
+    """int8 codes of ``values``: 1 for ``first``, 2 for ``second``, 0 for anything else"""
+    values = np.asarray(values, dtype=object)
+    return ((values == first) + 2 * (values == second)).astype('int8')
+
+
+def test_battery(columns, battery, min_rows=DEFAULT_MIN_ROWS):
+    """Every battery statistic for one segment, as a flat dict
+
+    ``columns`` maps each of ``battery_columns(battery)`` to the segment's
+    values, with the group column as ``group_codes``.
+    """
+    measure = columns[battery.measure]
+    codes = columns[battery.groups[0]]
+    first, second = measure[codes == 1], measure[codes == 2]
+    result = {'n': len(measure), 'n_first': len(first), 'n_second': len(second)}
+    result.update(dict.fromkeys(['shapiro_w', 'shapiro_p', 'spearman_rho', 'spearman_p', 'mann_whitney_u',
+                                 'mann_whitney_p', 'cohens_d', 'r2', 'max_vif'], np.nan))
+    result.update({f'coef:{feature}': np.nan for feature in battery.features})
+    if len(measure) < min_rows:
+        return result
+
+    with np.errstate(all='ignore'):
+        if np.ptp(measure) > 0:
+            shapiro = stats.shapiro(measure)
+            result['shapiro_w'], result['shapiro_p'] = float(shapiro.statistic), float(shapiro.pvalue)
+
+        x, y = (columns[name] for name in battery.correlation)
+        if np.ptp(x) > 0 and np.ptp(y) > 0:
+            result['spearman_rho'], result['spearman_p'] = ranks.spearman(ranks.FrequencyTable.from_arrays(x, y))
+
+        if len(first) > 1 and len(second) > 1 and np.ptp(np.concatenate([first, second])) > 0:
+            u, p = ranks.mann_whitney(ranks.FrequencyTable.from_groups(first, second))
+            result['mann_whitney_u'], result['mann_whitney_p'] = u, p
+            result['cohens_d'] = float(resample.cohens_d(first[None], second[None])[0])
+
+        X = np.column_stack([columns[name] for name in battery.features])
+        gram = Gram.from_arrays(X, columns[battery.target], battery.features, battery.target)
+        if len(measure) > len(battery.features) + 1:
+            fit = gram.solve()
+            result['r2'] = gram.score(fit)[1]
+            result.update({f'coef:{feature}': float(coef) for feature, coef in zip(fit.features, fit.coef)})
+            vif = gram.vif()
+            if not np.isnan(vif).all():
+                result['max_vif'] = float(np.nanmax(vif))
+    return result
+
+
+# Set in each pool worker by _init_worker
+_worker = {}
+
+
+def _init_worker(spec, battery, min_rows):
+    block, columns = attach(spec)
+    _worker.update(block=block, columns=columns, battery=battery, min_rows=min_rows)
+
+
+def _segment(columns, order, start, stop, battery, min_rows):
+    rows = order[start:stop]
+    return test_battery({name: columns[name][rows] for name in battery_columns(battery)}, battery, min_rows)
+
+
+def _run_task(key, start, stop):
+    columns = _worker['columns']
+    return _segment(columns, columns[f'order:{key}'], start, stop, _worker['battery'], _worker['min_rows'])
+
+
+def _pool_context():
+    # Forked workers do not re-execute the calling script; the columns still
+    # reach them through shared memory, not the fork's copy-on-write pages
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def run_segments(frame, partitions, battery, min_rows=DEFAULT_MIN_ROWS, workers=None):
+    """Battery results for every segment of every partition, indexed by (Key, Segment)"""
+    tasks = [(part.key, label, part.offsets[i], part.offsets[i + 1])
+             for part in partitions for i, label in enumerate(part.labels)]
+    # float32 columns are tested on their recorded decimals, as the whole-sample tests are
+    columns = {name: decimal_values(frame[name]) for name in battery_columns(battery)
+               if name != battery.groups[0]}
+    columns[battery.groups[0]] = group_codes(frame[battery.groups[0]], *battery.groups[1:])
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        orders = {part.key: part.order for part in partitions}
+        results = [_segment(columns, orders[key], start, stop, battery, min_rows)
+                   for key, _, start, stop in tasks]
+    else:
+        columns.update({f'order:{part.key}': part.order for part in partitions})
+        with SharedColumns(columns) as shared, ProcessPoolExecutor(
+                max_workers=workers, mp_context=_pool_context(), initializer=_init_worker,
+                initargs=(shared.spec, battery, min_rows)) as pool:
+            results = list(pool.map(_run_task, *zip(*[(key, start, stop) for key, _, start, stop in tasks])))
+    index = pd.MultiIndex.from_tuples([(key, label) for key, label, _, _ in tasks], names=['Key', 'Segment'])
+    return pd.DataFrame(results, index=index)
+
+
+def adjust_pvalues(pvalues, method='holm'):
+    """Multiple-testing adjusted ``pvalues``; NaNs stay NaN and are not counted in the family"""
+    if method not in CORRECTIONS:
+        raise ValueError(f"Unknown correction {method!r}; expected one of {', '.join(CORRECTIONS)}")
+    pvalues = np.asarray(pvalues, dtype='float64')
+    adjusted = np.full(pvalues.shape, np.nan)
+    valid = ~np.isnan(pvalues)
+    m = int(valid.sum())
+    if not m:
+        return adjusted
+    order = np.argsort(pvalues[valid], kind='stable')
+    ranked = pvalues[valid][order]
+    if method == 'holm':
+        steps = np.maximum.accumulate((m - np.arange(m)) * ranked)
+    else:
+        steps = np.minimum.accumulate((m / np.arange(m, 0, -1)) * ranked[::-1])[::-1]
+    family = np.empty(m)
+    family[order] = np.minimum(steps, 1.0)
+    adjusted[valid] = family
+    return adjusted
+
+
+def correct(table, method='holm'):
+    """``table`` with an adjusted ``<test>_adj`` column next to each p-value column"""
+    table = table.copy()
+    for column in PVALUES:
+        table.insert(table.columns.get_loc(column) + 1, f'{column}_adj', adjust_pvalues(table[column], method))
+    return table
@@ -0,0 +1,249 @@
+"""One-pass, mergeable summary statistics.
+
+``SummaryAccumulator`` replaces the separate ``describe()``, ``corr()`` and
+``groupby().mean()`` scans of the EDA section with a single pass over
+chunks. Its state is small and additive:
+
+* count, mean vector and co-moment matrix, combined with Chan et al.'s
+  parallel update, which gives variances and Pearson correlations;
+* per-column min/max and a KLL sketch for describe's percentiles;
+* per-group counts, sums and centered sums of squares for each requested
+  (key, value columns) panel, via ``GroupAggregator``.
+
+``ValueCounts`` keeps each distinct value of some columns with its count.
+For the gridded sleep columns that is a few dozen numbers per column, it
+merges like the rest, and a histogram or quantile built from it is exactly
+what ``np.histogram`` or ``np.quantile`` gives on the raw column. Given
+``max_values``, a column that grows past that many distinct values (a
+continuous one) stops being counted rather than growing without bound.
+
+``DistinctIds`` counts the distinct integer IDs of a stream with one bit
+per possible ID, so a repeated-ID check over tens of millions of rows needs
+a few megabytes and no set of Python integers.
+
+Two accumulators built over disjoint chunks, processes or machines combine
+with ``merge``; the result is the same as one accumulator over all rows.
+Rows with a missing value in any tracked numeric column are skipped.
+
+Given ``weight``, a column of row weights (a stratified sample's expansion
+weights), ``SummaryAccumulator`` and ``ValueCounts`` count each row as its
+weight, so every moment, group statistic and histogram estimates the rows
+the sample stands for. A weighted input is a bounded sample, so its
+percentiles come from exact weighted value counts rather than the sketches.
+"""
+import numpy as np
+import pandas as pd
+
+from .groupby import GroupAggregator
+from .ingest import decimal_columns
+from .sketch import DEFAULT_K, KllSketch
+
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+
+
+class SummaryAccumulator:
+    """Moments, co-moments, quantile sketches and group sums in one scan"""
+
+    def __init__(self, columns, groups=None, sketch_k=DEFAULT_K, weight=None):
+        self.columns = list(columns)
+        self.groups = {key: list(values) for key, values in (groups or {}).items()}
+        self.weight = weight
+        self.n = 0
+        self.mean = np.zeros(len(self.columns))
+        self.comoment = np.zeros((len(self.columns), len(self.columns)))
+        self.minimum = np.full(len(self.columns), np.inf)
+        self.maximum = np.full(len(self.columns), -np.inf)
+        self.sketches = [KllSketch(k=sketch_k, seed=i) for i in range(len(self.columns))]
+        self.value_counts = None if weight is None else ValueCounts(self.columns, weight=weight)
+        self.group_agg = GroupAggregator(self.groups, weight=weight)
+
+    def update(self, chunk):
+        values = decimal_columns(chunk, self.columns)
+        complete = ~np.isnan(values).any(axis=1)
+        values = values[complete]
+        if len(values):
+            if self.weight is None:
+                n = len(values)
+                mean = values.mean(axis=0)
+                centered = values - mean
+                self._combine(n, mean, centered.T @ centered)
+                for sketch, column in zip(self.sketches, values.T):
+                    sketch.update(column)
+            else:
+                weights = chunk[self.weight].to_numpy(dtype='float64')[complete]
+                n = weights.sum()
+                mean = weights @ values / n
+                centered = values - mean
+                self._combine(n, mean, (centered * weights[:, None]).T @ centered)
+                self.value_counts.update(chunk[complete])
+            self.minimum = np.minimum(self.minimum, values.min(axis=0))
+            self.maximum = np.maximum(self.maximum, values.max(axis=0))
+        self.group_agg.update(chunk)
+        return self
+
+    def _combine(self, n, mean, comoment):
+        total = self.n + n
+        delta = mean - self.mean
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * (self.n * n / total)
+        self.mean = self.mean + delta * (n / total)
+        self.n = total
+
+    def merge(self, other):
+        """Fold in an accumulator built over disjoint rows with the same layout"""
+        if other.columns != self.columns or other.groups != self.groups or other.weight != self.weight:
+            raise ValueError("Cannot merge accumulators with different layouts")
+        if other.n:
+            self._combine(other.n, other.mean, other.comoment)
+            self.minimum = np.minimum(self.minimum, other.minimum)
+            self.maximum = np.maximum(self.maximum, other.maximum)
+            for sketch, other_sketch in zip(self.sketches, other.sketches):
+                sketch.merge(other_sketch)
+            if self.value_counts is not None:
+                self.value_counts.merge(other.value_counts)
+        self.group_agg.merge(other.group_agg)
+        return self
+
+    def covariance(self):
+        return self.comoment / (self.n - 1)
+
+    def describe(self, percentiles=DESCRIBE_PERCENTILES):
+        """Same layout as ``DataFrame.describe()`` for the tracked columns"""
+        rows = {
+            'count': np.full(len(self.columns), float(self.n)),
+            'mean': self.mean,
+            'std': np.sqrt(np.diag(self.covariance())),
+            'min': self.minimum,
+        }
+        if self.value_counts is None:
+            quantiles = np.array([sketch.quantile(percentiles) for sketch in self.sketches])
+        else:
+            quantiles = np.array([self.value_counts.quantile(col, percentiles) for col in self.columns])
+        for i, q in enumerate(percentiles):
+            rows[f'{q * 100:g}%'] = quantiles[:, i]
+        rows['max'] = self.maximum
+        return pd.DataFrame(rows, index=self.columns).T
+
+    def corr(self):
+        """Pearson correlation matrix from the co-moments"""
+        scale = np.sqrt(np.diag(self.comoment))
+        corr = self.comoment / np.outer(scale, scale)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def group_table(self):
+        """Tidy (key, group, column, statistic, value) table for every panel"""
+        return self.group_agg.table()
+
+
+class ValueCounts:
+    """Distinct values and how many rows hold each, per column"""
+
+    def __init__(self, columns, max_values=None, weight=None):
+        self.columns = list(columns)
+        self.max_values = max_values
+        self.weight = weight
+        self.values = {col: np.empty(0) for col in self.columns}
+        self.counts = {col: np.zeros(0, dtype='int64' if weight is None else 'float64') for col in self.columns}
+
+    @property
+    def tracked(self):
+        """Columns still counted (all of them without ``max_values``)"""
+        return [col for col in self.columns if col in self.values]
+
+    def _drop(self, col):
+        self.values.pop(col, None)
+        self.counts.pop(col, None)
+
+    def _add(self, col, values, counts):
+        values, inverse = np.unique(np.concatenate([self.values[col], values]), return_inverse=True)
+        if self.max_values is not None and len(values) > self.max_values:
+            self._drop(col)
+            return
+        weights = np.concatenate([self.counts[col], counts])
+        self.values[col] = values
+        counts = np.bincount(inverse, weights=weights, minlength=len(values))
+        self.counts[col] = counts.astype('int64') if self.weight is None else counts
+
+    def update(self, chunk):
+        tracked = self.tracked
+        if not tracked:
+            return self
+        block = decimal_columns(chunk, tracked)
+        weights = None if self.weight is None else chunk[self.weight].to_numpy(dtype='float64')
+        for col, column in zip(tracked, block.T):
+            present = ~np.isnan(column)
+            if weights is None:
+                values, counts = np.unique(column[present], return_counts=True)
+            else:
+                values, inverse = np.unique(column[present], return_inverse=True)
+                counts = np.bincount(inverse, weights=weights[present], minlength=len(values))
+            self._add(col, values, counts)
+        return self
+
+    def merge(self, other):
+        """Fold in counts taken over disjoint rows of the same columns"""
+        if other.columns != self.columns or other.weight != self.weight:
+            raise ValueError("Cannot merge value counts of different columns")
+        for col in self.tracked:
+            if col in other.values:
+                self._add(col, other.values[col], other.counts[col])
+            else:
+                self._drop(col)
+        return self
+
+    def quantile(self, col, q):
+        """Quantile(s) of ``col``, as ``np.quantile`` (linear interpolation) on the raw values"""
+        values, cumulative = self.values[col], np.cumsum(self.counts[col])
+        q = np.asarray(q, dtype='float64')
+        if not len(values):
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        position = (cumulative[-1] - 1) * q
+        below = np.floor(position)
+        low = values[np.searchsorted(cumulative, below, side='right')]
+        high = values[np.searchsorted(cumulative, np.minimum(below + 1, cumulative[-1] - 1), side='right')]
+        result = low + (position - below) * (high - low)
+        return result if q.ndim else float(result)
+
+    def histogram(self, col, bins):
+        """Bin counts and edges of ``col``, as ``np.histogram`` on the raw values"""
+        counts, edges = np.histogram(self.values[col], bins=bins, weights=self.counts[col])
+        return {'counts': counts, 'edges': edges}
+
+
+class DistinctIds:
+    """Distinct non-negative integer IDs seen so far, as a bitmap"""
+
+    def __init__(self):
+        self.bits = np.zeros(0, dtype='uint8')
+
+    def update(self, ids):
+        ids = np.asarray(ids, dtype='int64')
+        if not len(ids):
+            return self
+        if ids.min() < 0:
+            raise ValueError("IDs must be non-negative integers")
+        size = int(ids.max()) // 8 + 1
+        if size > len(self.bits):
+            self.bits = np.concatenate([self.bits, np.zeros(size - len(self.bits), dtype='uint8')])
+        np.bitwise_or.at(self.bits, ids >> 3, (1 << (ids & 7)).astype('uint8'))
+        return self
+
+    def merge(self, other):
+        """Fold in the IDs of another bitmap"""
+        if len(other.bits) > len(self.bits):
+            self.bits, other_bits = other.bits.copy(), self.bits
+        else:
+            other_bits = other.bits
+        self.bits[:len(other_bits)] |= other_bits
+        return self
+
+    def __len__(self):
+        return int(np.bitwise_count(self.bits).sum())
+
+
+def accumulate(chunks, columns, groups=None, sketch_k=DEFAULT_K):
+    """Build one accumulator over an iterable of DataFrame chunks"""
+    accumulator = SummaryAccumulator(columns, groups, sketch_k=sketch_k)
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator
@@ -0,0 +1,105 @@
+"""Synthetic exports of any size, for benchmarks.
+
+Rows are drawn with replacement from a checked-in export, so its joint
+structure is kept (for the sleep data, quality tracking duration and
+stress, each occupation's BMI and disorder mix), and their numeric fields
+are jittered on the export's own grids: durations in 0.1 h steps, daily
+steps in hundreds, ages, heart rates and social media counts by a few
+units. Values stay within the observed range. Categorical columns (and the
+sleep export's 'systolic/diastolic' Blood Pressure strings) are copied from
+the drawn rows, so they keep exactly the export's levels and
+cardinalities. IDs run 1..n: Person ID for the sleep export, 'U_1'..'U_n'
+User_IDs for the social media one.
+
+Generation is chunked, each chunk seeded from its own ``SeedSequence``
+child, so a 10^8-row file needs memory for one chunk and the same seed
+always produces the same file.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from . import paths
+from .ingest import USER_ID_PREFIX
+
+TEMPLATE_PATH = paths.dataset('Sleep_health_and_lifestyle_dataset.csv')
+SOCIAL_TEMPLATE_PATH = paths.dataset('social_media_usage.csv')
+DEFAULT_CHUNKSIZE = 1_000_000
+
+# column: (standard deviation of the jitter, grid step)
+JITTER = {
+    'Age': (1.0, 1),
+    'Sleep Duration': (0.15, 0.1),
+    'Physical Activity Level': (5.0, 1),
+    'Heart Rate': (1.0, 1),
+    'Daily Steps': (300.0, 100),
+}
+SOCIAL_JITTER = {
+    'Daily_Minutes_Spent': (15.0, 1),
+    'Posts_Per_Day': (1.0, 1),
+    'Likes_Per_Day': (8.0, 1),
+    'Follows_Per_Day': (3.0, 1),
+}
+
+
+def load_template(path=TEMPLATE_PATH):
+    return pd.read_csv(path)
+
+
+def jitter(values, sd, step, low, high, rng):
+    """``values`` plus Gaussian noise, snapped to multiples of ``step`` within [low, high]"""
+    noisy = values + rng.normal(0.0, sd, len(values))
+    return np.clip(np.round(noisy / step) * step, low, high)
+
+
+def resampled_rows(template, n, rng, jitters):
+    """``n`` rows drawn from ``template`` with the ``jitters`` columns jittered"""
+    rows = template.iloc[rng.integers(0, len(template), n)].reset_index(drop=True)
+    for col, (sd, step) in jitters.items():
+        observed = template[col]
+        values = jitter(rows[col].to_numpy(dtype='float64'), sd, step, observed.min(), observed.max(), rng)
+        rows[col] = values.round(1) if observed.dtype.kind == 'f' else values.astype(observed.dtype)
+    return rows
+
+
+def sleep_chunk(template, n, rng, first_id=1):
+    """``n`` synthetic rows shaped like ``template`` (a frame of the raw sleep export)"""
+    rows = resampled_rows(template, n, rng, JITTER)
+    rows['Person ID'] = np.arange(first_id, first_id + n)
+    return rows
+
+
+def social_chunk(template, n, rng, first_id=1):
+    """``n`` synthetic rows shaped like ``template`` (a frame of the raw social media export)"""
+    rows = resampled_rows(template, n, rng, SOCIAL_JITTER)
+    rows['User_ID'] = np.char.add(USER_ID_PREFIX, np.arange(first_id, first_id + n).astype(str))
+    return rows
+
+
+def write_chunks(path, rows, make_chunk, seed=0, chunksize=DEFAULT_CHUNKSIZE, na_rep=''):
+    """Write ``rows`` rows from ``make_chunk(n, rng, first_id)`` to ``path``, one chunk at a time"""
+    if rows < 1:
+        raise ValueError("A synthetic export needs at least one row")
+    seeds = np.random.SeedSequence(seed).spawn(math.ceil(rows / chunksize))
+    with open(path, 'w', newline='') as handle:
+        for index, child in enumerate(seeds):
+            start = index * chunksize
+            chunk = make_chunk(min(chunksize, rows - start), np.random.default_rng(child), start + 1)
+            chunk.to_csv(handle, header=index == 0, index=False, na_rep=na_rep)
+    return path
+
+
+def write_sleep_csv(path, rows, seed=0, chunksize=DEFAULT_CHUNKSIZE, template=None):
+    """Write a ``rows``-row synthetic sleep export to ``path``"""
+    template = load_template() if template is None else template
+    # The export spells a missing Sleep Disorder as 'None'
+    return write_chunks(path, rows, lambda n, rng, first_id: sleep_chunk(template, n, rng, first_id),
+                        seed=seed, chunksize=chunksize, na_rep='None')
+
+
+def write_social_csv(path, rows, seed=0, chunksize=DEFAULT_CHUNKSIZE, template=None):
+    """Write a ``rows``-row synthetic social media export to ``path``"""
+    template = load_template(SOCIAL_TEMPLATE_PATH) if template is None else template
+    return write_chunks(path, rows, lambda n, rng, first_id: social_chunk(template, n, rng, first_id),
+                        seed=seed, chunksize=chunksize)
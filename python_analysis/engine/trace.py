@@ -0,0 +1,206 @@
+"""Per-stage timing, memory and row-count trace of an analysis run.
+
+A ``Tracer`` measures named spans: every pipeline stage (through
+``Tracer.wrap``), finer steps inside a stage (``with tracer.span(...)``)
+and every rendered figure (measured inside the render worker and sent
+back). Each span records
+
+* wall time and process CPU time (concurrent spans under ``--jobs`` share
+  the process' CPU, so their CPU times overlap);
+* peak RSS, the process high-water mark when the span closed;
+* with ``memory=True``, tracemalloc allocations: net bytes still allocated
+  at the end and the peak above the level at entry (tracemalloc slows
+  allocation-heavy code severalfold, so it is opt-in);
+* input and output row counts, when the values passed in and out have rows.
+
+``write`` saves a JSON trace and ``write_chrome`` the Chrome trace event
+format (load it in chrome://tracing or Perfetto). A disabled tracer
+installs nothing: no stage wrappers, no tracemalloc, and ``span`` returns a
+shared no-op context.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# tracemalloc's peak is process-wide, so spans of every tracer in the
+# process share one registry; each start or end folds the peak so far into
+# every open span and resets it
+_OPEN_SPANS = []
+_LOCK = threading.Lock()
+
+
+def peak_rss():
+    """Process high-water resident set size in bytes, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def count_rows(value):
+    """Rows of a frame, series or array (or of a result's ``frame``), else None"""
+    shape = getattr(value, 'shape', None)
+    if shape:
+        return int(shape[0])
+    frame = getattr(value, 'frame', None)
+    return None if frame is None else count_rows(frame)
+
+
+def max_rows(values):
+    """Largest row count among ``values``, or None if none has rows"""
+    counts = [count for count in map(count_rows, values) if count is not None]
+    return max(counts) if counts else None
+
+
+class Span:
+    """An open measurement; set ``rows_out`` before it closes"""
+
+    def __init__(self, name, category, rows_in=None):
+        self.name = name
+        self.category = category
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.alloc_start = None
+        self.alloc_peak = 0
+
+
+class _NullSpan:
+    """What a disabled tracer's ``span`` yields; attribute writes are ignored"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _fold_peak():
+    current, peak = tracemalloc.get_traced_memory()
+    for span in _OPEN_SPANS:
+        span.alloc_peak = max(span.alloc_peak, peak)
+    tracemalloc.reset_peak()
+    return current
+
+
+class Tracer:
+    """Collects span records; ``origin`` is the perf_counter value at time 0"""
+
+    def __init__(self, enabled=True, memory=False, origin=None):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.origin = time.perf_counter() if origin is None else origin
+        self.records = []
+        self.owns_tracemalloc = False
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.owns_tracemalloc = True
+        return self
+
+    def stop(self):
+        if self.owns_tracemalloc:
+            tracemalloc.stop()
+            self.owns_tracemalloc = False
+        return self
+
+    def span(self, name, category='step', rows_in=None):
+        """Context manager measuring the enclosed block as one span"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._measure(Span(name, category, rows_in))
+
+    @contextmanager
+    def _measure(self, span):
+        tracing = self.memory and tracemalloc.is_tracing()
+        with _LOCK:
+            if tracing:
+                span.alloc_start = _fold_peak()
+                span.alloc_peak = span.alloc_start
+            _OPEN_SPANS.append(span)
+        started, cpu_started = time.perf_counter(), time.process_time()
+        try:
+            yield span
+        finally:
+            wall, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+            with _LOCK:
+                alloc_end = _fold_peak() if tracing else None
+                _OPEN_SPANS.remove(span)
+            self.records.append({
+                'name': span.name,
+                'category': span.category,
+                'start': round(started - self.origin, 6),
+                'wall_seconds': round(wall, 6),
+                'cpu_seconds': round(cpu, 6),
+                'peak_rss_bytes': peak_rss(),
+                'alloc_bytes': None if alloc_end is None else alloc_end - span.alloc_start,
+                'alloc_peak_bytes': None if alloc_end is None else span.alloc_peak - span.alloc_start,
+                'rows_in': span.rows_in,
+                'rows_out': span.rows_out,
+                'pid': os.getpid(),
+                'thread': threading.current_thread().name,
+            })
+
+    def wrap(self, name, func):
+        """``func`` measured as a stage span (a ``Pipeline.run`` wrapper)"""
+        @functools.wraps(func)
+        def measured(context, **inputs):
+            with self.span(name, 'stage', rows_in=max_rows(inputs.values())) as span:
+                result = func(context, **inputs)
+                span.rows_out = count_rows(result)
+            return result
+        return measured
+
+    def extend(self, records):
+        """Add records measured elsewhere (e.g. in render workers)"""
+        self.records.extend(records)
+
+    def summary(self, top=5):
+        """One line naming the slowest spans"""
+        slowest = sorted(self.records, key=lambda record: record['wall_seconds'], reverse=True)[:top]
+        return ', '.join(f"{record['category']}:{record['name']} {record['wall_seconds']:.2f}s"
+                         for record in slowest)
+
+    def write(self, path, **meta):
+        """JSON trace: run metadata plus every span in start order"""
+        trace = dict(meta, wall_seconds=round(time.perf_counter() - self.origin, 6),
+                     peak_rss_bytes=peak_rss(),
+                     spans=sorted(self.records, key=lambda record: record['start']))
+        with open(path, 'w') as handle:
+            json.dump(trace, handle, indent=2)
+        return path
+
+    def write_chrome(self, path):
+        """Chrome trace event format: one complete ('X') event per span"""
+        threads = {}
+        events = []
+        for record in sorted(self.records, key=lambda record: record['start']):
+            tid = threads.setdefault((record['pid'], record['thread']), len(threads))
+            events.append({
+                'name': record['name'], 'cat': record['category'], 'ph': 'X',
+                'ts': record['start'] * 1e6, 'dur': record['wall_seconds'] * 1e6,
+                'pid': record['pid'], 'tid': tid,
+                'args': {key: value for key, value in record.items()
+                         if key not in ('name', 'category', 'start', 'wall_seconds', 'pid', 'thread')},
+            })
+        events.extend({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread}}
+                      for (pid, thread), tid in threads.items())
+        with open(path, 'w') as handle:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, handle)
+        return path
@@ -0,0 +1,79 @@
+"""Batch runner: run every analysis (or the named ones) and report together.
+
+    python python_analysis/run.py                      # all analyses
+    python python_analysis/run.py sleep_health_and_lifestyle --workers 2
+    python python_analysis/run.py --report run.json -- --no-cache
+
+Arguments after ``--`` are passed to every analysis' own command line.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engine import paths, runner
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Run analysis pipelines concurrently")
+    parser.add_argument('analyses', nargs='*', metavar='ANALYSIS',
+                        help="Analyses to run (default: every one under analysis/)")
+    parser.add_argument('--list', action='store_true', help="List the available analyses and exit")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Analyses run at once (default: one per CPU, at most one per analysis)")
+    parser.add_argument('--report', metavar='PATH', help="Write the combined report as JSON")
+    parser.add_argument('--log-dir', metavar='DIR', help="Write each analysis' output to DIR/<name>.log")
+    parser.add_argument('--verbose', action='store_true', help="Print each analysis' output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    passthrough = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, passthrough = argv[:split], argv[split + 1:]
+    args = parse_args(argv)
+
+    if args.list:
+        for analysis in runner.discover():
+            print(f"{analysis.name:<32} {paths.relative(analysis.path)}")
+        return 0
+    try:
+        analyses = runner.select(args.analyses)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+
+    started = time.time()
+    reports = runner.run_all(analyses, passthrough, workers=args.workers)
+    elapsed = time.time() - started
+
+    for report in reports:
+        if args.verbose:
+            print(f"{'=' * 30} {report['name']} {'=' * 30}")
+            print(report['log'])
+        if args.log_dir:
+            os.makedirs(args.log_dir, exist_ok=True)
+            with open(os.path.join(args.log_dir, f"{report['name']}.log"), 'w') as f:
+                f.write(report['log'])
+    print(runner.summary_table(reports))
+    print(f"\nTotal wall time: {elapsed:.2f}s for {len(reports)} analyses")
+    failed = [report for report in reports if report['status'] != 'ok']
+    for report in failed:
+        print(f"\n{report['name']} failed:\n{report['error']}", file=sys.stderr)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'wall_seconds': round(elapsed, 3),
+                       'analyses': [{key: value for key, value in report.items() if key != 'log'}
+                                    for report in reports]}, f, indent=2)
+        print(f"Report written to {args.report}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from engine import paths
+from engine.columnar import ParquetCache, cache_path
+from engine.ingest import concat_chunks, sleep_source
+
+AGE_BINS = [0, 30, 45, 60, 100]
+AGE_LABELS = ['18-30', '31-45', '46-60', '60+']
+
+
+@pytest.fixture
+def chunks():
+    # Occupation's categories differ between chunks; Age_Group's are ordered bins
+    return [chunk.assign(Age_Group=pd.cut(chunk['Age'], bins=AGE_BINS, labels=AGE_LABELS))
+            for chunk in sleep_source(paths.dataset('Sleep_health_and_lifestyle_dataset.csv'), chunksize=40)]
+
+
+def test_chunks_written_one_by_one_read_back(tmp_path, chunks):
+    cache = ParquetCache(str(tmp_path / 'clean.parquet'), 'key')
+    with cache.writer(report={'raw_rows': 374}) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    assert cache.valid() and cache.report() == {'raw_rows': 374}
+    expected = concat_chunks(chunks)
+    pd.testing.assert_frame_equal(cache.load(), expected)
+    pd.testing.assert_frame_equal(concat_chunks(cache.source(chunksize=100)), expected)
+    pd.testing.assert_frame_equal(cache.source().read(['Gender', 'Age']), expected[['Gender', 'Age']])
+
+
+def test_a_failed_pass_leaves_no_cache(tmp_path, chunks):
+    cache = ParquetCache(str(tmp_path / 'clean.parquet'), 'key')
+    with pytest.raises(RuntimeError):
+        with cache.writer() as writer:
+            writer.write(chunks[0])
+            raise RuntimeError
+    assert cache.load() is None and not list(tmp_path.iterdir())
+
+
+def test_each_source_csv_has_its_own_cache_file(tmp_path):
+    real = cache_path('sleep', 'data/sleep.csv', cache_dir=str(tmp_path))
+    assert real == cache_path('sleep', './data/../data/sleep.csv', cache_dir=str(tmp_path))
+    assert real != cache_path('sleep', '/tmp/bench/sleep.csv', cache_dir=str(tmp_path))
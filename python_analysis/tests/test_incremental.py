@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import paths
+from engine.incremental import AppendState, Recompute
+from engine.ingest import SLEEP_DTYPE_PLAN, apply_dtype_plan, split_blood_pressure
+from engine.outliers import iqr_bounds, summarize_outliers
+from engine.synthetic import sleep_chunk
+
+COLUMNS = ['Age', 'Sleep Duration', 'Quality of Sleep', 'Physical Activity Level',
+           'Stress Level', 'Heart Rate', 'Daily Steps']
+THRESHOLD = 5
+
+
+@pytest.fixture
+def raw():
+    return pd.read_csv(paths.dataset('Sleep_health_and_lifestyle_dataset.csv'))
+
+
+def prepared(frame):
+    return apply_dtype_plan(split_blood_pressure(frame), SLEEP_DTYPE_PLAN)
+
+
+def saved_state(frame, columns=COLUMNS):
+    """The state a full --append run records for ``frame``"""
+    state = AppendState('test', 'Person ID')
+    state.record_raw(frame, summarize_outliers(frame, iqr_bounds(frame, columns)))
+    return state
+
+
+def renumbered(frame, first_id):
+    frame = frame.copy()
+    frame['Person ID'] = np.arange(first_id, first_id + len(frame))
+    return frame
+
+
+# 355 rows: a copy moves the Daily Steps quartiles, but only between step counts
+@pytest.mark.parametrize('rows', [355, None])
+def test_identical_copy_does_not_recompute(raw, rows):
+    raw = raw.iloc[:rows]
+    state = saved_state(prepared(raw))
+    before = state.outliers.copy()
+    outliers = state.absorb_raw(prepared(renumbered(raw, len(raw) + 1)), THRESHOLD)
+    assert state.raw_rows == 2 * len(raw)
+    np.testing.assert_allclose(outliers['outlier_percentage'], before['outlier_percentage'])
+
+
+def test_few_resampled_rows_do_not_recompute(raw):
+    state = saved_state(prepared(raw))
+    new = sleep_chunk(raw, 5, np.random.default_rng(3), first_id=len(raw) + 1)
+    state.absorb_raw(prepared(new), THRESHOLD)
+    assert state.raw_rows == len(raw) + 5
+
+
+def test_rows_that_move_a_bound_past_data_recompute(raw):
+    state = saved_state(prepared(raw))
+    # Twice as many rows again, all at the top of the Daily Steps range: Q3 and
+    # the upper bound rise past observed step counts
+    new = renumbered(pd.concat([raw] * 2), len(raw) + 1)
+    new['Daily Steps'] = raw['Daily Steps'].max()
+    with pytest.raises(Recompute, match='Daily Steps'):
+        state.absorb_raw(prepared(new), THRESHOLD)
+
+
+def test_continuous_columns_use_the_sketch():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'Person ID': np.arange(1, 20_001), 'x': rng.standard_normal(20_000)})
+    state = saved_state(frame, ['x'])
+    assert state.values.tracked == []
+    state.absorb_raw(renumbered(frame, 20_001), THRESHOLD)
+    shifted = pd.DataFrame({'Person ID': np.arange(40_001, 60_001), 'x': rng.standard_normal(20_000) + 1})
+    with pytest.raises(Recompute, match='x'):
+        state.absorb_raw(shifted, THRESHOLD)
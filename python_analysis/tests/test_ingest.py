@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from engine import paths
+from engine.ingest import SLEEP_DTYPE_PLAN, concat_chunks, sleep_source
+
+
+def test_missing_integers_read_as_nan(tmp_path):
+    frame = pd.read_csv(paths.dataset('Sleep_health_and_lifestyle_dataset.csv'))
+    frame.loc[[3, 50], 'Age'] = np.nan
+    frame.loc[7, 'Blood Pressure'] = np.nan
+    path = tmp_path / 'sleep.csv'
+    frame.to_csv(path, index=False, float_format='%g')
+
+    chunks = list(sleep_source(path, chunksize=40))
+    # Only the chunks holding a missing value fall back to float
+    assert chunks[0]['Age'].dtype == np.float32 and chunks[2]['Age'].dtype == np.int8
+    assert chunks[0]['Systolic BP'].dtype == np.float32
+    assert chunks[1]['Systolic BP'].dtype == SLEEP_DTYPE_PLAN['Systolic BP']
+    read = concat_chunks(chunks)
+    np.testing.assert_array_equal(read['Age'].isna(), frame['Age'].isna())
+    np.testing.assert_allclose(read['Age'], frame['Age'])
+    assert read['Systolic BP'].isna().sum() == 1
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import paths
+from engine.crossval import cross_validate_streaming, hashed_fold_ids
+from engine.ingest import FrameSource
+from engine.ols import Gram, vif_table
+
+linear_model = pytest.importorskip('sklearn.linear_model')
+outliers_influence = pytest.importorskip('statsmodels.stats.outliers_influence')
+sm = pytest.importorskip('statsmodels.api')
+
+FEATURES = ['Age', 'Physical Activity Level', 'Stress Level', 'Heart Rate', 'Daily Steps']
+TARGET = 'Quality of Sleep'
+
+
+@pytest.fixture(scope='module')
+def sleep():
+    return pd.read_csv(paths.dataset('Sleep_health_and_lifestyle_dataset.csv'))
+
+
+def test_solve_matches_sklearn(sleep):
+    gram = Gram.from_frame(sleep, FEATURES, TARGET)
+    fit = gram.solve()
+    model = linear_model.LinearRegression().fit(sleep[FEATURES], sleep[TARGET])
+    np.testing.assert_allclose(fit.coef, model.coef_, rtol=1e-9)
+    assert fit.intercept == pytest.approx(model.intercept_, rel=1e-9)
+    mse, r2 = gram.score(fit)
+    predicted = model.predict(sleep[FEATURES])
+    assert mse == pytest.approx(np.mean((sleep[TARGET] - predicted) ** 2), rel=1e-9)
+    assert r2 == pytest.approx(model.score(sleep[FEATURES], sleep[TARGET]), rel=1e-9)
+
+
+def test_subset_and_downdated_fits_match_sklearn(sleep):
+    gram = Gram.from_frame(sleep, FEATURES, TARGET)
+    held_out = Gram.from_frame(sleep.iloc[:100], FEATURES, TARGET, shift=gram.shift)
+    rest = sleep.iloc[100:]
+    fit = (gram - held_out).solve(['Stress Level', 'Heart Rate'])
+    model = linear_model.LinearRegression().fit(rest[['Stress Level', 'Heart Rate']], rest[TARGET])
+    np.testing.assert_allclose(fit.coef, model.coef_, rtol=1e-8)
+    assert fit.intercept == pytest.approx(model.intercept_, rel=1e-8)
+
+
+def test_standard_errors_match_statsmodels(sleep):
+    gram = Gram.from_frame(sleep, FEATURES, TARGET)
+    results = sm.OLS(sleep[TARGET], sm.add_constant(sleep[FEATURES])).fit()
+    np.testing.assert_allclose(gram.standard_errors(gram.solve()), results.bse[FEATURES], rtol=1e-8)
+
+
+def test_vif_matches_statsmodels(sleep):
+    # statsmodels regresses each column on the others as given, so add the constant it needs
+    X = sm.add_constant(sleep[FEATURES]).to_numpy(dtype='float64')
+    expected = [outliers_influence.variance_inflation_factor(X, i) for i in range(1, X.shape[1])]
+    table = vif_table(Gram.from_frame(sleep, FEATURES, TARGET))
+    assert list(table['Variable']) == FEATURES
+    np.testing.assert_allclose(table['VIF'], expected, rtol=1e-9)
+
+
+def test_vif_of_collinear_and_constant_columns():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, 2))
+    X = np.column_stack([X, X.sum(axis=1), np.ones(200)])
+    vif = Gram.from_arrays(X, rng.standard_normal(200)).vif()
+    assert np.isinf(vif[:3]).all()
+    assert np.isnan(vif[3])
+
+
+def test_streaming_cross_validation_matches_sklearn_per_fold(sleep):
+    feature_sets = {'all': FEATURES, 'stress': ['Stress Level']}
+    chunks = FrameSource(sleep, chunksize=40)
+    scores = cross_validate_streaming(chunks, TARGET, feature_sets, 'Person ID', folds=4, repeats=2, seed=5)
+    # One pass over one chunk or many, on one thread or several, gives the same folds
+    pd.testing.assert_frame_equal(scores, cross_validate_streaming(
+        FrameSource(sleep), TARGET, feature_sets, 'Person ID', folds=4, repeats=2, seed=5, workers=3))
+    seed = int(np.random.SeedSequence(5).spawn(2)[1].generate_state(1)[0])
+    ids = hashed_fold_ids(sleep['Person ID'].to_numpy(), 4, seed)
+    for fold in range(4):
+        train, test = sleep[ids != fold], sleep[ids == fold]
+        model = linear_model.LinearRegression().fit(train[FEATURES], train[TARGET])
+        row = scores[(scores['feature_set'] == 'all') & (scores['repeat'] == 1) & (scores['fold'] == fold)]
+        assert row['r2'].item() == pytest.approx(model.score(test[FEATURES], test[TARGET]), rel=1e-9)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from engine import paths, ranks
+
+
+@pytest.fixture(scope='module')
+def sleep():
+    return pd.read_csv(paths.dataset('Sleep_health_and_lifestyle_dataset.csv'))
+
+
+@pytest.mark.parametrize('x, y', [('Sleep Duration', 'Quality of Sleep'),
+                                  ('Daily Steps', 'Stress Level'),
+                                  ('Heart Rate', 'Physical Activity Level')])
+def test_spearman_matches_scipy_on_tied_columns(sleep, x, y):
+    rho, p = ranks.spearman(ranks.FrequencyTable.from_arrays(sleep[x], sleep[y]))
+    expected = stats.spearmanr(sleep[x], sleep[y])
+    assert rho == pytest.approx(expected.statistic, rel=1e-12)
+    assert p == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+def test_spearman_matches_scipy_on_continuous_values():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(500)
+    y = x + rng.standard_normal(500)
+    table = ranks.FrequencyTable.from_arrays(x, y)
+    assert table.continuous
+    rho, p = ranks.spearman(table)
+    expected = stats.spearmanr(x, y)
+    assert rho == pytest.approx(expected.statistic, rel=1e-12)
+    assert p == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+def test_merged_chunks_match_one_table(sleep):
+    x, y = sleep['Sleep Duration'], sleep['Quality of Sleep']
+    table = ranks.FrequencyTable.from_arrays(x[:100], y[:100])
+    table.merge(ranks.FrequencyTable.from_arrays(x[100:], y[100:]))
+    assert ranks.spearman(table) == pytest.approx(ranks.spearman(ranks.FrequencyTable.from_arrays(x, y)))
+
+
+def test_mann_whitney_matches_scipy(sleep):
+    male = sleep.loc[sleep['Gender'] == 'Male', 'Sleep Duration']
+    female = sleep.loc[sleep['Gender'] == 'Female', 'Sleep Duration']
+    u, p = ranks.mann_whitney(ranks.FrequencyTable.from_groups(male, female))
+    expected = stats.mannwhitneyu(male, female, alternative='two-sided')
+    assert u == pytest.approx(expected.statistic, rel=1e-12)
+    assert p == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+def test_kruskal_matches_scipy(sleep):
+    codes, labels = pd.factorize(sleep['BMI Category'])
+    h, p = ranks.kruskal(ranks.FrequencyTable.from_codes(sleep['Quality of Sleep'], codes))
+    expected = stats.kruskal(*[sleep.loc[codes == i, 'Quality of Sleep'] for i in range(len(labels))])
+    assert h == pytest.approx(expected.statistic, rel=1e-12)
+    assert p == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+def test_off_grid_values_are_rejected():
+    table = ranks.FrequencyTable.from_arrays([1, 2, 3], [1, 2, 3])
+    with pytest.raises(ValueError):
+        table.update([1.5], [1])
+
+
+def test_tables_on_different_grids_merge_on_the_finer_one():
+    x, y = np.array([6.5, 7.1, 8.0, 6.5]), np.array([7.0, 8.0, 9.0, 7.0])
+    whole = np.array([7.0, 8.0, 6.0]), np.array([8.0, 9.0, 6.0])
+    table = ranks.FrequencyTable.from_arrays(*whole)
+    assert table.scales == (1, 1)
+    table.merge(ranks.FrequencyTable.from_arrays(x, y))
+    expected = stats.spearmanr(np.r_[whole[0], x], np.r_[whole[1], y])
+    assert ranks.spearman(table)[0] == pytest.approx(expected.statistic, rel=1e-12)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from engine import resample
+
+
+def test_rank_rows_matches_rankdata():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 6, size=(50, 40)).astype('float64')
+    np.testing.assert_array_equal(resample.rank_rows(values), stats.rankdata(values, axis=1))
+
+
+def test_row_statistics_match_scipy():
+    rng = np.random.default_rng(1)
+    a = rng.integers(0, 10, size=(5, 30)).astype('float64')
+    b = rng.integers(0, 10, size=(5, 25)).astype('float64')
+    for i in range(len(a)):
+        assert resample.spearman(a[i:i + 1, :25], b[i:i + 1])[0] == pytest.approx(
+            stats.spearmanr(a[i, :25], b[i]).statistic)
+        assert resample.t_statistic(a[i:i + 1], b[i:i + 1])[0] == pytest.approx(
+            stats.ttest_ind(a[i], b[i]).statistic)
+        assert resample.mann_whitney_u(a[i:i + 1], b[i:i + 1])[0] == pytest.approx(
+            stats.mannwhitneyu(a[i], b[i]).statistic)
+
+
+def test_batch_rows_stays_within_the_element_budget():
+    assert resample.batch_rows(1_000, batch_size=500, budget=100_000) == 100
+    assert resample.batch_rows(10, batch_size=500, budget=100_000) == 500
+    assert resample.batch_rows(10 ** 9, batch_size=500, budget=100_000) == 1
+
+
+def test_subsample_bounds_the_rows_resampled():
+    frame = pd.DataFrame({'value': np.arange(10_000)})
+    assert resample.subsample(frame, max_rows=20_000) is frame
+    assert resample.subsample(frame, max_rows=0) is frame
+    sample = resample.subsample(frame, max_rows=500, seed=3)
+    assert len(sample) == 500 and sample['value'].is_monotonic_increasing and sample['value'].is_unique
+    pd.testing.assert_frame_equal(sample, resample.subsample(frame, max_rows=500, seed=3))
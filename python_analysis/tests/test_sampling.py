@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from engine import sampling
+
+
+def test_reservoir_without_floor_keeps_its_size():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'group': rng.choice(['a', 'b', 'c'], 30_000), 'value': np.arange(30_000)})
+    reservoir = sampling.StratifiedReservoir(1_000, floor=0, seed=1)
+    for start in range(0, len(frame), 4_000):
+        chunk = frame.iloc[start:start + 4_000]
+        reservoir.update(chunk, chunk[['group']])
+    sample = reservoir.sample()
+    assert len(sample) == 1_000 and sample['value'].is_monotonic_increasing
+    assert sample[sampling.WEIGHT_COLUMN].sum() == pytest.approx(len(frame))
+
+
+def test_projected_t_statistic_matches_scipy_for_equal_weights():
+    rng = np.random.default_rng(2)
+    a, b = rng.normal(0.3, 1, 400), rng.normal(0, 1, 300)
+    ones = lambda sample: np.ones(len(sample))
+    d = sampling.weighted_cohens_d(a, ones(a), b, ones(b))
+    assert sampling.t_statistic(d, len(a), len(b)) == pytest.approx(stats.ttest_ind(a, b).statistic, rel=1e-3)
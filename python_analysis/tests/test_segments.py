@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import segments
+
+multitest = pytest.importorskip('statsmodels.stats.multitest')
+
+
+@pytest.mark.parametrize('method', segments.CORRECTIONS)
+def test_adjust_pvalues_matches_statsmodels(method):
+    pvalues = np.random.default_rng(0).uniform(0, 0.2, 40)
+    expected = multitest.multipletests(pvalues, method=method)[1]
+    np.testing.assert_allclose(segments.adjust_pvalues(pvalues, method), expected, rtol=1e-12)
+
+
+def test_missing_pvalues_are_left_out_of_the_family():
+    pvalues = np.array([0.01, np.nan, 0.04, 0.03])
+    adjusted = segments.adjust_pvalues(pvalues, 'holm')
+    assert np.isnan(adjusted[1])
+    np.testing.assert_allclose(adjusted[[0, 2, 3]], multitest.multipletests(pvalues[[0, 2, 3]], method='holm')[1])
+
+
+def test_unknown_correction_is_rejected():
+    with pytest.raises(ValueError):
+        segments.adjust_pvalues([0.1], 'bonferroni')
+
+
+def test_partition_offsets_cover_each_group():
+    frame = pd.DataFrame({'key': ['b', 'a', None, 'b', 'a', 'c']})
+    part = segments.partition(frame, 'key')
+    assert part.labels == ['a', 'b', 'c']
+    groups = [list(part.order[part.offsets[i]:part.offsets[i + 1]]) for i in range(len(part.labels))]
+    assert groups == [[1, 4], [0, 3], [5]]
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import paths
+from engine.groupby import GroupAggregator, select
+from engine.summary import DistinctIds, SummaryAccumulator, ValueCounts
+
+COLUMNS = ['Sleep Duration', 'Quality of Sleep', 'Heart Rate', 'Daily Steps']
+
+
+@pytest.fixture(scope='module')
+def sleep():
+    return pd.read_csv(paths.dataset('Sleep_health_and_lifestyle_dataset.csv'))
+
+
+def chunked(frame, size=50):
+    counts = ValueCounts(COLUMNS)
+    for start in range(0, len(frame), size):
+        counts.update(frame.iloc[start:start + size])
+    return counts
+
+
+@pytest.mark.parametrize('bins', [10, 15, 25])
+def test_histogram_matches_numpy(sleep, bins):
+    counts = chunked(sleep)
+    for col in COLUMNS:
+        expected_counts, expected_edges = np.histogram(sleep[col], bins=bins)
+        hist = counts.histogram(col, bins)
+        np.testing.assert_array_equal(hist['counts'], expected_counts)
+        np.testing.assert_allclose(hist['edges'], expected_edges)
+
+
+def test_quantile_matches_numpy(sleep):
+    counts = chunked(sleep)
+    q = np.linspace(0, 1, 21)
+    for col in COLUMNS:
+        np.testing.assert_allclose(counts.quantile(col, q), np.quantile(sleep[col], q))
+
+
+def test_merge_matches_one_pass(sleep):
+    merged = chunked(sleep.iloc[:200]).merge(chunked(sleep.iloc[200:]))
+    whole = chunked(sleep)
+    for col in COLUMNS:
+        np.testing.assert_array_equal(merged.values[col], whole.values[col])
+        np.testing.assert_array_equal(merged.counts[col], whole.counts[col])
+
+
+def test_columns_past_max_values_are_dropped(sleep):
+    counts = ValueCounts(COLUMNS, max_values=20).update(sleep)
+    assert counts.tracked == ['Quality of Sleep', 'Heart Rate', 'Daily Steps']
+
+
+def test_distinct_ids_match_nunique():
+    rng = np.random.default_rng(0)
+    ids = rng.integers(0, 50_000, 20_000)
+    left, right = DistinctIds().update(ids[:7_000]), DistinctIds().update(ids[7_000:])
+    assert len(left.merge(right)) == len(np.unique(ids))
+    assert len(DistinctIds().update(ids[7_000:]).merge(DistinctIds().update(ids[:7_000]))) == len(np.unique(ids))
+
+
+def test_group_std_keeps_precision_for_large_means():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'key': rng.choice(['a', 'b', 'c'], 30_000),
+                          'value': 1e9 + rng.normal(0, 0.5, 30_000)})
+    left = GroupAggregator({'key': ['value']}).update(frame.iloc[:10_000])
+    merged = left.merge(GroupAggregator({'key': ['value']}).update(frame.iloc[10_000:]))
+    expected = frame.groupby('key')['value'].std()
+    np.testing.assert_allclose(select(merged.table(), 'key', 'value', 'std'), expected, rtol=1e-6)
+
+
+def test_weighted_accumulator_matches_weighted_estimates(sleep):
+    rng = np.random.default_rng(0)
+    frame = sleep.assign(weight=rng.choice([1.0, 2.5, 40.0], len(sleep)))
+    weights = frame['weight'].to_numpy()
+    accumulator = SummaryAccumulator(COLUMNS, groups={'Gender': COLUMNS}, weight='weight')
+    accumulator.update(frame.iloc[:150]).merge(
+        SummaryAccumulator(COLUMNS, groups={'Gender': COLUMNS}, weight='weight').update(frame.iloc[150:]))
+    assert accumulator.n == pytest.approx(weights.sum())
+    np.testing.assert_allclose(accumulator.mean, np.average(frame[COLUMNS], axis=0, weights=weights))
+    covariance = np.cov(frame[COLUMNS].T, aweights=weights)
+    scale = np.sqrt(np.diag(covariance))
+    np.testing.assert_allclose(accumulator.corr(), covariance / np.outer(scale, scale))
+    by_gender = frame.groupby('Gender').apply(lambda group: np.average(group['Sleep Duration'],
+                                                                       weights=group['weight']))
+    np.testing.assert_allclose(select(accumulator.group_table(), 'Gender', 'Sleep Duration'), by_gender)
+    np.testing.assert_allclose(select(accumulator.group_table(), 'Gender', 'Sleep Duration', 'count'),
+                               frame.groupby('Gender')['weight'].sum())
@@ -4,6 +4,7 @@ import path from 'path'
 import { notFound } from 'next/navigation'
 import { compileMDX } from 'next-mdx-remote/rsc'
 import SectionIndicator from '@/components/SectionIndicator'
+import ResponsiveImage from '@/components/ResponsiveImage'
 
 export const dynamicParams = false
 
@@ -43,7 +44,9 @@ const BlogPost = async ({ params }: PageProps) => {
     const source = fs.readFileSync(filePath, 'utf8')
     const { content, frontmatter } = await compileMDX<Frontmatter>({
       source,
-      options: { parseFrontmatter: true }
+      options: { parseFrontmatter: true },
+      // Figures with an images.json manifest are served as responsive <picture>s
+      components: { img: ResponsiveImage }
     })
 
     return (
@@ -0,0 +1,42 @@
+import React from 'react';
+import path from 'path';
+import { findImage, srcSet } from '@/lib/imageManifest';
+
+interface ResponsiveImageProps {
+  src?: string;
+  alt?: string;
+  title?: string;
+}
+
+// The blog's content column is at most 48rem (768px) wide
+const SIZES = '(max-width: 768px) 100vw, 768px';
+
+// Markdown images: figures listed in an images.json manifest become a
+// <picture> with SVG or AVIF/WebP/PNG srcsets; anything else is a plain <img>
+export default function ResponsiveImage({ src = '', alt = '', title }: ResponsiveImageProps) {
+  const entry = findImage(src);
+  if (!entry) {
+    return <img src={src} alt={alt} title={title} loading="lazy" decoding="async" />;
+  }
+  const directory = path.posix.dirname(src);
+  const { fallback } = entry;
+  if (entry.svg) {
+    return (
+      <img src={`${directory}/${entry.svg.file}`} alt={alt} title={title}
+           width={entry.svg.width} height={entry.svg.height} loading="lazy" decoding="async" />
+    );
+  }
+  const pngs = entry.sources['image/png'] ?? [fallback];
+  return (
+    <picture>
+      {Object.entries(entry.sources)
+        .filter(([type]) => type !== 'image/png')
+        .map(([type, variants]) => (
+          <source key={type} type={type} srcSet={srcSet(directory, variants)} sizes={SIZES} />
+        ))}
+      <img src={`${directory}/${fallback.file}`} srcSet={srcSet(directory, pngs)} sizes={SIZES}
+           alt={alt} title={title} width={fallback.width} height={fallback.height}
+           loading="lazy" decoding="async" />
+    </picture>
+  );
+}
@@ -0,0 +1,68 @@
+// Types and loader for the pre-aggregated JSON the Python pipelines write to
+// public/data/<analysis>/ (see python_analysis/engine/export.py). Keep
+// SCHEMA_VERSION in sync with the Python side.
+
+export const SCHEMA_VERSION = 1;
+
+export interface AnalysisFile<T> {
+  schema_version: number;
+  name: string;
+  data: T;
+}
+
+export interface GroupStats {
+  groups: (string | number)[];
+  count: number[];
+  sum: number[];
+  mean: (number | null)[];
+  std: (number | null)[];
+}
+
+// key -> value column -> per-group statistics
+export type GroupTables = Record<string, Record<string, GroupStats>>;
+
+export interface Histogram {
+  counts: number[];
+  edges: number[];
+}
+
+export type Histograms = Record<string, Histogram>;
+
+export interface Matrix {
+  labels: string[];
+  values: (number | null)[][];
+}
+
+export interface SummaryTable {
+  index: string[];
+  columns: Record<string, (number | null)[]>;
+}
+
+export interface Regression {
+  target: string;
+  features: string[];
+  coefficients: number[];
+  intercept: number;
+  mse: number;
+  r2: number;
+  vif: Record<string, number>;
+}
+
+export interface AnalysisIndex {
+  schema_version: number;
+  files: Record<string, { path: string; bytes: number }>;
+}
+
+export async function loadAnalysisData<T>(analysis: string, name: string): Promise<T> {
+  const response = await fetch(`/data/${analysis}/${name}.json`);
+  if (!response.ok) {
+    throw new Error(`Failed to load ${analysis}/${name}.json: ${response.status}`);
+  }
+  const file: AnalysisFile<T> = await response.json();
+  if (file.schema_version !== SCHEMA_VERSION) {
+    throw new Error(
+      `${analysis}/${name}.json has schema version ${file.schema_version}, expected ${SCHEMA_VERSION}`
+    );
+  }
+  return file.data;
+}
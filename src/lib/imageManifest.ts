@@ -0,0 +1,59 @@
+// Types and loader for the responsive image manifests the Python pipelines
+// write next to their figures, public/graphs/<analysis>/images.json (see
+// python_analysis/engine/images.py). Keep MANIFEST_VERSION in sync with the
+// Python side. Read at build time, from the filesystem.
+import fs from 'fs';
+import path from 'path';
+
+export const MANIFEST_VERSION = 1;
+
+export interface ImageVariant {
+  file: string;
+  width: number;
+  height: number;
+  bytes: number;
+}
+
+export interface ImageEntry {
+  name: string;
+  kind: 'raster' | 'vector' | 'png';
+  original_bytes: number;
+  fallback: ImageVariant;
+  svg: ImageVariant | null;
+  // mime type -> variants, narrowest first; formats are listed smallest first
+  sources: Record<string, ImageVariant[]>;
+}
+
+export interface ImageManifest {
+  version: number;
+  figures: Record<string, ImageEntry>;
+}
+
+const manifests = new Map<string, ImageManifest | null>();
+
+function loadManifest(directory: string): ImageManifest | null {
+  if (!manifests.has(directory)) {
+    const file = path.join(process.cwd(), 'public', directory, 'images.json');
+    let manifest: ImageManifest | null = null;
+    if (fs.existsSync(file)) {
+      const parsed: ImageManifest = JSON.parse(fs.readFileSync(file, 'utf8'));
+      manifest = parsed.version === MANIFEST_VERSION ? parsed : null;
+    }
+    manifests.set(directory, manifest);
+  }
+  return manifests.get(directory) ?? null;
+}
+
+// Manifest entry for a figure URL such as /graphs/<analysis>/<name>.png
+export function findImage(src: string): ImageEntry | null {
+  if (!src.startsWith('/')) {
+    return null;
+  }
+  const directory = path.posix.dirname(src);
+  const name = path.posix.basename(src).replace(/\.(png|svg)$/, '');
+  return loadManifest(directory)?.figures[name] ?? null;
+}
+
+export function srcSet(directory: string, variants: ImageVariant[]): string {
+  return variants.map(variant => `${directory}/${variant.file} ${variant.width}w`).join(', ');
+}